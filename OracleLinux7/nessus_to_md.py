@@ -1,11 +1,31 @@
 #!/usr/bin/env python3
 
+import argparse
+import cProfile
+import csv
 import sys
 import os
 import re
+import time
 import xml.etree.ElementTree as ET
 
+# run_metrics.py lives in the repository root, next to the other scripts
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from run_metrics import RunMetrics, stage as metrics_stage  # noqa: E402
+
 NS = "{http://www.nessus.org/cm}"
+RESULT_ORDER = ("FAILED", "WARNING", "ERROR", "PASSED")
+CHANGE_CLASSES = ("fixed", "regressed", "changed", "unchanged", "added", "removed")
+
+METRICS = None  # run_metrics.RunMetrics when main() runs with --metrics-json
+
+def stage(name):
+    # Wall/CPU time and RSS peak of a block, accumulated per stage name
+    return metrics_stage(METRICS, name)
+
+def record_cost(kind, key, seconds):
+    if METRICS is not None:
+        METRICS.record(kind, key, seconds)
 
 def get_ns_text(elem, tag):
     node = elem.find(NS + tag)
@@ -21,67 +41,386 @@ def extract_rule_number(text):
         return m.group(1)
     return None
 
-def main():
-    if len(sys.argv) != 2:
-        print("Usage: python nessus_to_md.py <file.nessus>")
-        sys.exit(1)
+def resolve_parser(name):
+    # "auto" uses lxml when it is installed, else the stdlib ElementTree
+    if name == "etree":
+        return name
+    try:
+        import lxml.etree  # noqa: F401
+    except ImportError:
+        if name == "lxml":
+            raise
+        return "etree"
+    return "lxml"
 
-    nessus_file = sys.argv[1]
+def iter_host_items(path, parser="etree"):
+    # Stream (ReportHost name, ReportItem) pairs; items and finished hosts are cleared as we go
+    host = ""
+    if parser == "lxml":
+        from lxml import etree
+        events = etree.iterparse(path, events=("start", "end"), tag=("ReportHost", "ReportItem"), huge_tree=True)
+    else:
+        events = ET.iterparse(path, events=("start", "end"))
+    host_t0 = 0.0
+    for event, elem in events:
+        if elem.tag == "ReportHost":
+            if event == "start":
+                host = elem.get("name", "")
+                host_t0 = time.perf_counter()
+            else:
+                record_cost("hosts", f"{os.path.basename(path)}: {host}", time.perf_counter() - host_t0)
+                elem.clear()
+        elif elem.tag == "ReportItem" and event == "end":
+            yield host, elem
+            elem.clear()
 
-    if not os.path.isfile(nessus_file):
-        print("File not found:", nessus_file)
-        sys.exit(1)
+def iter_report_items(path, parser="etree"):
+    for _, item in iter_host_items(path, parser):
+        yield item
+
+def rule_sort_key(rule_number):
+    return tuple(int(part) for part in rule_number.split("."))
+
+def result_rank(result):
+    return RESULT_ORDER.index(result) if result in RESULT_ORDER else len(RESULT_ORDER)
+
+def worst_result(current, result):
+    # Several sub-checks share one rule number (e.g. "5.2.4 ... - AllowUsers" and "... - DenyUsers"):
+    # the rule takes the worst of their results, FAILED > WARNING > ERROR > PASSED
+    if current is None or result_rank(result) < result_rank(current):
+        return result
+    return current
+
+def aggregate_compliance(nessus_files, parser="etree"):
+    """
+    Stream every file and collect, per rule, the result and actual values on each host.
+    Memory is per (rule, host) pair, not per ReportItem: identical sub-check outputs are
+    stored once and hosts are column indexes. Sub-checks of one rule on a host merge into
+    the worst result and keep every output; a host seen again in a later file replaces
+    its earlier result.
+    """
+    hosts = {}   # host name -> column index (first-seen order)
+    rules = {}   # rule number -> {"name", "solution", "policy", "status": {host idx: (result, value idxs, file idx)}}
+    values = {}  # (check name, result, actual value) -> index
+    skipped = 0
+    for file_idx, nessus_file in enumerate(nessus_files):
+        print(f"Reading: {nessus_file}")
+        for host, item in iter_host_items(nessus_file, parser):
+            if "Compliance" not in item.get("pluginFamily", ""):
+                continue
+            name = get_ns_text(item, "compliance-check-name")
+            rule_number = extract_rule_number(name)
+            if not rule_number:
+                skipped += 1
+                continue
+            rule = rules.get(rule_number)
+            if rule is None:
+                rule = rules[rule_number] = {
+                    "name": name,
+                    "solution": get_ns_text(item, "compliance-solution"),
+                    "policy": get_ns_text(item, "compliance-policy-value"),
+                    "status": {},
+                }
+            host_idx = hosts.setdefault(host, len(hosts))
+            result = sys.intern(get_ns_text(item, "compliance-result").upper() or "UNKNOWN")
+            value_idx = values.setdefault((name, result, get_ns_text(item, "compliance-actual-value")), len(values))
+            previous = rule["status"].get(host_idx)
+            if previous is not None and previous[2] == file_idx:
+                rule["status"][host_idx] = (worst_result(previous[0], result), previous[1] + (value_idx,), file_idx)
+            else:
+                rule["status"][host_idx] = (result, (value_idx,), file_idx)
+    return list(hosts), rules, list(values), skipped
+
+def write_rule_summary(filepath, rule, host_names, values):
+    # Hosts with the same result and actual value are listed together
+    groups = {}
+    counts = {}
+    for host_idx, (result, value_idxs, _) in rule["status"].items():
+        groups.setdefault((result, value_idxs), []).append(host_names[host_idx])
+        counts[result] = counts.get(result, 0) + 1
 
-    base_name = os.path.splitext(os.path.basename(nessus_file))[0]
-    output_dir = base_name
+    with open(filepath, "w", encoding="utf-8") as f:
+        f.write(f"# {rule['name']}\n\n")
+
+        f.write("## Results\n")
+        f.write("| Result | Hosts |\n|--------|-------|\n")
+        for result in sorted(counts, key=result_rank):
+            f.write(f"| {result} | {counts[result]} |\n")
+        f.write("\n")
+
+        f.write("## Solution\n")
+        f.write((rule["solution"] or "N/A") + "\n\n")
+
+        f.write("## Policy Value\n")
+        f.write((rule["policy"] or "N/A") + "\n\n")
+
+        f.write("## Hosts\n")
+        ordered = sorted(groups.items(), key=lambda kv: (result_rank(kv[0][0]), -len(kv[1])))
+        for (result, value_idxs), names in ordered:
+            f.write(f"\n### {result} on {len(names)} host(s)\n")
+            f.write(", ".join(f"`{n}`" for n in sorted(names)) + "\n\n")
+            if len(value_idxs) == 1:
+                f.write("Output:\n")
+                f.write((values[value_idxs[0]][2] or "N/A") + "\n")
+                continue
+            for value_idx in value_idxs:
+                check_name, check_result, output = values[value_idx]
+                f.write(f"Output of {check_name} ({check_result}):\n")
+                f.write((output or "N/A") + "\n\n")
+
+def write_status_matrix(filepath, rules, host_names):
+    # One row per rule, one column per host; cells hold the compliance result
+    with open(filepath, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Rule", "Check"] + host_names)
+        for rule_number in sorted(rules, key=rule_sort_key):
+            status = rules[rule_number]["status"]
+            cells = [status[i][0] if i in status else "" for i in range(len(host_names))]
+            writer.writerow([rule_number, rules[rule_number]["name"]] + cells)
+
+def run_aggregate(nessus_files, output_dir, parser):
     os.makedirs(output_dir, exist_ok=True)
+    print(f"Output folder: {output_dir}")
 
-    print(f"Reading: {nessus_file}")
+    with stage("parsing"):
+        host_names, rules, values, skipped = aggregate_compliance(nessus_files, parser)
+    totals = {}
+    with stage("writing"):
+        for rule_number, rule in rules.items():
+            t0 = time.perf_counter()
+            write_rule_summary(os.path.join(output_dir, f"{rule_number}.md"), rule, host_names, values)
+            record_cost("rules", rule_number, time.perf_counter() - t0)
+            for result, _, _ in rule["status"].values():
+                totals[result] = totals.get(result, 0) + 1
+        matrix_path = os.path.join(output_dir, "rule_host_matrix.csv")
+        write_status_matrix(matrix_path, rules, host_names)
+
+    print("Done.")
+    print(f"Hosts: {len(host_names)}")
+    print(f"Rules: {len(rules)}")
+    for result in sorted(totals, key=result_rank):
+        print(f"{result}: {totals[result]}")
+    print(f"Skipped: {skipped}")
+    print(f"Matrix: {matrix_path}")
+
+def iter_compliance_results(nessus_file, parser="etree"):
+    # (host, rule number, result) for every compliance item that carries a rule number
+    for host, item in iter_host_items(nessus_file, parser):
+        if "Compliance" not in item.get("pluginFamily", ""):
+            continue
+        rule_number = extract_rule_number(get_ns_text(item, "compliance-check-name"))
+        if rule_number:
+            yield host, rule_number, sys.intern(get_ns_text(item, "compliance-result").upper() or "UNKNOWN")
+
+def classify_change(before, after):
+    if before is None:
+        return "added"
+    if after is None:
+        return "removed"
+    if before == after:
+        return "unchanged"
+    if after == "PASSED":
+        return "fixed"
+    if before == "PASSED":
+        return "regressed"
+    return "changed"
+
+def diff_compliance(before_file, after_file, parser="etree"):
+    """
+    Hash join of two scans on (host, rule number): the before scan is built into a
+    dict of results and the after scan is streamed against it, so neither DOM is
+    ever held. Sub-checks of a rule reduce to their worst result on each side.
+    Returns {(host, rule): (before result or None, after result or None)}.
+    """
+    print(f"Reading: {before_file}")
+    before = {}
+    for host, rule_number, result in iter_compliance_results(before_file, parser):
+        key = (host, rule_number)
+        before[key] = worst_result(before.get(key), result)
+
+    print(f"Reading: {after_file}")
+    pairs = {}
+    for host, rule_number, result in iter_compliance_results(after_file, parser):
+        key = (host, rule_number)
+        if key in pairs:
+            pairs[key] = (pairs[key][0], worst_result(pairs[key][1], result))
+        else:
+            pairs[key] = (before.pop(key, None), result)
+    for key, result in before.items():
+        pairs[key] = (result, None)
+    return pairs
+
+def write_change_table(f, title, label, counts):
+    f.write(f"## {title}\n")
+    f.write(f"| {label} | " + " | ".join(c.capitalize() for c in CHANGE_CLASSES) + " |\n")
+    f.write("|" + "---|" * (len(CHANGE_CLASSES) + 1) + "\n")
+    for key in counts:
+        f.write(f"| {key} | " + " | ".join(str(counts[key].get(c, 0)) for c in CHANGE_CLASSES) + " |\n")
+    f.write("\n")
+
+def run_diff(before_file, after_file, output_dir, parser):
+    os.makedirs(output_dir, exist_ok=True)
     print(f"Output folder: {output_dir}")
 
-    tree = ET.parse(nessus_file)
-    root = tree.getroot()
+    with stage("parsing"):
+        pairs = diff_compliance(before_file, after_file, parser)
+    with stage("writing"):
+        ordered = sorted(pairs, key=lambda k: (k[0], rule_sort_key(k[1])))
+
+        by_host = {}
+        by_section = {}
+        flipped = {}  # host -> change class -> [rule numbers], everything except unchanged
+        totals = {}
+        csv_path = os.path.join(output_dir, "compliance_diff.csv")
+        with open(csv_path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["Host", "Section", "Rule", "Before", "After", "Change"])
+            for host, rule_number in ordered:
+                before, after = pairs[(host, rule_number)]
+                change = classify_change(before, after)
+                section = rule_number.split(".")[0]
+                writer.writerow([host, section, rule_number, before or "", after or "", change])
+                for counts, key in ((by_host, host), (by_section, section)):
+                    bucket = counts.setdefault(key, {})
+                    bucket[change] = bucket.get(change, 0) + 1
+                totals[change] = totals.get(change, 0) + 1
+                if change != "unchanged":
+                    flipped.setdefault(host, {}).setdefault(change, []).append(rule_number)
+
+        md_path = os.path.join(output_dir, "compliance_diff.md")
+        with open(md_path, "w", encoding="utf-8") as f:
+            f.write("# Compliance Diff\n\n")
+            f.write(f"- **Before:** `{before_file}`\n")
+            f.write(f"- **After:** `{after_file}`\n\n")
+            write_change_table(f, "By Section", "Section", {k: by_section[k] for k in sorted(by_section, key=int)})
+            write_change_table(f, "By Host", "Host", by_host)
+            f.write("## Changes per Host\n")
+            for host in by_host:
+                if host not in flipped:
+                    continue
+                f.write(f"\n### {host}\n")
+                for change in CHANGE_CLASSES:
+                    if change in flipped[host]:
+                        f.write(f"- **{change.capitalize()}:** " + ", ".join(flipped[host][change]) + "\n")
+
+    print("Done.")
+    print(f"Hosts: {len(by_host)}")
+    for change in CHANGE_CLASSES:
+        print(f"{change.capitalize()}: {totals.get(change, 0)}")
+    print(f"Report: {md_path}")
+    print(f"Details: {csv_path}")
+
+def run_single(nessus_file, output_dir, parser):
+    os.makedirs(output_dir, exist_ok=True)
+
+    print(f"Reading: {nessus_file}")
+    print(f"Output folder: {output_dir}")
 
     extracted = 0
     skipped = 0
 
-    for item in root.iter("ReportItem"):
-        plugin_family = item.get("pluginFamily", "")
+    # Parsing and writing are interleaved: one stage
+    with stage("convert"):
+        for item in iter_report_items(nessus_file, parser):
+            plugin_family = item.get("pluginFamily", "")
 
-        if "Compliance" not in plugin_family:
-            continue
+            if "Compliance" not in plugin_family:
+                continue
 
-        name = get_ns_text(item, "compliance-check-name")
-        rule_number = extract_rule_number(name)
+            name = get_ns_text(item, "compliance-check-name")
+            rule_number = extract_rule_number(name)
 
-        if not rule_number:
-            skipped += 1
-            continue
+            if not rule_number:
+                skipped += 1
+                continue
 
-        solution = get_ns_text(item, "compliance-solution")
-        policy_value = get_ns_text(item, "compliance-policy-value")
-        output_val = get_ns_text(item, "compliance-actual-value")
+            solution = get_ns_text(item, "compliance-solution")
+            policy_value = get_ns_text(item, "compliance-policy-value")
+            output_val = get_ns_text(item, "compliance-actual-value")
 
-        filename = f"{rule_number}.md"
-        filepath = os.path.join(output_dir, filename)
+            t0 = time.perf_counter()
+            filename = f"{rule_number}.md"
+            filepath = os.path.join(output_dir, filename)
 
-        with open(filepath, "w", encoding="utf-8") as f:
-            f.write(f"# {name}\n\n")
+            with open(filepath, "w", encoding="utf-8") as f:
+                f.write(f"# {name}\n\n")
 
-            f.write("## Solution\n")
-            f.write((solution or "N/A") + "\n\n")
+                f.write("## Solution\n")
+                f.write((solution or "N/A") + "\n\n")
 
-            f.write("## Policy Value\n")
-            f.write((policy_value or "N/A") + "\n\n")
+                f.write("## Policy Value\n")
+                f.write((policy_value or "N/A") + "\n\n")
 
-            f.write("## Output\n")
-            f.write((output_val or "N/A") + "\n")
+                f.write("## Output\n")
+                f.write((output_val or "N/A") + "\n")
 
-        extracted += 1
+            record_cost("rules", rule_number, time.perf_counter() - t0)
+            extracted += 1
 
     print("Done.")
     print(f"Extracted: {extracted}")
     print(f"Skipped: {skipped}")
 
+def main():
+    ap = argparse.ArgumentParser(description="Write one Markdown file per compliance rule of .nessus scans.")
+    ap.add_argument("nessus_files", nargs="+", help="Input .nessus file(s)")
+    ap.add_argument("--parser", choices=("auto", "lxml", "etree"), default="auto",
+                    help="XML backend (default: lxml when installed, else ElementTree)")
+    ap.add_argument("--aggregate", action="store_true",
+                    help="Aggregate every host of every file: per-rule counts and host breakdown, "
+                         "plus rule_host_matrix.csv (implied by several input files)")
+    ap.add_argument("--diff", action="store_true",
+                    help="Compare two scans (BEFORE AFTER) per host and rule: fixed, regressed and unchanged "
+                         "rules per host and per section")
+    ap.add_argument("-o", "--output-dir",
+                    help="Output folder (default: the input's base name, compliance_summary when aggregating, "
+                         "compliance_diff with --diff)")
+    ap.add_argument("--metrics-json",
+                    help="Write per-stage wall/CPU time and RSS peaks plus per-host and per-rule cost "
+                         "histograms (with the slowest ones) to this JSON file")
+    ap.add_argument("--metrics-top", type=int, default=10, help="Slowest hosts/rules listed in --metrics-json")
+    ap.add_argument("--cprofile", help="Write cProfile stats of the run to this file (python -m pstats FILE)")
+    args = ap.parse_args()
+
+    if args.diff and len(args.nessus_files) != 2:
+        print("--diff takes exactly two files: BEFORE AFTER")
+        sys.exit(1)
+
+    for nessus_file in args.nessus_files:
+        if not os.path.isfile(nessus_file):
+            print("File not found:", nessus_file)
+            sys.exit(1)
+
+    try:
+        parser = resolve_parser(args.parser)
+    except ImportError:
+        print("--parser lxml requires lxml (pip install lxml)")
+        sys.exit(1)
+
+    global METRICS
+    if args.metrics_json:
+        METRICS = RunMetrics(top_n=args.metrics_top)
+    profiler = cProfile.Profile() if args.cprofile else None
+    if profiler:
+        profiler.enable()
+
+    try:
+        if args.diff:
+            run_diff(args.nessus_files[0], args.nessus_files[1], args.output_dir or "compliance_diff", parser)
+        elif args.aggregate or len(args.nessus_files) > 1:
+            run_aggregate(args.nessus_files, args.output_dir or "compliance_summary", parser)
+        else:
+            nessus_file = args.nessus_files[0]
+            base_name = os.path.splitext(os.path.basename(nessus_file))[0]
+            run_single(nessus_file, args.output_dir or base_name, parser)
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(args.cprofile)
+            print(f"cProfile stats: {args.cprofile}")
+        if METRICS is not None:
+            METRICS.write(args.metrics_json)
+            print(f"Metrics: {args.metrics_json}")
+
 if __name__ == "__main__":
     main()
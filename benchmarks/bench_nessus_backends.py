@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Compare the XML backends (stdlib ElementTree vs lxml) of extrai_nessus.py and
+OracleLinux7/nessus_to_md.py on the same .nessus corpus.
+
+Without --nessus a synthetic corpus is generated in a temporary directory
+(hosts x items per host, a fixed plugin catalog with long descriptions and a
+share of cm: compliance items). For every backend the script reports rows/sec
+and MB/s of iter_rows_from_file() and of nessus_to_md's ReportItem stream.
+Both backends must produce identical rows, otherwise the script exits with 1.
+
+Usage:
+  python benchmarks/bench_nessus_backends.py --hosts 2000 --items 100
+  python benchmarks/bench_nessus_backends.py --nessus scan1.nessus scan2.nessus --repeat 3
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+from xml.sax.saxutils import escape
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "OracleLinux7"))
+
+import extrai_nessus as nessus  # noqa: E402
+import nessus_to_md  # noqa: E402
+
+
+def write_synthetic(path: Path, hosts: int, items: int, plugins: int = 800, seed: int = 0) -> None:
+    rnd = random.Random(seed)
+    catalog = []
+    for k in range(plugins):
+        pid = 20000 + k
+        compliance = k % 5 == 0
+        catalog.append((pid, compliance, f"Plugin {pid} &amp; friends", "Lorem ipsum dolor sit amet. " * rnd.randint(10, 40),
+                        f"Upgrade package {pid}. " * 3, rnd.choice(["Low", "Medium", "High", "Critical"]),
+                        rnd.choice(["5.0", "7.5", "9.8"])))
+    with path.open("w", encoding="utf-8") as out:
+        out.write('<?xml version="1.0" ?>\n<NessusClientData_v2 xmlns:cm="http://www.nessus.org/cm">\n'
+                  "<Policy><policyName>bench</policyName></Policy>\n<Report name=\"bench\">\n")
+        for h in range(hosts):
+            out.write(f'<ReportHost name="h{h}"><HostProperties>'
+                      f'<tag name="host-ip">10.{h // 62500}.{h // 250 % 250}.{h % 250}</tag>'
+                      f'<tag name="host-fqdn">h{h}.corp.example</tag>'
+                      f'<tag name="operating-system">Linux Kernel 3.10</tag>'
+                      f'<tag name="Credentialed_Scan">{"true" if h % 2 else "false"}</tag></HostProperties>\n')
+            for pid, compliance, name, desc, sol, risk, cvss in rnd.sample(catalog, min(items, plugins)):
+                family = "Policy Compliance" if compliance else "General"
+                out.write(f'<ReportItem port="0" svc_name="general" protocol="tcp" severity="{rnd.randint(0, 4)}" '
+                          f'pluginID="{pid}" pluginName="{name}" pluginFamily="{family}">'
+                          f"<risk_factor>{risk}</risk_factor><description>{desc}</description>"
+                          f"<solution>{sol}</solution><cvss_base_score>{cvss}</cvss_base_score>"
+                          f"<cve>CVE-2021-{pid % 9000 + 1000}</cve>"
+                          f"<plugin_publication_date>2020/01/01</plugin_publication_date>"
+                          f"<plugin_output>{escape('pkg-' + str(rnd.random()) + ' <x>')}</plugin_output>")
+                if compliance:
+                    rule = f"{pid % 6 + 1}.{pid % 4 + 1}.{pid % 9 + 1}"
+                    out.write(f"<cm:compliance-check-name>{rule} Ensure setting {pid}</cm:compliance-check-name>"
+                              f"<cm:compliance-result>{rnd.choice(['PASSED', 'FAILED'])}</cm:compliance-result>"
+                              f"<cm:compliance-actual-value>value {rnd.randint(0, 3)}</cm:compliance-actual-value>"
+                              f"<cm:compliance-policy-value>expected</cm:compliance-policy-value>"
+                              f"<cm:compliance-solution>fix {rule}</cm:compliance-solution>")
+                out.write("</ReportItem>\n")
+            out.write("</ReportHost>\n")
+        out.write("</Report>\n</NessusClientData_v2>\n")
+
+
+def bench_rows(paths: List[Path], parser: str, repeat: int):
+    best, digest, count = float("inf"), "", 0
+    options = nessus.ParseOptions(parser=parser)
+    for _ in range(repeat):
+        h = hashlib.sha256()
+        count = 0
+        t0 = time.perf_counter()
+        for path in paths:
+            for row in nessus.iter_rows_from_file(path, options):
+                h.update(repr(nessus.row_values(row)).encode())
+                count += 1
+        best = min(best, time.perf_counter() - t0)
+        digest = h.hexdigest()
+    return best, count, digest
+
+
+def bench_items(paths: List[Path], parser: str, repeat: int):
+    best, count = float("inf"), 0
+    for _ in range(repeat):
+        count = 0
+        t0 = time.perf_counter()
+        for path in paths:
+            for item in nessus_to_md.iter_report_items(str(path), parser):
+                nessus_to_md.get_ns_text(item, "compliance-check-name")
+                count += 1
+        best = min(best, time.perf_counter() - t0)
+    return best, count
+
+
+def main(argv: List[str] | None = None) -> int:
+    p = argparse.ArgumentParser(description="ElementTree vs lxml parsing throughput.")
+    p.add_argument("--nessus", nargs="+", type=Path, help="Use these files instead of a synthetic corpus.")
+    p.add_argument("--hosts", type=int, default=1000)
+    p.add_argument("--items", type=int, default=100, help="ReportItems per host in the synthetic corpus.")
+    p.add_argument("--repeat", type=int, default=1, help="Runs per backend (best time is reported).")
+    args = p.parse_args(argv)
+
+    backends = ["etree"]
+    try:
+        nessus.resolve_parser("lxml")
+        backends.append("lxml")
+    except ImportError:
+        print("lxml is not installed: only the ElementTree backend is measured")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = args.nessus
+        if not paths:
+            paths = [Path(tmp) / "synthetic.nessus"]
+            write_synthetic(paths[0], args.hosts, args.items)
+        size_mb = sum(p.stat().st_size for p in paths) / 2 ** 20
+        print(f"corpus: {len(paths)} file(s), {size_mb:.1f} MB")
+
+        digests = {}
+        for backend in backends:
+            secs, rows, digest = bench_rows(paths, backend, args.repeat)
+            digests[backend] = digest
+            print(f"extrai_nessus  {backend:<6} {rows:>9,} rows  {secs:7.2f} s  "
+                  f"{rows / secs:>9,.0f} rows/s  {size_mb / secs:6.1f} MB/s")
+        for backend in backends:
+            secs, items = bench_items(paths, backend, args.repeat)
+            print(f"nessus_to_md   {backend:<6} {items:>9,} items {secs:7.2f} s  "
+                  f"{items / secs:>9,.0f} items/s {size_mb / secs:6.1f} MB/s")
+
+    if len(set(digests.values())) > 1:
+        print("ERROR: backends produced different rows", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Compare the memory held by N synthetic Nessus findings as row dicts (what
+extract_rows_from_file returns), as row value tuples and as a FindingTable.
+
+Rows mimic a real scan: a few hundred hosts, a plugin catalog with long
+descriptions/solutions, and fresh string objects per row (ElementTree creates a
+new str for every element's text, so nothing is shared between rows). Memory is
+measured with tracemalloc; the FindingTable must iterate back to the same
+tuples, otherwise the script exits with 1.
+
+Usage:
+  python benchmarks/bench_rows_memory.py               # 1,000,000 rows
+  python benchmarks/bench_rows_memory.py --rows 200000 --hosts 500 --plugins 2000
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import extrai_nessus as nessus  # noqa: E402
+
+
+def _fresh(s: str) -> str:
+    """A new str object equal to s (the parser never hands out shared strings)."""
+    return (s + ".")[:-1]
+
+
+def synthetic_rows(n_rows: int, n_hosts: int, n_plugins: int, seed: int = 0) -> Iterator[Tuple[object, ...]]:
+    rnd = random.Random(seed)
+    hosts = [
+        (f"scan_{h % 4}.nessus", f"10.{h // 250}.{h % 250}.1", f"host{h}.corp.example", f"HOST{h}",
+         "Linux Kernel 3.10.0-1160.el7.x86_64 on Oracle Linux 7", f"10.{h // 250}.{h % 250}.1",
+         "Yes" if h % 3 else "No", "root" if h % 3 else "")
+        for h in range(n_hosts)
+    ]
+    plugins = []
+    for k in range(n_plugins):
+        pid = str(20000 + k)
+        plugins.append((
+            str(rnd.choice([0, 1, 2, 3, 4])), rnd.choice(["None", "Low", "Medium", "High", "Critical"]), pid,
+            "; ".join(f"CVE-2021-{rnd.randint(1000, 9999)}" for _ in range(rnd.randint(0, 3))),
+            f"Oracle Linux 7 : package update ({pid})",
+            "Upgrade the affected packages. " * rnd.randint(1, 4),
+            "The remote host is missing one or more security updates. " * rnd.randint(5, 20),
+            rnd.choice([5.0, 7.5, 9.8, 0.0]), rnd.choice(["Yes", "No"]), "",
+            "2020/01/01", rnd.choice(["", "2019/12/30"]), rnd.choice(["", "2019/11/02"]),
+        ))
+    for i in range(n_rows):
+        file_name, ip, fqdn, netbios, os_name, ip_name, cred, user = hosts[i % n_hosts]
+        sev, risk, pid, cve, name, solution, desc, cvss, exploit, msf, ppub, patch, vpub = plugins[
+            rnd.randrange(n_plugins)]
+        output = f"Remote package installed : pkg-{rnd.randint(1, 10 ** 6)}.el7\nShould be : pkg-{i}.el7\n"
+        yield (
+            _fresh(file_name), _fresh(ip), _fresh(fqdn), _fresh(netbios), _fresh(os_name), _fresh(ip_name),
+            _fresh(sev), _fresh(risk), _fresh(pid), _fresh(cve), _fresh(name), output, _fresh(cred), _fresh(user),
+            _fresh(solution), _fresh(desc), cvss, _fresh(exploit), _fresh(msf), _fresh(ppub), _fresh(patch),
+            _fresh(vpub),
+        )
+
+
+def measure(label: str, build: Callable[[], object]) -> Tuple[object, Dict[str, float]]:
+    gc.collect()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    obj = build()
+    elapsed = time.perf_counter() - t0
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    stats = {"held_mb": current / 2 ** 20, "peak_mb": peak / 2 ** 20, "seconds": elapsed}
+    print(f"{label:<14} held {stats['held_mb']:9.1f} MB   peak {stats['peak_mb']:9.1f} MB   build {elapsed:6.1f} s")
+    return obj, stats
+
+
+def main(argv: List[str] | None = None) -> int:
+    p = argparse.ArgumentParser(description="Memory of row dicts vs tuples vs FindingTable.")
+    p.add_argument("--rows", type=int, default=1_000_000)
+    p.add_argument("--hosts", type=int, default=1_000)
+    p.add_argument("--plugins", type=int, default=3_000)
+    p.add_argument("--seed", type=int, default=0)
+    args = p.parse_args(argv)
+
+    def rows():
+        return synthetic_rows(args.rows, args.hosts, args.plugins, args.seed)
+
+    print(f"{args.rows:,} rows, {args.hosts:,} hosts, {args.plugins:,} plugins")
+    dicts, dict_stats = measure("dicts", lambda: [dict(zip(nessus.COLUMNS, v)) for v in rows()])
+    del dicts
+    tuples, tuple_stats = measure("tuples", lambda: list(rows()))
+    table, table_stats = measure("FindingTable", lambda: nessus.FindingTable.from_rows(rows()))
+
+    if list(table) != tuples:
+        print("ERROR: FindingTable does not round-trip the rows", file=sys.stderr)
+        return 1
+    print(f"FindingTable holds {dict_stats['held_mb'] / table_stats['held_mb']:.1f}x less than dicts, "
+          f"{tuple_stats['held_mb'] / table_stats['held_mb']:.1f}x less than tuples")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
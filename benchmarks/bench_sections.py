@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Compare the single-pass section parser (_iter_cis_items) against the previous
+multi-scan loop on the lines of a real CIS benchmark PDF.
+
+The PDF text is extracted once; only the parse step is timed. Both parsers must
+produce identical recommendation lists, otherwise the script exits with 1.
+
+Usage:
+  python benchmarks/bench_sections.py --pdf CIS_Microsoft_Windows_Server_2022_Benchmark_v4.0.0.pdf
+  python benchmarks/bench_sections.py --pdf big.pdf --repeat 5 --scale 4
+"""
+from __future__ import annotations
+
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import cis_pdf_common as conv  # noqa: E402
+
+
+# ------------------------------ Reference (previous loop) ------------------
+
+def _legacy_normalize(s: str) -> str:
+    s = s.replace("\u2028", " ").replace("\u00AD", "")
+    s = s.replace("\uf0b7", " ")
+    s = re.sub(r"[ \t]*\uf0b7[ \t]*", " ", s)
+    s = re.sub(r"\s+", " ", s)
+    return s.strip()
+
+
+_LEGACY_REGEXES = {name: re.compile(rf"^{re.escape(name)}:?$", re.IGNORECASE) for name in conv.SECTION_NAMES}
+
+
+def _legacy_section(line: str) -> str:
+    txt = line.strip()
+    for name, rx in _LEGACY_REGEXES.items():
+        if rx.match(txt):
+            return name
+    return ""
+
+
+def legacy_extract(lines: List[str]) -> List[Dict[str, str]]:
+    """The title / _next_id_or_end / _find_section_boundaries / _extract_block loop, as shipped before."""
+    total = len(lines)
+    out: List[Dict[str, str]] = []
+    i = 0
+    while i < total:
+        line = lines[i].strip()
+        if not conv.ID_STRICT_RE.match(line):
+            i += 1
+            continue
+        title_lines = [line]
+        j = i + 1
+        while j < total:
+            nxt = lines[j].strip()
+            if _legacy_section(nxt) or conv.ID_STRICT_RE.match(nxt):
+                break
+            if nxt:
+                title_lines.append(nxt)
+            j += 1
+        full_name = _legacy_normalize(" ".join(title_lines))
+
+        end_of_item = total
+        for p in range(j, total):
+            if conv.ID_STRICT_RE.match(lines[p].strip()):
+                end_of_item = p
+                break
+
+        indices = {name: -1 for name in conv.SECTION_NAMES}
+        for k in range(j, end_of_item):
+            sec = _legacy_section(lines[k])
+            if sec and indices[sec] == -1:
+                indices[sec] = k
+
+        present = sorted((s for s in conv.SECTION_NAMES if indices[s] != -1), key=lambda s: indices[s])
+        nxt_after = {}
+        for idx, sec in enumerate(present):
+            nxt_after[sec] = indices[present[idx + 1]] if idx + 1 < len(present) else end_of_item
+
+        bounds = {}
+        if indices["Remediation"] != -1:
+            end_r = indices["Default Value"] if indices["Default Value"] != -1 else nxt_after["Remediation"]
+            bounds["Remediation"] = (indices["Remediation"] + 1, end_r)
+        if indices["Default Value"] != -1:
+            end_dv = indices["References"] if indices["References"] != -1 else nxt_after["Default Value"]
+            bounds["Default Value"] = (indices["Default Value"] + 1, end_dv)
+        for sec in ["Profile Applicability", "Description", "Rationale", "Impact", "Audit"]:
+            if indices[sec] != -1:
+                bounds[sec] = (indices[sec] + 1, nxt_after[sec])
+
+        contents = {s: "" for s in conv.SECTION_NAMES}
+        for sec, (s, e) in bounds.items():
+            contents[sec] = "\n".join(_legacy_normalize(ln) for ln in lines[s:min(e, total)]).strip()
+
+        if contents["Remediation"].strip() or contents["Default Value"].strip():
+            item = {"ID": full_name.split()[0] if full_name else "", "Nome Completo": full_name}
+            for sec in conv.SECTION_NAMES[:-1]:
+                item[sec] = contents[sec]
+            out.append(item)
+        i = end_of_item
+    return out
+
+
+def single_pass(lines: List[str]) -> List[Dict[str, str]]:
+    return [item for _s, _e, item in conv._iter_cis_items(lines) if item is not None]
+
+
+# ------------------------------ Main ---------------------------------------
+
+def _best_of(fn, lines: List[str], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(lines)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description="Benchmark the CIS section parser.")
+    p.add_argument("--pdf", required=True, help="CIS benchmark PDF to extract lines from.")
+    p.add_argument("--repeat", type=int, default=3, help="Timed runs per parser (best is reported).")
+    p.add_argument("--scale", type=int, default=1, help="Concatenate the line stream N times.")
+    args = p.parse_args()
+
+    lines = conv._collect_all_lines(args.pdf) * max(1, args.scale)
+
+    if legacy_extract(lines) != single_pass(lines):
+        print("MISMATCH: parsers disagree on", args.pdf)
+        return 1
+
+    t_old = _best_of(legacy_extract, lines, args.repeat)
+    t_new = _best_of(single_pass, lines, args.repeat)
+    print(f"lines={len(lines)} | legacy={t_old:.3f}s | single-pass={t_new:.3f}s | speedup={t_old / t_new:.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark of the PDF and Nessus pipelines on a synthetic corpus.
+
+The corpus is generated in a temporary directory (or --workdir):
+  - a CIS-style PDF built with PyMuPDF: numbered IDs, the SECTION_NAMES headers,
+    "N | P a g e" footers, a dotted-leader ToC and an embedded outline;
+    a second copy without the outline exercises the dotted-leader ToC fallback;
+  - a .nessus export of N hosts x M ReportItems including cm: compliance items
+    (bench_nessus_backends.write_synthetic).
+
+Every stage runs in a fresh spawned process so its peak RSS is its own; setup
+(e.g. parsing the rows a writer consumes) is not timed. For each stage the best
+of --repeat runs is reported with wall/CPU seconds, units/s and MB/s of input.
+Results are written as JSON (--out); with --baseline a previous result file is
+compared and the script exits with 1 when a stage is slower than the threshold.
+
+Usage:
+  python benchmarks/bench_suite.py --out bench.json
+  python benchmarks/bench_suite.py --recs 1200 --hosts 500 --items 150 --repeat 3 --out new.json --baseline bench.json
+  python benchmarks/bench_suite.py --stages pdf.extrair_cis_sections nessus.extract_rows_from_file
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "OracleLinux7"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from run_metrics import peak_rss_mb, reset_peak_rss  # noqa: E402
+
+
+# ------------------------------ Corpus generators --------------------------
+
+PDF_LINES_PER_PAGE = 52
+SUBSECTIONS = ["Filesystem Configuration", "Software Updates", "Secure Boot Settings", "Process Hardening",
+               "Mandatory Access Control", "Command Line Warning Banners"]
+
+
+def write_cis_pdf(path: Path, recs: int, seed: int = 0, embedded_toc: bool = True) -> int:
+    """Write a CIS-like benchmark with `recs` recommendations; returns the page count."""
+    import cis_pdf_common as conv
+
+    rnd = random.Random(seed)
+    per_section = max(1, recs // 6)
+    entries: List[Tuple[str, str, bool]] = []   # (id, title, is_recommendation)
+    for s in range(1, 7):
+        entries.append((f"{s}", f"Section {s} Controls", False))
+        for k in range(per_section):
+            sub, rec = divmod(k, 10)
+            if rec == 0:
+                entries.append((f"{s}.{sub + 1}", SUBSECTIONS[sub % len(SUBSECTIONS)], False))
+            entries.append((f"{s}.{sub + 1}.{rec + 1}",
+                            f"Ensure setting {s}.{sub + 1}.{rec + 1} is configured (Automated)", True))
+
+    body: List[Tuple[str, str]] = []   # (line, id that starts here or "")
+    for sec_id, title, is_rec in entries:
+        body.append((f"{sec_id} {title}", sec_id))
+        if not is_rec:
+            body.append(("This section contains recommendations for the settings below.", ""))
+            continue
+        for header in conv.SECTION_NAMES:
+            body.append((f"{header}:", ""))
+            if header == "Profile Applicability":
+                body += [(" Level 1 - Server", ""), (" Level 1 - Workstation", "")]
+                continue
+            if header == "Audit":
+                body += [("Run the following command and verify the output:", ""),
+                         (f"# grep -E '^\\s*setting_{sec_id}' /etc/sysctl.conf", "")]
+            for _ in range(rnd.randint(2, 14)):
+                body.append((f"{header} text for {sec_id}: lorem ipsum dolor sit amet {rnd.random():.8f}", ""))
+        body += [("CIS Controls:", ""), ("Controls", ""), ("Version", ""), ("v8", ""),
+                 ("4.1 Establish and Maintain a Secure Configuration Process", "")]
+
+    toc_pages = -(-len(entries) // PDF_LINES_PER_PAGE)
+    body_pages = [body[i:i + PDF_LINES_PER_PAGE] for i in range(0, len(body), PDF_LINES_PER_PAGE)]
+    page_of: Dict[str, int] = {}
+    for pno, lines in enumerate(body_pages, start=toc_pages + 2):
+        for _, sec_id in lines:
+            if sec_id:
+                page_of.setdefault(sec_id, pno)
+
+    doc = conv.fitz.open()
+
+    def new_page(lines: List[str], pno: int) -> None:
+        page = doc.new_page(width=595, height=842)
+        page.insert_text((40, 40), "\n".join(lines), fontsize=8, lineheight=1.8)
+        page.insert_text((270, 830), f"{pno} | P a g e", fontsize=8)
+
+    new_page(["CIS Synthetic Linux Benchmark", "v1.0.0 - 01-01-2024"], 1)
+    toc_lines = [f"{sec_id} {title} {'.' * 12} {page_of[sec_id]}" for sec_id, title, _ in entries]
+    for k in range(toc_pages):
+        new_page(toc_lines[k * PDF_LINES_PER_PAGE:(k + 1) * PDF_LINES_PER_PAGE], k + 2)
+    for pno, lines in enumerate(body_pages, start=toc_pages + 2):
+        new_page([line for line, _ in lines], pno)
+    if embedded_toc:
+        doc.set_toc([[sec_id.count(".") + 1, f"{sec_id} {title}", page_of[sec_id]] for sec_id, title, _ in entries])
+    doc.save(str(path))
+    pages = doc.page_count
+    doc.close()
+    return pages
+
+
+def build_corpus(workdir: Path, recs: int, hosts: int, items: int) -> Dict[str, str]:
+    from bench_nessus_backends import write_synthetic
+
+    # Sizes are part of the names so a reused --workdir never mixes corpora
+    corpus = {"pdf": workdir / f"cis_{recs}.pdf", "pdf_no_toc": workdir / f"cis_{recs}_no_toc.pdf",
+              "nessus": workdir / f"synthetic_{hosts}x{items}.nessus"}
+    if not corpus["pdf"].exists():
+        write_cis_pdf(corpus["pdf"], recs)
+        write_cis_pdf(corpus["pdf_no_toc"], recs, embedded_toc=False)
+    if not corpus["nessus"].exists():
+        write_synthetic(corpus["nessus"], hosts, items)
+    return {k: str(v) for k, v in corpus.items()}
+
+
+# ------------------------------ Stages ---------------------------------------
+# Each stage does its untimed setup and returns (timed callable, input path).
+# The callable returns (units processed, unit name).
+
+def _stage_collect_all_lines(corpus, tmp):
+    import cis_pdf_common as conv
+
+    def run():
+        lines = conv._collect_all_lines(corpus["pdf"])
+        return len(lines), "lines"
+    return run, corpus["pdf"]
+
+
+def _stage_extrair_cis_sections(corpus, tmp):
+    import cis_pdf_common as conv
+
+    def run():
+        return len(conv.extrair_cis_sections(corpus["pdf"])), "items"
+    return run, corpus["pdf"]
+
+
+def _toc_stage(key):
+    def stage(corpus, tmp):
+        import cis_pdf_common as conv
+
+        def run():
+            df = conv.extrair_indice_pdf(corpus[key])
+            return (0 if df is None else len(df)), "entries"
+        return run, corpus[key]
+    return stage
+
+
+def _stage_salvar_em_markdown(corpus, tmp):
+    import converte_pdf_md as conv
+    dados = conv.extrair_cis_sections(corpus["pdf"])
+
+    def run():
+        conv.salvar_em_markdown(dados, str(Path(tmp) / "md"), force=True)
+        return len(dados), "items"
+    return run, corpus["pdf"]
+
+
+def _stage_salvar_em_excel(corpus, tmp):
+    import converte_pdf_xlsx as conv
+    dados = conv.extrair_cis_sections(corpus["pdf"])
+    indice = conv.extrair_indice_pdf(corpus["pdf"])
+
+    def run():
+        conv.salvar_em_excel(dados, str(Path(tmp) / "cis.xlsx"), indice_df=indice)
+        return len(dados), "items"
+    return run, corpus["pdf"]
+
+
+def _stage_extract_rows(corpus, tmp):
+    import extrai_nessus as nessus
+
+    def run():
+        return len(nessus.extract_rows_from_file(Path(corpus["nessus"]))), "rows"
+    return run, corpus["nessus"]
+
+
+def _stage_write_to_xlsx(corpus, tmp):
+    import extrai_nessus as nessus
+    table = nessus.extract_table_from_file(Path(corpus["nessus"]))
+
+    def run():
+        return nessus.write_to_xlsx(table, Path(tmp) / "nessus.xlsx"), "rows"
+    return run, corpus["nessus"]
+
+
+def _stage_nessus_to_md(corpus, tmp):
+    import nessus_to_md
+
+    def run():
+        argv = sys.argv
+        sys.argv = ["nessus_to_md.py", corpus["nessus"], "-o", str(Path(tmp) / "rules")]
+        try:
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                nessus_to_md.main()
+        finally:
+            sys.argv = argv
+        return len(list(Path(tmp, "rules").glob("*.md"))), "rules"
+    return run, corpus["nessus"]
+
+
+def _stage_nessus_to_md_aggregate(corpus, tmp):
+    import nessus_to_md
+
+    def run():
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            nessus_to_md.run_aggregate([corpus["nessus"]], str(Path(tmp) / "summary"), "etree")
+        return len(list(Path(tmp, "summary").glob("*.md"))), "rules"
+    return run, corpus["nessus"]
+
+
+STAGES: Dict[str, Callable] = {
+    "pdf._collect_all_lines": _stage_collect_all_lines,
+    "pdf.extrair_cis_sections": _stage_extrair_cis_sections,
+    "pdf.extrair_indice_pdf[embedded]": _toc_stage("pdf"),
+    "pdf.extrair_indice_pdf[dotted]": _toc_stage("pdf_no_toc"),
+    "pdf.salvar_em_markdown": _stage_salvar_em_markdown,
+    "pdf.salvar_em_excel": _stage_salvar_em_excel,
+    "nessus.extract_rows_from_file": _stage_extract_rows,
+    "nessus.write_to_xlsx": _stage_write_to_xlsx,
+    "nessus_to_md": _stage_nessus_to_md,
+    "nessus_to_md.aggregate": _stage_nessus_to_md_aggregate,
+}
+
+
+def run_stage(name: str, corpus: Dict[str, str], repeat: int) -> Dict[str, object]:
+    """Child-process entry point: set up, time `repeat` runs, report the best one."""
+    logging.disable(logging.CRITICAL)
+    with tempfile.TemporaryDirectory() as tmp:
+        run, input_path = STAGES[name](corpus, tmp)
+        setup_rss = peak_rss_mb()
+        if reset_peak_rss():
+            setup_rss = peak_rss_mb()
+        best_wall, best_cpu, units, unit = float("inf"), 0.0, 0, ""
+        for _ in range(repeat):
+            w0, c0 = time.perf_counter(), time.process_time()
+            units, unit = run()
+            wall, cpu = time.perf_counter() - w0, time.process_time() - c0
+            if wall < best_wall:
+                best_wall, best_cpu = wall, cpu
+    input_mb = os.path.getsize(input_path) / 2 ** 20
+    peak = peak_rss_mb()
+    return {
+        "wall_s": round(best_wall, 4), "cpu_s": round(best_cpu, 4),
+        "units": units, "unit": unit, "units_per_s": round(units / best_wall, 1),
+        "input_mb": round(input_mb, 2), "mb_per_s": round(input_mb / best_wall, 2),
+        "peak_rss_mb": round(peak, 1), "stage_rss_mb": round(peak - setup_rss, 1),
+    }
+
+
+# ------------------------------ Reporting ------------------------------------
+
+def compare(results: Dict[str, Dict[str, object]], baseline: Dict[str, Dict[str, object]],
+            threshold: float) -> List[str]:
+    """Stages whose wall time or peak RSS grew by more than `threshold` (relative)."""
+    regressions = []
+    for name, new in results.items():
+        old = baseline.get(name)
+        if not old:
+            continue
+        for key in ("wall_s", "peak_rss_mb"):
+            if old[key] and new[key] > old[key] * (1 + threshold):
+                regressions.append(f"{name}: {key} {old[key]} -> {new[key]} (+{new[key] / old[key] - 1:.0%})")
+    return regressions
+
+
+def main(argv: List[str] | None = None) -> int:
+    p = argparse.ArgumentParser(description="Benchmark the PDF converters, extrai_nessus and nessus_to_md.")
+    p.add_argument("--recs", type=int, default=600, help="Recommendations in the synthetic PDF.")
+    p.add_argument("--hosts", type=int, default=300, help="ReportHosts in the synthetic .nessus file.")
+    p.add_argument("--items", type=int, default=100, help="ReportItems per host.")
+    p.add_argument("--repeat", type=int, default=1, help="Runs per stage (best time is reported).")
+    p.add_argument("--stages", nargs="+", choices=sorted(STAGES), help="Only run these stages.")
+    p.add_argument("--workdir", type=Path, help="Keep the generated corpus here and reuse it on later runs.")
+    p.add_argument("--out", type=Path, help="Write the results as JSON.")
+    p.add_argument("--baseline", type=Path, help="Compare against a previous --out file.")
+    p.add_argument("--threshold", type=float, default=0.15,
+                   help="Relative slowdown or RSS growth that counts as a regression (default 0.15).")
+    args = p.parse_args(argv)
+
+    with contextlib.ExitStack() as stack:
+        workdir = args.workdir or Path(stack.enter_context(tempfile.TemporaryDirectory()))
+        workdir.mkdir(parents=True, exist_ok=True)
+        t0 = time.perf_counter()
+        corpus = build_corpus(workdir, args.recs, args.hosts, args.items)
+        print(f"corpus in {workdir} ({time.perf_counter() - t0:.1f} s): "
+              + ", ".join(f"{Path(v).name} {os.path.getsize(v) / 2 ** 20:.1f} MB" for v in corpus.values()))
+
+        results: Dict[str, Dict[str, object]] = {}
+        ctx = multiprocessing.get_context("spawn")
+        for name in args.stages or STAGES:
+            with ctx.Pool(1) as pool:
+                stats = pool.apply(run_stage, (name, corpus, args.repeat))
+            results[name] = stats
+            print(f"{name:<34} {stats['wall_s']:8.3f} s  cpu {stats['cpu_s']:8.3f} s  "
+                  f"{stats['units']:>9,} {stats['unit']:<7} {stats['units_per_s']:>11,.0f}/s  "
+                  f"{stats['mb_per_s']:7.1f} MB/s  peak RSS {stats['peak_rss_mb']:7.1f} MB (+{stats['stage_rss_mb']:.1f})")
+
+    report = {
+        "meta": {"date": datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(),
+                 "platform": platform.platform(), "cpus": os.cpu_count(),
+                 "recs": args.recs, "hosts": args.hosts, "items": args.items, "repeat": args.repeat},
+        "stages": results,
+    }
+    if args.out:
+        args.out.write_text(json.dumps(report, indent=1), encoding="utf-8")
+        print(f"results written to {args.out}")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        if baseline.get("meta", {}).get("recs") != args.recs or baseline.get("meta", {}).get("hosts") != args.hosts:
+            print("WARNING: baseline was measured on a different corpus size")
+        regressions = compare(results, baseline.get("stages", {}), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+        print(f"no regression above {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
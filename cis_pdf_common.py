@@ -0,0 +1,1033 @@
+# cis_pdf_common.py
+# CIS benchmark PDF extraction shared by converte_pdf_md.py and converte_pdf_xlsx.py:
+# page text collection, extraction cache, section parser, incremental (--state) and
+# selective (--ids / --sections) extraction, ToC reader and the --batch driver.
+# Requires: pandas, PyMuPDF (pymupdf)
+
+import argparse
+import fnmatch
+import glob
+import gzip
+import hashlib
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Tuple
+import re
+
+# --- PyMuPDF import (works across versions) ---
+try:
+    import pymupdf as fitz  # modern import name
+except Exception:
+    import fitz  # legacy module name
+
+import pandas as pd
+
+from run_metrics import RunMetrics, stage
+
+# === Known section headers in CIS PDFs ===
+SECTION_NAMES = [
+    "Profile Applicability",
+    "Description",
+    "Rationale",
+    "Impact",
+    "Audit",
+    "Remediation",
+    "Default Value",
+    "References",
+]
+# One alternation for all headers; the matching group (s0..s7) gives the SECTION_NAMES index
+SECTION_ANY_RE = re.compile(
+    "^(?:" + "|".join(rf"(?P<s{k}>{re.escape(name)})" for k, name in enumerate(SECTION_NAMES)) + "):?$",
+    re.IGNORECASE,
+)
+
+# Section IDs
+ID_RELAXED_RE = re.compile(r"^(\d+(?:\.\d+){0,6})\b")   # allow "2" or "2.1.1"
+ID_STRICT_RE = re.compile(r"^(\d+(?:\.\d+)+)\b")        # at least one dot
+
+# Fallback ToC detectors
+TOC_LINE_RE = re.compile(r"^(\d+(?:\.\d+){0,6})\s+(.+?)\s*$")
+# NEW: capture dotted leaders + final page number (e.g., "6.2.16 Title ....... 597")
+TOC_DOTTED_RE = re.compile(
+    r"^(\d+(?:\.\d+){0,6})\s+(.+?)\s*\.{2,}\s*(\d+)\s*$"
+)
+# Fallback ToC scan stops after this many consecutive pages without dotted leaders
+TOC_GAP_PAGES = 2
+
+logger = logging.getLogger("cis_pdf_parser")
+
+
+# ----------------------- Logging -----------------------
+def setup_logging(verbosity: int, log_file: str | None) -> None:
+    level = logging.INFO if verbosity <= 0 else logging.DEBUG
+    fmt = "%(asctime)s | %(levelname)s | %(message)s"
+    datefmt = "%Y-%m-%d %H:%M:%S"
+
+    for h in list(logger.handlers):
+        logger.removeHandler(h)
+
+    logger.setLevel(level)
+    console = logging.StreamHandler(sys.stdout)
+    console.setLevel(level)
+    console.setFormatter(logging.Formatter(fmt=fmt, datefmt=datefmt))
+    logger.addHandler(console)
+
+    if log_file:
+        fh = logging.FileHandler(log_file, encoding="utf-8")
+        fh.setLevel(level)
+        fh.setFormatter(logging.Formatter(fmt=fmt, datefmt=datefmt))
+        logger.addHandler(fh)
+
+    logger.debug("Logger initialized (level=%s, log_file=%s)", logging.getLevelName(level), log_file)
+
+
+# ----------------------- Helpers -----------------------
+def _normalize_line(s: str) -> str:
+    # Mantido o comportamento original + remoção explícita do bullet U+F0B7 ("")
+    s = s.replace("\u2028", " ").replace("\u00AD", "")
+    # remove/normaliza o bullet "" (alguns PDFs usam esse codepoint via fontes Wingdings/Symbol)
+    s = s.replace("\uf0b7", " ")
+    # normaliza espaços: split()/join equivale a re.sub(r"\s+", " ") + strip(), sem regex
+    return " ".join(s.split())
+
+
+def _section_of(txt: str) -> str:
+    """
+    Return the section name when the stripped line `txt` is a section header, else "".
+    """
+    m = SECTION_ANY_RE.match(txt)
+    return SECTION_NAMES[int(m.lastgroup[1:])] if m else ""
+
+
+# ----------------------- Document session -----------------------
+PDF_REF_RE = re.compile(r"\b(\d+) \d+ R\b")  # indirect reference inside an object's source
+
+
+class PdfSession:
+    """
+    One lazily opened fitz document shared by section extraction and the ToC readers.
+    Raw page text is kept per page, so the ToC fallback scan and the section parser
+    never extract the same page twice.
+    """
+
+    def __init__(self, pdf_path: str, metrics: RunMetrics | None = None) -> None:
+        self.pdf_path = pdf_path
+        self.metrics = metrics
+        self._doc = None
+        self._text: Dict[int, str] = {}
+        self._digests: Dict[int, str] = {}
+
+    @property
+    def doc(self):
+        if self._doc is None:
+            logger.info("Opening PDF: %s", self.pdf_path)
+            with stage(self.metrics, "open"):
+                self._doc = fitz.open(self.pdf_path)
+            logger.info("PDF opened. Pages: %d", self._doc.page_count)
+        return self._doc
+
+    @property
+    def page_count(self) -> int:
+        return self.doc.page_count
+
+    def page_text(self, pno: int) -> str:
+        """Raw text of 0-based page `pno` (extracted once)."""
+        text = self._text.get(pno)
+        if text is None:
+            text = self._text[pno] = self.doc.load_page(pno).get_text()
+        return text
+
+    def page_fingerprint(self, pno: int) -> str:
+        """
+        sha1 of what the text of page `pno` is made of: its still-compressed content streams
+        plus its resources (fonts with their ToUnicode maps and programs, form XObjects),
+        with references resolved so renumbered objects hash the same. Much cheaper than
+        extracting the text; objects shared between pages are hashed once.
+        """
+        doc = self.doc
+        page = doc.load_page(pno)
+        digest = hashlib.sha1()
+        for xref in page.get_contents():
+            digest.update(doc.xref_stream_raw(xref))
+        xref, resources = page.xref, ("null", "null")
+        while xref:  # /Resources may be inherited from a /Pages node
+            resources = doc.xref_get_key(xref, "Resources")
+            if resources[0] != "null":
+                break
+            parent = doc.xref_get_key(xref, "Parent")
+            xref = int(parent[1].split()[0]) if parent[0] == "xref" else 0
+        digest.update(self._resolve_refs(resources[1]).encode("utf-8"))
+        return digest.hexdigest()
+
+    def _resolve_refs(self, source: str) -> str:
+        return PDF_REF_RE.sub(lambda m: self._object_digest(int(m.group(1))), source)
+
+    def _object_digest(self, xref: int) -> str:
+        """sha1 of object `xref` (source with references resolved, plus its raw stream)."""
+        cached = self._digests.get(xref)
+        if cached is None:
+            self._digests[xref] = "cycle"
+            digest = hashlib.sha1(self._resolve_refs(self.doc.xref_object(xref, compressed=True)).encode("utf-8"))
+            if self.doc.xref_is_stream(xref):
+                digest.update(self.doc.xref_stream_raw(xref))
+            cached = self._digests[xref] = digest.hexdigest()
+        return cached
+
+    def close(self) -> None:
+        if self._doc is not None:
+            self._doc.close()
+            self._doc = None
+        self._text.clear()
+        self._digests.clear()
+
+    def __enter__(self) -> "PdfSession":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+@contextmanager
+def _session_for(pdf_path: str, session: PdfSession | None) -> Iterator[PdfSession]:
+    """Use the caller's session, or open (and close) a private one."""
+    if session is not None:
+        yield session
+    else:
+        with PdfSession(pdf_path) as own:
+            yield own
+
+
+# ----------------------- PDF text collection + footer cleaner -----------------------
+def _clean_rodape_lines(lines: List[str]) -> List[str]:
+    cleaned = []
+    skip_controls_block = False
+    for line in lines:
+        txt = line.strip()
+
+        # Remove page footer like "21 | P a g e" or "Page 21"
+        if re.match(r"^\d+\s*\|\s*P\s*a\s*g\s*e$", txt, re.IGNORECASE) or re.match(r"^Page\s+\d+$", txt, re.IGNORECASE):
+            continue
+
+        # Remove "CIS Controls" footer block lines
+        if re.match(r"^CIS\s+Controls:?\s*$", txt, re.IGNORECASE):
+            skip_controls_block = True
+            continue
+
+        if skip_controls_block:
+            if txt.lower() in {"controls", "version", "control", "ig 1 ig 2 ig 3", "v8", 'v8"'}:
+                continue
+            skip_controls_block = False
+
+        cleaned.append(line)
+    return cleaned
+
+
+def _page_ranges(page_count: int, parts: int) -> List[Tuple[int, int]]:
+    """
+    Split pages [0, page_count) into at most `parts` contiguous (start, end) ranges.
+    """
+    parts = max(1, min(parts, page_count))
+    step, extra = divmod(page_count, parts)
+    ranges: List[Tuple[int, int]] = []
+    start = 0
+    for k in range(parts):
+        end = start + step + (1 if k < extra else 0)
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+PageCost = Tuple[float, float, float, float]  # text extraction wall/CPU, footer cleaning wall/CPU
+
+
+def _timed_page_lines(get_text: Callable[[], str]) -> Tuple[List[str], PageCost]:
+    """Footer-cleaned lines of one page and what extracting and cleaning them cost."""
+    w0, c0 = time.perf_counter(), time.process_time()
+    text = get_text()
+    w1, c1 = time.perf_counter(), time.process_time()
+    lines = _clean_rodape_lines(text.splitlines())
+    return lines, (w1 - w0, c1 - c0, time.perf_counter() - w1, time.process_time() - c1)
+
+
+def _extract_pages(pdf_path: str, pnos: List[int]) -> Tuple[List[List[str]], List[PageCost]]:
+    """
+    Worker entry point: open a private document handle and return the cleaned
+    lines of pages `pnos`, one list per page, plus each page's cost.
+    """
+    pages: List[List[str]] = []
+    costs: List[PageCost] = []
+    with fitz.open(pdf_path) as doc:
+        for pno in pnos:
+            lines, cost = _timed_page_lines(lambda: doc.load_page(pno).get_text())
+            pages.append(lines)
+            costs.append(cost)
+    return pages, costs
+
+
+def _collect_page_lines(pdf_path: str, workers: int = 1, session: PdfSession | None = None,
+                        metrics: RunMetrics | None = None, pnos: List[int] | None = None) -> List[List[str]]:
+    """
+    Return the footer-cleaned lines of every page (or only of the 0-based pages
+    `pnos`), in that order.
+    With workers > 1 the pages are split into contiguous chunks that are extracted
+    in a process pool; the result is identical to the serial path.
+    With `metrics`, every page's cost is recorded; footer cleaning is a stage of
+    its own only in the serial path (in the pool it runs in the workers).
+    """
+    pages: List[List[str]] = []
+    with _session_for(pdf_path, session) as sess:
+        if pnos is None:
+            pnos = list(range(sess.page_count))
+        if workers <= 1 or len(pnos) < 2:
+            for pno in pnos:
+                lines, cost = _timed_page_lines(lambda: sess.page_text(pno))
+                pages.append(lines)
+                if metrics:
+                    metrics.add_time("footer cleaning", cost[2], cost[3])
+                    metrics.record("pages", f"page {pno + 1}", cost[0] + cost[2])
+                if len(pages) % 10 == 0:
+                    logger.debug("Processed %d pages", len(pages))
+            return pages
+
+    # Several chunks per worker so one slow chunk does not stall the pool
+    chunks = [pnos[s:e] for s, e in _page_ranges(len(pnos), workers * 4)]
+    logger.info("Extracting %d pages with %d workers (%d ranges)", len(pnos), workers, len(chunks))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for chunk_pnos, (chunk, costs) in zip(chunks, pool.map(_extract_pages, [pdf_path] * len(chunks), chunks)):
+            if metrics:
+                for pno, cost in zip(chunk_pnos, costs):
+                    metrics.record("pages", f"page {pno + 1}", cost[0] + cost[2])
+            pages.extend(chunk)
+            logger.debug("Processed %d pages", len(pages))
+    return pages
+
+
+def _collect_all_lines(pdf_path: str, workers: int = 1, cache: "ExtractionCache | None" = None,
+                       session: PdfSession | None = None, metrics: RunMetrics | None = None) -> List[str]:
+    pages = cache.load(pdf_path, "lines") if cache else None
+    if pages is None:
+        pages = _collect_page_lines(pdf_path, workers=workers, session=session, metrics=metrics)
+        if cache:
+            cache.store(pdf_path, "lines", pages)
+    lines: List[str] = []
+    for page_lines in pages:
+        lines.extend(page_lines)
+        lines.append("")
+    logger.info("Collected %d lines from PDF", len(lines))
+    return lines
+
+
+# ----------------------- Extraction cache -----------------------
+# Bump LINES_CACHE_VERSION when page text collection / _clean_rodape_lines changes and
+# SECTIONS_CACHE_VERSION when _normalize_line or the section parser changes.
+LINES_CACHE_VERSION = 1
+SECTIONS_CACHE_VERSION = 1
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "cis_pdf_parser"
+
+
+class ExtractionCache:
+    """
+    On-disk cache keyed by the PDF content hash plus a parser version.
+    Entries are gzip'ed JSON: "lines" holds the footer-cleaned lines per page and
+    "sections" the parsed recommendations. Eviction drops entries older than
+    max_age_days, then least recently used ones until the cache fits in max_mb.
+    """
+
+    def __init__(self, cache_dir: str | Path = DEFAULT_CACHE_DIR, refresh: bool = False,
+                 max_mb: float = 512, max_age_days: float = 30) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.refresh = refresh
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.max_age_s = max_age_days * 86400
+        self._digests: Dict[str, str] = {}
+
+    def digest(self, pdf_path: str) -> str:
+        if pdf_path not in self._digests:
+            h = hashlib.sha256()
+            with open(pdf_path, "rb") as fh:
+                for chunk in iter(lambda: fh.read(1 << 20), b""):
+                    h.update(chunk)
+            self._digests[pdf_path] = h.hexdigest()
+        return self._digests[pdf_path]
+
+    def _entry(self, pdf_path: str, kind: str) -> Path:
+        version = f"{LINES_CACHE_VERSION}" if kind == "lines" else f"{LINES_CACHE_VERSION}.{SECTIONS_CACHE_VERSION}"
+        return self.cache_dir / f"{self.digest(pdf_path)}.{kind}.v{version}.json.gz"
+
+    def load(self, pdf_path: str, kind: str):
+        if self.refresh:
+            return None
+        entry = self._entry(pdf_path, kind)
+        try:
+            with gzip.open(entry, "rt", encoding="utf-8") as fh:
+                data = json.load(fh)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning("Ignoring unreadable cache entry %s: %s", entry, e)
+            return None
+        os.utime(entry)  # recency for LRU eviction
+        logger.info("Cache hit (%s): %s", kind, entry.name)
+        return data
+
+    def store(self, pdf_path: str, kind: str, data) -> None:
+        entry = self._entry(pdf_path, kind)
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile(mode="wb", suffix=".tmp", delete=False, dir=str(self.cache_dir)) as tmpf:
+                tmp_path = Path(tmpf.name)
+                with gzip.GzipFile(fileobj=tmpf, mode="wb", compresslevel=1) as gz:
+                    gz.write(json.dumps(data, ensure_ascii=False).encode("utf-8"))
+            os.replace(tmp_path, entry)
+            logger.debug("Cached %s: %s", kind, entry)
+        except Exception as e:
+            logger.warning("Could not write cache entry %s: %s", entry, e)
+            return
+        self.evict()
+
+    def evict(self) -> None:
+        now = time.time()
+        entries = []
+        for p in self.cache_dir.glob("*.json.gz"):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            if now - st.st_mtime > self.max_age_s:
+                p.unlink(missing_ok=True)
+                logger.debug("Evicted (age): %s", p.name)
+            else:
+                entries.append((st.st_mtime, st.st_size, p))
+        total = sum(size for _, size, _ in entries)
+        for _, size, p in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            p.unlink(missing_ok=True)
+            total -= size
+            logger.debug("Evicted (size): %s", p.name)
+
+    def clear(self) -> None:
+        for p in self.cache_dir.glob("*.json.gz"):
+            p.unlink(missing_ok=True)
+
+
+# ----------------------- CIS sections extractor (existing behavior) -----------------------
+def _finish_item(title_lines: List[str], body: List[str], first: Dict[str, int]) -> Dict[str, str] | None:
+    """
+    Build the recommendation dict for one item.
+    `body` holds the raw lines from the first section header up to the next ID line and
+    `first` maps each section name to the index of its first header inside `body`.
+    Returns None when the item has neither Remediation nor Default Value content.
+    """
+    full_name = _normalize_line(" ".join(title_lines))
+    end_of_item = len(body)
+
+    # Each present section runs until the next present header (by position)
+    present = sorted(first, key=first.get)
+    next_boundary_after = {}
+    for idx, sec in enumerate(present):
+        next_boundary_after[sec] = first[present[idx + 1]] if idx + 1 < len(present) else end_of_item
+
+    boundaries: Dict[str, Tuple[int, int]] = {}
+    if "Remediation" in first:
+        end_r = first["Default Value"] if "Default Value" in first else next_boundary_after["Remediation"]
+        boundaries["Remediation"] = (first["Remediation"] + 1, end_r)
+    if "Default Value" in first:
+        end_dv = first["References"] if "References" in first else next_boundary_after["Default Value"]
+        boundaries["Default Value"] = (first["Default Value"] + 1, end_dv)
+    for sec in ["Profile Applicability", "Description", "Rationale", "Impact", "Audit"]:
+        if sec in first:
+            boundaries[sec] = (first[sec] + 1, next_boundary_after[sec])
+
+    contents = {s: "" for s in SECTION_NAMES}
+    for sec, (sidx, eidx) in boundaries.items():
+        contents[sec] = "\n".join(_normalize_line(ln) for ln in body[sidx:eidx]).strip()
+
+    if not any(contents[s].strip() for s in ["Remediation", "Default Value"]):
+        return None
+    return {
+        "ID": full_name.split()[0] if full_name else "",
+        "Nome Completo": full_name,
+        "Profile Applicability": contents["Profile Applicability"],
+        "Description": contents["Description"],
+        "Rationale": contents["Rationale"],
+        "Impact": contents["Impact"],
+        "Audit": contents["Audit"],
+        "Remediation": contents["Remediation"],
+        "Default Value": contents["Default Value"],
+    }
+
+
+def _iter_cis_items(lines: List[str]) -> Iterator[Tuple[int, int, Dict[str, str] | None]]:
+    """
+    Single forward pass over `lines`: every line is classified once (ID, section header
+    or text) and an item is emitted as soon as the next ID line (or the end) closes it.
+    Yields (start, end, item) with lines[start:end] being the item's span; item is None
+    for entries that are not kept (see _finish_item).
+    """
+    start = -1
+    title_lines: List[str] = []
+    in_title = False
+    body: List[str] = []
+    first: Dict[str, int] = {}
+
+    for idx, raw in enumerate(lines):
+        txt = raw.strip()
+        if ID_STRICT_RE.match(txt):
+            if start >= 0:
+                yield start, idx, _finish_item(title_lines, body, first)
+            start, title_lines, in_title, body, first = idx, [txt], True, [], {}
+            continue
+        if start < 0:
+            continue
+
+        sec = _section_of(txt)
+        if sec:
+            in_title = False
+            if sec not in first:
+                first[sec] = len(body)
+        elif in_title:
+            if txt:
+                title_lines.append(txt)
+            continue
+        body.append(raw)
+
+    if start >= 0:
+        yield start, len(lines), _finish_item(title_lines, body, first)
+
+
+def extrair_cis_sections(pdf_path: str, workers: int = 1, cache: ExtractionCache | None = None,
+                         session: PdfSession | None = None,
+                         metrics: RunMetrics | None = None) -> List[Dict[str, str]]:
+    start_t = time.perf_counter()
+    if cache:
+        cached = cache.load(pdf_path, "sections")
+        if cached is not None:
+            logger.info("Loaded %d items from cache in %.3fs", len(cached), time.perf_counter() - start_t)
+            return cached
+    with stage(metrics, "page extraction", exclude=("open", "footer cleaning")):
+        lines = _collect_all_lines(pdf_path, workers=workers, cache=cache, session=session, metrics=metrics)
+    resultados: List[Dict[str, str]] = []
+
+    logger.info("Starting parse loop over %d lines", len(lines))
+    found_items = 0
+    kept_items = 0
+
+    with stage(metrics, "parsing"):
+        last = time.perf_counter()
+        for start, _end, item in _iter_cis_items(lines):
+            found_items += 1
+            if item is not None:
+                resultados.append(item)
+                kept_items += 1
+            if metrics:
+                now = time.perf_counter()
+                metrics.record("items", item["ID"] if item else lines[start].strip(), now - last)
+                last = now
+
+    elapsed = time.perf_counter() - start_t
+    logger.info("Parse completed. Found items: %d | Kept: %d | Duration: %.3fs",
+                found_items, kept_items, elapsed)
+    if cache:
+        cache.store(pdf_path, "sections", resultados)
+    return resultados
+
+
+# ----------------------- Incremental re-extraction (--state) -----------------------
+# Bump REVISION_STATE_VERSION when the state layout changes; the cache versions cover
+# changes to the page text collection and the section parser.
+REVISION_STATE_VERSION = 2
+
+
+def _id_key(cis_id: str) -> Tuple[int, ...]:
+    return tuple(int(x) for x in cis_id.split(".") if x.isdigit())
+
+
+def _state_version() -> str:
+    return f"{REVISION_STATE_VERSION}.{LINES_CACHE_VERSION}.{SECTIONS_CACHE_VERSION}"
+
+
+def _load_revision_state(state_path: Path) -> Dict[str, object] | None:
+    try:
+        with gzip.open(state_path, "rt", encoding="utf-8") as fh:
+            data = json.load(fh)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning("Ignoring unreadable state file %s: %s", state_path, e)
+        return None
+    if data.get("version") != _state_version():
+        logger.info("State file %s was written by another parser version; doing a full parse", state_path)
+        return None
+    return data
+
+
+def _save_revision_state(state_path: Path, state: Dict[str, object]) -> None:
+    state_path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(mode="wb", suffix=".tmp", delete=False, dir=str(state_path.parent)) as tmpf:
+        tmp_path = Path(tmpf.name)
+        with gzip.GzipFile(fileobj=tmpf, mode="wb", compresslevel=1, mtime=0) as gz:
+            gz.write(json.dumps(state, ensure_ascii=False).encode("utf-8"))
+    try:
+        os.replace(tmp_path, state_path)
+    except Exception:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def _item_spans(lines: List[str]) -> List[Tuple[int, int]]:
+    """(start, end) of every item exactly as _iter_cis_items delimits them: from one ID line to the next."""
+    starts = [idx for idx, raw in enumerate(lines) if ID_STRICT_RE.match(raw.strip())]
+    return list(zip(starts, starts[1:] + [len(lines)]))
+
+
+def _change_report(old: Dict[str, object] | None, recs: List[Dict[str, object]]) -> Dict[str, object]:
+    """Added / removed / modified recommendation IDs (with the fields that differ) and counts per benchmark section."""
+    def by_id(entries) -> Dict[str, Dict[str, object]]:
+        return {e["item"]["ID"]: e for e in entries if e["item"]}
+
+    before = by_id(old["recs"]) if old else {}
+    after = by_id(recs)
+    added = sorted(set(after) - set(before), key=_id_key)
+    removed = sorted(set(before) - set(after), key=_id_key)
+    modified = []
+    for cis_id in sorted(set(after) & set(before), key=_id_key):
+        old_item, new_item = before[cis_id]["item"], after[cis_id]["item"]
+        fields = [k for k in new_item if old_item.get(k) != new_item[k]]
+        if fields:
+            modified.append({"id": cis_id, "fields": fields, "pages": after[cis_id]["pages"]})
+
+    sections: Dict[str, Dict[str, int]] = {}
+    for kind, ids in (("added", added), ("removed", removed), ("modified", [m["id"] for m in modified])):
+        for cis_id in ids:
+            counts = sections.setdefault(cis_id.split(".")[0], {"added": 0, "removed": 0, "modified": 0})
+            counts[kind] += 1
+    return {
+        "previous_pdf": old["pdf"] if old else None,
+        "added": added,
+        "removed": removed,
+        "modified": modified,
+        "sections": {k: sections[k] for k in sorted(sections, key=_id_key)},
+    }
+
+
+def extrair_cis_sections_incremental(pdf_path: str, state_path: str, workers: int = 1,
+                                     session: PdfSession | None = None,
+                                     metrics: RunMetrics | None = None) -> Tuple[List[Dict[str, str]], Dict[str, object]]:
+    """
+    extrair_cis_sections against the state a previous revision left in `state_path`:
+      - pages whose content stream is byte-identical to a page of the previous run
+        reuse its cleaned lines (no text extraction);
+      - items whose line span is unchanged reuse the previous result (no re-parse).
+    The items are the same as a full extrair_cis_sections run. The state is rewritten
+    for this revision; returns (items, change report against the previous revision).
+    """
+    start_t = time.perf_counter()
+    old = _load_revision_state(Path(state_path))
+    with _session_for(pdf_path, session) as sess:
+        page_count = sess.page_count
+        raw_hashes = [sess.page_fingerprint(pno) for pno in range(page_count)]
+        with stage(metrics, "page extraction", exclude=("open", "footer cleaning")):
+            if old is None:
+                pages = _collect_page_lines(pdf_path, workers=workers, session=sess, metrics=metrics)
+                extracted = page_count
+            else:
+                known = dict(zip(old["raw"], old["lines"]))
+                pages = [known.get(raw) for raw in raw_hashes]
+                changed = [pno for pno, page_lines in enumerate(pages) if page_lines is None]
+                fresh = _collect_page_lines(pdf_path, workers=workers, session=sess, metrics=metrics, pnos=changed)
+                for pno, page_lines in zip(changed, fresh):
+                    pages[pno] = page_lines
+                extracted = len(changed)
+
+    lines: List[str] = []
+    line_page: List[int] = []
+    for pno, page_lines in enumerate(pages, start=1):
+        lines.extend(page_lines)
+        lines.append("")
+        line_page.extend([pno] * (len(page_lines) + 1))
+
+    previous = {rec["hash"]: rec["item"] for rec in old["recs"]} if old else {}
+    recs: List[Dict[str, object]] = []
+    resultados: List[Dict[str, str]] = []
+    reparsed = 0
+    with stage(metrics, "parsing"):
+        for start, end in _item_spans(lines):
+            digest = hashlib.sha1("\n".join(lines[start:end]).encode("utf-8")).hexdigest()
+            if digest in previous:
+                item = previous[digest]
+            else:
+                item = next(_iter_cis_items(lines[start:end]))[2]
+                reparsed += 1
+            recs.append({"hash": digest, "pages": [line_page[start], line_page[end - 1]], "item": item})
+            if item is not None:
+                resultados.append(item)
+
+    report = _change_report(old, recs)
+    report.update(pdf=Path(pdf_path).name, pages=page_count, pages_extracted=extracted,
+                  items=len(recs), items_reparsed=reparsed)
+    _save_revision_state(Path(state_path), {"version": _state_version(), "pdf": Path(pdf_path).name,
+                                            "raw": raw_hashes, "lines": pages, "recs": recs})
+    logger.info("Incremental parse | pages: %d (extracted %d) | items: %d (re-parsed %d) | "
+                "added: %d | removed: %d | modified: %d | Duration: %.3fs",
+                page_count, extracted, len(recs), reparsed, len(report["added"]), len(report["removed"]),
+                len(report["modified"]), time.perf_counter() - start_t)
+    return resultados, report
+
+
+def write_change_report(report: Dict[str, object], state_path: str, report_path: str | None) -> None:
+    """Write the change report as JSON (default: <state name>_changes.json next to the state file)."""
+    if not report_path:
+        state = Path(state_path)
+        report_path = str(state.with_name(state.name.split(".")[0] + "_changes.json"))
+    Path(report_path).parent.mkdir(parents=True, exist_ok=True)
+    Path(report_path).write_text(json.dumps(report, indent=1, ensure_ascii=False), encoding="utf-8")
+    logger.info("Change report written to %s", report_path)
+
+
+# ----------------------- Selective extraction (--ids / --sections) -----------------------
+def id_selector(ids: List[str] | None, sections: List[str] | None) -> Callable[[str], bool] | None:
+    """
+    Matcher for --ids (exact IDs or fnmatch patterns such as "5.2.*") and --sections
+    (a section ID selects itself and everything below it). None when nothing is selected.
+    """
+    patterns = list(ids or [])
+    for sec in sections or []:
+        sec = sec.rstrip(".*")
+        patterns += [sec, sec + ".*"]
+    if not patterns:
+        return None
+    return lambda cis_id: any(fnmatch.fnmatchcase(cis_id, pat) for pat in patterns)
+
+
+def warn_unmatched_ids(ids: List[str] | None, dados: List[Dict[str, str]]) -> None:
+    """Log the exact --ids that produced no item."""
+    found = {item["ID"] for item in dados}
+    absent = [i for i in ids or [] if not any(c in i for c in "*?[") and i not in found]
+    if absent:
+        logger.warning("No recommendation found for: %s", ", ".join(absent))
+
+
+def _toc_windows(indice_df: pd.DataFrame, selector: Callable[[str], bool],
+                 page_count: int) -> Tuple[List[Tuple[int, int]], set]:
+    """
+    0-based inclusive page windows covering the selected ToC entries: an entry runs from
+    its page to the page of the next entry, where the ID line that closes it is printed.
+    Returns (merged windows, selected ToC IDs that open an item, i.e. have an ID line).
+    """
+    entries = sorted(((int(r.Page), _id_key(r.ID), r.ID) for r in indice_df.itertuples()
+                      if r.ID and 1 <= int(r.Page) <= page_count))
+    spans, selected = [], set()
+    for idx, (page, _key, cis_id) in enumerate(entries):
+        if selector(cis_id):
+            if ID_STRICT_RE.match(cis_id):
+                selected.add(cis_id)
+            end = entries[idx + 1][0] if idx + 1 < len(entries) else page_count
+            spans.append((page - 1, end - 1))
+    windows: List[Tuple[int, int]] = []
+    for first, last in sorted(spans):
+        if windows and first <= windows[-1][1] + 1:
+            windows[-1] = (windows[-1][0], max(windows[-1][1], last))
+        else:
+            windows.append((first, last))
+    return windows, selected
+
+
+def extrair_cis_sections_selected(pdf_path: str, selector: Callable[[str], bool], max_toc_pages: int = 60,
+                                  cache: ExtractionCache | None = None, session: PdfSession | None = None,
+                                  metrics: RunMetrics | None = None) -> List[Dict[str, str]]:
+    """
+    The items of extrair_cis_sections whose ID matches `selector`, reading only the pages
+    the ToC (extrair_indice_pdf) places them on. A window is extended page by page while
+    a selected item is still open at its end; when a selected ToC ID is not found where
+    the ToC says (or there is no usable ToC) the whole PDF is parsed and filtered instead.
+    """
+    start_t = time.perf_counter()
+    if cache:
+        cached = cache.load(pdf_path, "sections")
+        if cached is not None:
+            logger.info("Selected items taken from the cached full parse")
+            return [item for item in cached if selector(item["ID"])]
+
+    with _session_for(pdf_path, session) as sess:
+        with stage(metrics, "toc", exclude=("open",)):
+            indice_df = extrair_indice_pdf(pdf_path, MAX_TOC_PAGES=max_toc_pages, session=sess)
+        page_count = sess.page_count
+        windows, expected = _toc_windows(indice_df, selector, page_count) if indice_df is not None else ([], set())
+        if not windows:
+            logger.warning("No ToC entry matches the selection; parsing the whole PDF")
+            return [item for item in extrair_cis_sections(pdf_path, cache=cache, session=sess, metrics=metrics)
+                    if selector(item["ID"])]
+
+        pages: Dict[int, List[str]] = {}
+
+        def page_lines(pno: int) -> List[str]:
+            if pno not in pages:
+                pages[pno], cost = _timed_page_lines(lambda: sess.page_text(pno))
+                if metrics:
+                    metrics.add_time("footer cleaning", cost[2], cost[3])
+                    metrics.record("pages", f"page {pno + 1}", cost[0] + cost[2])
+            return pages[pno]
+
+        resultados: List[Dict[str, str]] = []
+        seen = set()
+        for first, last in windows:
+            while True:
+                with stage(metrics, "page extraction", exclude=("open", "footer cleaning")):
+                    lines: List[str] = []
+                    for pno in range(first, last + 1):
+                        lines.extend(page_lines(pno))
+                        lines.append("")
+                with stage(metrics, "parsing"):
+                    items = list(_iter_cis_items(lines))
+                # The last item is only complete once the next ID line (or the end of the PDF) is read
+                if items and items[-1][1] == len(lines) and last + 1 < page_count \
+                        and selector(lines[items[-1][0]].split()[0]):
+                    last += 1
+                    continue
+                break
+            for start, _end, item in items:
+                seen.add(lines[start].split()[0])
+                if item is not None and selector(item["ID"]):
+                    resultados.append(item)
+
+    missing = expected - seen
+    if missing:
+        logger.warning("ToC pages do not match the document for %d selected ID(s) (e.g. %s); parsing the whole PDF",
+                       len(missing), min(missing, key=_id_key))
+        return [item for item in extrair_cis_sections(pdf_path, cache=cache, session=session,
+                                                      metrics=metrics)
+                if selector(item["ID"])]
+    logger.info("Selective parse | pages read: %d of %d | items: %d | Duration: %.3fs",
+                len(pages), page_count, len(resultados), time.perf_counter() - start_t)
+    return resultados
+
+
+# ----------------------- NEW: Table of Contents extraction -----------------------
+def extrair_indice_pdf(pdf_path: str, MAX_TOC_PAGES: int = 60, session: PdfSession | None = None) -> pd.DataFrame | None:
+    """
+    Extract the PDF Table of Contents into columns: Level, ID, Title, Page.
+    Strategy:
+      1) Try embedded ToC via doc.get_toc().
+      2) Fallback: scan at most the first MAX_TOC_PAGES pages, accept ONLY lines
+         with dotted leaders and a trailing page number, and set Page from that.
+         The scan stops once TOC_GAP_PAGES pages in a row have no such line.
+    Pass `session` to reuse an open document (and page text already extracted).
+    """
+    def _cleanup_toc_title(title: str) -> str:
+        s = _normalize_line(title)
+        s = re.sub(r"\.{2,}\s*\d+\s*$", "", s)   # remove leaders + page num
+        s = s.strip(" .")
+        return s
+
+    def _toc_df_from_list(toc_list) -> pd.DataFrame:
+        rows = []
+        for e in toc_list:
+            if isinstance(e, dict):
+                level = int(e.get("level", 0))
+                title = _normalize_line(str(e.get("title", "")))
+                page = int(e.get("page", 0))
+            else:
+                level = int(e[0]) if len(e) > 0 else 0
+                title = _normalize_line(str(e[1])) if len(e) > 1 else ""
+                page = int(e[2]) if len(e) > 2 else 0
+            m = ID_RELAXED_RE.match(title)
+            sec_id = m.group(1) if m else ""
+            rows.append({"Level": max(1, sec_id.count(".") + 1) if sec_id else level or 1,
+                         "ID": sec_id, "Title": _cleanup_toc_title(title), "Page": page})
+        return pd.DataFrame(rows, columns=["Level", "ID", "Title", "Page"])
+
+    def _looks_like_noise(title: str) -> bool:
+        t = title.strip()
+        if not t:
+            return True
+        if re.search(r"\bP\s*a\s*g\s*e\b", t, re.IGNORECASE):
+            return True
+        return False
+
+    def _toc_df_fallback_scan(sess: PdfSession, max_pages: int) -> pd.DataFrame | None:
+        rows, seen = [], set()
+        last = min(max_pages, sess.page_count)
+        pages_without_leaders = 0
+        scanned = 0
+        for pno in range(1, last + 1):
+            scanned = pno
+            page_has_leaders = False
+            for raw in sess.page_text(pno - 1).splitlines():
+                s = _normalize_line(raw)
+                if not s or _looks_like_noise(s):
+                    continue
+                # REQUIRE dotted leaders + trailing page number
+                md = TOC_DOTTED_RE.match(s)
+                if not md:
+                    continue
+                page_has_leaders = True
+                sec_id, title, page_num = md.group(1), _cleanup_toc_title(md.group(2)), int(md.group(3))
+
+                # sanity checks
+                if page_num < 1 or page_num > sess.page_count:
+                    continue
+                if not re.fullmatch(r"\d+(?:\.\d+){0,6}", sec_id):
+                    continue
+                if not re.search(r"[A-Za-z]", title):
+                    continue
+
+                level = sec_id.count(".") + 1
+                key = (sec_id, title)
+                if key in seen:
+                    continue
+                seen.add(key)
+                rows.append({"Level": level, "ID": sec_id, "Title": title, "Page": page_num})
+
+            # Stop once the ToC has clearly ended
+            if page_has_leaders:
+                pages_without_leaders = 0
+            elif rows:
+                pages_without_leaders += 1
+                if pages_without_leaders >= TOC_GAP_PAGES:
+                    break
+        logger.debug("ToC fallback scanned %d of at most %d pages", scanned, last)
+        if not rows:
+            return None
+
+        def _natkey(sec: str):
+            return tuple(int(x) for x in sec.split(".") if x.isdigit())
+
+        rows.sort(key=lambda r: (_natkey(r["ID"]), r["Page"]))
+        return pd.DataFrame(rows, columns=["Level", "ID", "Title", "Page"])
+
+    with _session_for(pdf_path, session) as sess:
+        # Try embedded ToC first
+        try:
+            try:
+                toc_list = sess.doc.get_toc()
+            except Exception:
+                toc_list = []
+            if toc_list:
+                df = _toc_df_from_list(toc_list)
+                if not df.empty:
+                    logger.info("Extracted %d ToC entries from embedded ToC.", len(df))
+                    return df
+        except Exception as e:
+            logger.warning("Embedded ToC read failed: %s", e)
+
+        # Fallback regex scan (front matter only; dotted leaders required)
+        df_fb = _toc_df_fallback_scan(sess, MAX_TOC_PAGES)
+        if df_fb is not None and not df_fb.empty:
+            logger.info("Built %d ToC entries via fallback scan (first %d pages max).", len(df_fb), MAX_TOC_PAGES)
+            return df_fb
+
+    logger.info("No ToC could be extracted.")
+    return None
+
+
+# ----------------------- Batch conversion (--batch) -----------------------
+ConvertFn = Callable[..., Tuple[int, int]]  # _convert_pdf(pdf, target, args, workers, cache, metrics) -> (items, pages)
+
+
+def open_cache(args: argparse.Namespace) -> ExtractionCache | None:
+    if args.no_cache:
+        return None
+    return ExtractionCache(args.cache_dir, refresh=args.refresh_cache,
+                           max_mb=args.cache_max_mb, max_age_days=args.cache_max_age_days)
+
+
+def _batch_inputs(specs: List[str]) -> List[Path]:
+    """PDFs named by directories (their *.pdf files) or glob patterns, in name order, without duplicates."""
+    found: Dict[Path, None] = {}
+    for spec in specs:
+        path = Path(spec)
+        matches = path.iterdir() if path.is_dir() else (Path(m) for m in glob.glob(spec, recursive=True))
+        for m in matches:
+            if m.is_file() and m.suffix.lower() == ".pdf":
+                found.setdefault(m.resolve(), None)
+    return sorted(found, key=lambda p: (p.name.lower(), str(p)))
+
+
+def _batch_convert(convert: ConvertFn, pdf_file: str, target: str, args: argparse.Namespace) -> Dict[str, object]:
+    """Pool entry point: convert one PDF of a batch. Errors are returned, not raised."""
+    t0 = time.perf_counter()
+    result: Dict[str, object] = {"pdf": pdf_file, "output": target, "items": 0, "pages": 0,
+                                 "seconds": 0.0, "error": ""}
+    try:
+        items, pages = convert(pdf_file, target, args, workers=1, cache=open_cache(args))
+        result.update(items=items, pages=pages)
+    except Exception as e:
+        logger.error("Conversion failed for %s: %s", pdf_file, e)
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = round(time.perf_counter() - t0, 3)
+    return result
+
+
+def run_batch(args: argparse.Namespace, root: str, convert: ConvertFn, suffix: str = "",
+              metrics: RunMetrics | None = None) -> int:
+    """
+    Convert every PDF named by --batch with `convert` into `root`/<pdf name>`suffix`,
+    one PDF per worker process, largest files first for load balance. `convert` is the
+    script's module-level _convert_pdf, so pool workers can import it. A failing PDF
+    does not stop the others.
+    Logs a summary table and writes it to batch_summary.csv. Returns the exit code.
+    """
+    pdfs = _batch_inputs(args.batch)
+    if not pdfs:
+        logger.error("No PDF matched --batch %s", " ".join(args.batch))
+        return 1
+    root_path = Path(root)
+    root_path.mkdir(parents=True, exist_ok=True)
+
+    # One output per benchmark; same-named PDFs from different folders get a numeric suffix
+    targets: Dict[Path, str] = {}
+    used = set()
+    for pdf in pdfs:
+        name, k = pdf.stem, 2
+        while name.lower() in used:
+            name, k = f"{pdf.stem}_{k}", k + 1
+        used.add(name.lower())
+        targets[pdf] = str(root_path / (name + suffix))
+
+    workers = max(1, min(args.workers, len(pdfs)))
+    largest_first = sorted(pdfs, key=lambda p: p.stat().st_size, reverse=True)
+    logger.info("Batch: %d PDFs | workers: %d | output: %s", len(pdfs), workers, root_path)
+    results: Dict[Path, Dict[str, object]] = {}
+    t0 = time.perf_counter()
+    with stage(metrics, "batch"):
+        if workers == 1:
+            for pdf in largest_first:
+                results[pdf] = _batch_convert(convert, str(pdf), targets[pdf], args)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {pool.submit(_batch_convert, convert, str(pdf), targets[pdf], args): pdf for pdf in largest_first}
+                for fut in as_completed(futures):
+                    pdf = futures[fut]
+                    try:
+                        results[pdf] = fut.result()
+                    except Exception as e:  # the worker process itself died
+                        logger.error("Conversion failed for %s: %s", pdf, e)
+                        results[pdf] = {"pdf": str(pdf), "output": targets[pdf], "items": 0, "pages": 0,
+                                        "seconds": 0.0, "error": f"{type(e).__name__}: {e}"}
+                    logger.info("Finished %s (%d of %d)", pdf.name, len(results), len(pdfs))
+    elapsed = time.perf_counter() - t0
+
+    rows = [results[pdf] for pdf in pdfs]
+    failed = [r for r in rows if r["error"]]
+    width = max(len("PDF"), max(len(Path(str(r["pdf"])).name) for r in rows))
+    logger.info("%-*s %7s %7s %9s  %s", width, "PDF", "Items", "Pages", "Seconds", "Status")
+    for r in rows:
+        logger.info("%-*s %7d %7d %9.2f  %s", width, Path(str(r["pdf"])).name, r["items"], r["pages"],
+                    r["seconds"], r["error"] or "OK")
+        if metrics:
+            metrics.record("benchmarks", Path(str(r["pdf"])).name, float(r["seconds"]))
+    summary_csv = root_path / "batch_summary.csv"
+    pd.DataFrame(rows, columns=["pdf", "output", "items", "pages", "seconds", "error"]).to_csv(
+        summary_csv, index=False, encoding="utf-8")
+    logger.info("Batch done | PDFs: %d | failed: %d | items: %d | pages: %d | wall: %.1fs | summary: %s",
+                len(rows), len(failed), sum(int(r["items"]) for r in rows), sum(int(r["pages"]) for r in rows),
+                elapsed, summary_csv)
+    return 1 if failed else 0
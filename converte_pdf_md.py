@@ -3,285 +3,133 @@
 # pip install pandas pymupdf
 
 import argparse
-import logging
-import sys
+import cProfile
+import hashlib
+import json
+import os
+import tempfile
 import time
 from pathlib import Path
 from typing import Dict, List, Tuple
 import re
 
-# --- PyMuPDF import (works across versions) ---
-try:
-    import pymupdf as fitz  # modern import name
-except Exception:
-    import fitz  # legacy module name
-
 import pandas as pd
 
-# === Known section headers in CIS PDFs ===
-SECTION_NAMES = [
-    "Profile Applicability",
-    "Description",
-    "Rationale",
-    "Impact",
-    "Audit",
-    "Remediation",
-    "Default Value",
-    "References",
-]
-SECTION_REGEXES = {name: re.compile(rf"^{re.escape(name)}:?$", re.IGNORECASE) for name in SECTION_NAMES}
-
-# Section IDs
-ID_RELAXED_RE = re.compile(r"^(\d+(?:\.\d+){0,6})\b")   # allow "2" or "2.1.1"
-ID_STRICT_RE = re.compile(r"^(\d+(?:\.\d+)+)\b")        # at least one dot
-
-# Fallback ToC detectors
-TOC_LINE_RE = re.compile(r"^(\d+(?:\.\d+){0,6})\s+(.+?)\s*$")
-# NEW: capture dotted leaders + final page number (e.g., "6.2.16 Title ....... 597")
-TOC_DOTTED_RE = re.compile(
-    r"^(\d+(?:\.\d+){0,6})\s+(.+?)\s*\.{2,}\s*(\d+)\s*$"
+from cis_pdf_common import (
+    DEFAULT_CACHE_DIR,
+    ExtractionCache,
+    PdfSession,
+    extrair_cis_sections,
+    extrair_cis_sections_incremental,
+    extrair_cis_sections_selected,
+    extrair_indice_pdf,
+    id_selector,
+    logger,
+    open_cache,
+    run_batch,
+    setup_logging,
+    warn_unmatched_ids,
+    write_change_report,
 )
+from run_metrics import RunMetrics, stage
 
-logger = logging.getLogger("cis_pdf_parser")
-
-
-# ----------------------- Logging -----------------------
-def setup_logging(verbosity: int, log_file: str | None) -> None:
-    level = logging.INFO if verbosity <= 0 else logging.DEBUG
-    fmt = "%(asctime)s | %(levelname)s | %(message)s"
-    datefmt = "%Y-%m-%d %H:%M:%S"
-
-    for h in list(logger.handlers):
-        logger.removeHandler(h)
-
-    logger.setLevel(level)
-    console = logging.StreamHandler(sys.stdout)
-    console.setLevel(level)
-    console.setFormatter(logging.Formatter(fmt=fmt, datefmt=datefmt))
-    logger.addHandler(console)
-
-    if log_file:
-        fh = logging.FileHandler(log_file, encoding="utf-8")
-        fh.setLevel(level)
-        fh.setFormatter(logging.Formatter(fmt=fmt, datefmt=datefmt))
-        logger.addHandler(fh)
-
-    logger.debug("Logger initialized (level=%s, log_file=%s)", logging.getLevelName(level), log_file)
-
-
-# ----------------------- Helpers -----------------------
-def _normalize_line(s: str) -> str:
-    # Mantido o comportamento original + remoção explícita do bullet U+F0B7 ("")
-    s = s.replace("\u2028", " ").replace("\u00AD", "")
-    # remove/normaliza o bullet "" (alguns PDFs usam esse codepoint via fontes Wingdings/Symbol)
-    s = s.replace("\uf0b7", " ")
-    # colapsa eventuais ocorrências repetidas do bullet + espaços
-    s = re.sub(r"[ \t]*\uf0b7[ \t]*", " ", s)
-    # normaliza espaços
-    s = re.sub(r"\s+", " ", s)
-    return s.strip()
-
-
-def _starts_with_section(line: str) -> str:
-    txt = line.strip()
-    for name, rx in SECTION_REGEXES.items():
-        if rx.match(txt):
-            return name
-    return ""
-
-
-def _find_section_boundaries(lines: List[str], start_idx: int, end_idx: int) -> Dict[str, int]:
-    indices = {name: -1 for name in SECTION_NAMES}
-    for j in range(start_idx, end_idx):
-        raw = lines[j].strip()
-        if not raw:
-            continue
-        if ID_STRICT_RE.match(raw) and j != start_idx:
-            break
-        sec = _starts_with_section(raw)
-        if sec and indices[sec] == -1:
-            indices[sec] = j
-    return indices
-
-
-def _next_id_or_end(lines: List[str], start: int, end_idx: int) -> int:
-    for p in range(start, end_idx):
-        if ID_STRICT_RE.match(lines[p].strip()):
-            return p
-    return end_idx
-
-
-def _extract_block(lines: List[str], start: int, end: int) -> str:
-    if start < 0:
-        return ""
-    end = min(end, len(lines))
-    block = "\n".join(_normalize_line(ln) for ln in lines[start:end])
-    return block.strip()
-
-
-# ----------------------- PDF text collection + footer cleaner -----------------------
-def _clean_rodape_lines(lines: List[str]) -> List[str]:
-    cleaned = []
-    skip_controls_block = False
-    for line in lines:
-        txt = line.strip()
-
-        # Remove page footer like "21 | P a g e" or "Page 21"
-        if re.match(r"^\d+\s*\|\s*P\s*a\s*g\s*e$", txt, re.IGNORECASE) or re.match(r"^Page\s+\d+$", txt, re.IGNORECASE):
-            continue
-
-        # Remove "CIS Controls" footer block lines
-        if re.match(r"^CIS\s+Controls:?\s*$", txt, re.IGNORECASE):
-            skip_controls_block = True
-            continue
-
-        if skip_controls_block:
-            if txt.lower() in {"controls", "version", "control", "ig 1 ig 2 ig 3", "v8", 'v8"'}:
-                continue
-            skip_controls_block = False
-
-        cleaned.append(line)
-    return cleaned
+# ----------------------- NEW: Save to Markdown files -----------------------
+MANIFEST_NAME = ".manifest.json"
 
 
-def _collect_all_lines(pdf_path: str) -> List[str]:
-    logger.info("Opening PDF: %s", pdf_path)
-    lines: List[str] = []
-    with fitz.open(pdf_path) as doc:
-        logger.info("PDF opened. Pages: %d", doc.page_count)
-        for pno, page in enumerate(doc, start=1):
-            text = page.get_text()
-            page_lines = _clean_rodape_lines(text.splitlines())
-            lines.extend(page_lines)
-            lines.append("")
-            if pno % 10 == 0:
-                logger.debug("Processed %d pages (cumulative lines: %d)", pno, len(lines))
-    logger.info("Collected %d lines from PDF", len(lines))
-    return lines
-
-
-# ----------------------- CIS sections extractor (existing behavior) -----------------------
-def extrair_cis_sections(pdf_path: str) -> List[Dict[str, str]]:
-    start_t = time.perf_counter()
-    lines = _collect_all_lines(pdf_path)
-    total = len(lines)
-    resultados: List[Dict[str, str]] = []
-
-    logger.info("Starting parse loop over %d lines", total)
-    found_items = 0
-    kept_items = 0
-
-    i = 0
-    while i < total:
-        line = lines[i].strip()
-
-        if ID_STRICT_RE.match(line):
-            found_items += 1
-            title_lines = [line]
-            j = i + 1
-            while j < total:
-                nxt = lines[j].strip()
-                if _starts_with_section(nxt) or ID_STRICT_RE.match(nxt):
-                    break
-                if nxt:
-                    title_lines.append(nxt)
-                j += 1
-            full_name = _normalize_line(" ".join(title_lines))
-
-            end_of_item = _next_id_or_end(lines, j, total)
-            indices = _find_section_boundaries(lines, j, end_of_item)
-
-            boundaries: Dict[str, Tuple[int, int]] = {}
-            present_sections = [s for s in SECTION_NAMES if indices[s] != -1]
-            present_sections_sorted = sorted(present_sections, key=lambda s: indices[s])
-
-            next_boundary_after = {}
-            for idx, sec in enumerate(present_sections_sorted):
-                start_at = indices[sec]
-                if idx + 1 < len(present_sections_sorted):
-                    next_boundary_after[start_at] = indices[present_sections_sorted[idx + 1]]
-                else:
-                    next_boundary_after[start_at] = end_of_item
-
-            if indices["Remediation"] != -1:
-                start_r = indices["Remediation"] + 1
-                end_r = indices["Default Value"] if indices["Default Value"] != -1 else next_boundary_after[indices["Remediation"]]
-                boundaries["Remediation"] = (start_r, end_r)
-
-            if indices["Default Value"] != -1:
-                start_dv = indices["Default Value"] + 1
-                end_dv = indices["References"] if indices["References"] != -1 else next_boundary_after[indices["Default Value"]]
-                boundaries["Default Value"] = (start_dv, end_dv)
-
-            for sec in ["Profile Applicability", "Description", "Rationale", "Impact", "Audit"]:
-                if indices[sec] != -1 and sec not in boundaries:
-                    start = indices[sec] + 1
-                    end = next_boundary_after[indices[sec]]
-                    boundaries[sec] = (start, end)
-
-            contents = {s: "" for s in SECTION_NAMES}
-            for sec, (sidx, eidx) in boundaries.items():
-                contents[sec] = _extract_block(lines, sidx, eidx)
-
-            if any(contents[s].strip() for s in ["Remediation", "Default Value"]):
-                first_token = full_name.split()[0] if full_name else ""
-                resultados.append({
-                    "ID": first_token,
-                    "Nome Completo": full_name,
-                    "Profile Applicability": contents.get("Profile Applicability", ""),
-                    "Description": contents.get("Description", ""),
-                    "Rationale": contents.get("Rationale", ""),
-                    "Impact": contents.get("Impact", ""),
-                    "Audit": contents.get("Audit", ""),
-                    "Remediation": contents.get("Remediation", ""),
-                    "Default Value": contents.get("Default Value", ""),
-                })
-                kept_items += 1
-
-            i = end_of_item
-            continue
+def _load_manifest(output_path: Path) -> Dict[str, str]:
+    try:
+        data = json.loads((output_path / MANIFEST_NAME).read_text(encoding="utf-8"))
+        return {str(k): str(v) for k, v in data.get("files", {}).items()}
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logger.warning("Ignoring unreadable manifest in %s: %s", output_path, e)
+        return {}
 
-        i += 1
 
-    elapsed = time.perf_counter() - start_t
-    logger.info("Parse completed. Found items: %d | Kept: %d | Duration: %.3fs",
-                found_items, kept_items, elapsed)
-    return resultados
+def _write_text_atomic(file_path: Path, text: str) -> None:
+    """Write via a temp file in the same directory + rename, so readers never see partial files."""
+    with tempfile.NamedTemporaryFile(mode="w", encoding="utf-8", suffix=".tmp", delete=False,
+                                     dir=str(file_path.parent)) as tmpf:
+        tmp_path = Path(tmpf.name)
+        tmpf.write(text)
+    try:
+        os.replace(tmp_path, file_path)
+    except Exception:
+        tmp_path.unlink(missing_ok=True)
+        raise
 
 
-# ----------------------- NEW: Save to Markdown files -----------------------
-def salvar_em_markdown(lista_dados: List[Dict[str, str]], output_dir: str) -> None:
+def salvar_em_markdown(lista_dados: List[Dict[str, str]], output_dir: str,
+                       force: bool = False, prune_stale: bool = False, partial: bool = False) -> int:
     """
     Save each CIS recommendation as a separate markdown file.
     Filename format: {ID}.md (e.g., 1.1.5.md)
+
+    A manifest (MANIFEST_NAME) keeps the SHA-256 of every file written, so files
+    whose content did not change are left untouched (mtime included) unless
+    `force` is set. IDs present in the previous manifest but gone from this run are
+    reported, or deleted with `prune_stale`. With `partial` (--ids/--sections) the run
+    only covers some IDs, so the others keep their manifest entries and are never
+    reported or pruned as stale. Returns the number of files written.
     """
     output_path = Path(output_dir)
     output_path.mkdir(parents=True, exist_ok=True)
-    
-    files_created = 0
-    
+
+    # Last item wins for duplicated IDs, exactly as when every file was rewritten
+    contents: Dict[str, str] = {}
     for item in lista_dados:
         # Get the ID for filename
         cis_id = item['ID']
         if not cis_id:
             logger.warning("Skipping item with empty ID: %s", item.get('Nome Completo', 'Unknown'))
             continue
-            
-        # Create filename with just the ID
+        contents[cis_id] = _build_markdown_content(item)
+
+    old_manifest = _load_manifest(output_path)
+    new_manifest: Dict[str, str] = {}
+    files_written = 0
+    files_unchanged = 0
+
+    for cis_id, md_content in contents.items():
         file_path = output_path / f"{cis_id}.md"
-        
-        # Build markdown content
-        md_content = _build_markdown_content(item)
-        
-        # Write to file
+        digest = hashlib.sha256(md_content.encode("utf-8")).hexdigest()
+        new_manifest[cis_id] = digest
+
+        if not force and old_manifest.get(cis_id) == digest and file_path.exists():
+            files_unchanged += 1
+            continue
+
         try:
-            file_path.write_text(md_content, encoding="utf-8")
-            files_created += 1
-            logger.debug("Created markdown file: %s", file_path)
+            _write_text_atomic(file_path, md_content)
+            files_written += 1
+            logger.debug("Wrote markdown file: %s", file_path)
         except Exception as e:
+            new_manifest.pop(cis_id, None)
             logger.error("Failed to write file %s: %s", file_path, e)
-    
-    logger.info("Created %d markdown files in directory: %s", files_created, output_path)
+
+    missing = sorted(set(old_manifest) - set(contents))
+    stale = [] if partial else missing
+    if partial:
+        new_manifest.update((cis_id, old_manifest[cis_id]) for cis_id in missing)
+    for cis_id in stale:
+        stale_path = output_path / f"{cis_id}.md"
+        if prune_stale:
+            stale_path.unlink(missing_ok=True)
+            logger.info("Removed stale markdown file: %s", stale_path)
+        else:
+            new_manifest[cis_id] = old_manifest[cis_id]
+            logger.warning("Stale markdown file (ID no longer in the PDF): %s", stale_path)
+
+    if new_manifest != old_manifest:
+        _write_text_atomic(output_path / MANIFEST_NAME,
+                           json.dumps({"files": dict(sorted(new_manifest.items()))}, indent=1))
+
+    logger.info("Markdown files in %s | written: %d | unchanged: %d | stale: %d%s",
+                output_path, files_written, files_unchanged, len(stale),
+                " (removed)" if prune_stale and stale else "")
+    return files_written
 
 
 def _create_safe_id(id_str: str) -> str:
@@ -328,110 +176,6 @@ def _build_markdown_content(item: Dict[str, str]) -> str:
     return "\n".join(lines)
 
 
-# ----------------------- NEW: Table of Contents extraction -----------------------
-def extrair_indice_pdf(pdf_path: str, MAX_TOC_PAGES: int = 60) -> pd.DataFrame | None:
-    """
-    Extract the PDF Table of Contents into columns: Level, ID, Title, Page.
-    Strategy:
-      1) Try embedded ToC via doc.get_toc().
-      2) Fallback: scan only the first MAX_TOC_PAGES pages, accept ONLY lines
-         with dotted leaders and a trailing page number, and set Page from that.
-    """
-    def _cleanup_toc_title(title: str) -> str:
-        s = _normalize_line(title)
-        s = re.sub(r"\.{2,}\s*\d+\s*$", "", s)   # remove leaders + page num
-        s = s.strip(" .")
-        return s
-
-    def _toc_df_from_list(toc_list) -> pd.DataFrame:
-        rows = []
-        for e in toc_list:
-            if isinstance(e, dict):
-                level = int(e.get("level", 0))
-                title = _normalize_line(str(e.get("title", "")))
-                page = int(e.get("page", 0))
-            else:
-                level = int(e[0]) if len(e) > 0 else 0
-                title = _normalize_line(str(e[1])) if len(e) > 1 else ""
-                page = int(e[2]) if len(e) > 2 else 0
-            m = ID_RELAXED_RE.match(title)
-            sec_id = m.group(1) if m else ""
-            rows.append({"Level": max(1, sec_id.count(".") + 1) if sec_id else level or 1,
-                         "ID": sec_id, "Title": _cleanup_toc_title(title), "Page": page})
-        return pd.DataFrame(rows, columns=["Level", "ID", "Title", "Page"])
-
-    def _looks_like_noise(title: str) -> bool:
-        t = title.strip()
-        if not t:
-            return True
-        if re.search(r"\bP\s*a\s*g\s*e\b", t, re.IGNORECASE):
-            return True
-        return False
-
-    def _toc_df_fallback_scan(pdf_path_: str, max_pages: int) -> pd.DataFrame | None:
-        rows, seen = [], set()
-        with fitz.open(pdf_path_) as doc:
-            last = min(max_pages, doc.page_count)
-            for pno in range(1, last + 1):
-                page = doc.load_page(pno - 1)
-                for raw in page.get_text().splitlines():
-                    s = _normalize_line(raw)
-                    if not s or _looks_like_noise(s):
-                        continue
-                    # REQUIRE dotted leaders + trailing page number
-                    md = TOC_DOTTED_RE.match(s)
-                    if not md:
-                        continue
-                    sec_id, title, page_num = md.group(1), _cleanup_toc_title(md.group(2)), int(md.group(3))
-
-                    # sanity checks
-                    if page_num < 1 or page_num > doc.page_count:
-                        continue
-                    if not re.fullmatch(r"\d+(?:\.\d+){0,6}", sec_id):
-                        continue
-                    if not re.search(r"[A-Za-z]", title):
-                        continue
-
-                    level = sec_id.count(".") + 1
-                    key = (sec_id, title)
-                    if key in seen:
-                        continue
-                    seen.add(key)
-                    rows.append({"Level": level, "ID": sec_id, "Title": title, "Page": page_num})
-        if not rows:
-            return None
-
-        def _natkey(sec: str):
-            return tuple(int(x) for x in sec.split(".") if x.isdigit())
-
-        rows.sort(key=lambda r: (_natkey(r["ID"]), r["Page"]))
-        return pd.DataFrame(rows, columns=["Level", "ID", "Title", "Page"])
-
-    # Try embedded ToC first
-    try:
-        with fitz.open(pdf_path) as doc:
-            try:
-                toc_list = doc.get_toc()
-            except Exception:
-                toc_list = []
-        if toc_list:
-            df = _toc_df_from_list(toc_list)
-            if not df.empty:
-                logger.info("Extracted %d ToC entries from embedded ToC.", len(df))
-                return df
-    except Exception as e:
-        logger.warning("Embedded ToC read failed: %s", e)
-
-    # Fallback regex scan (front matter only; dotted leaders required)
-    df_fb = _toc_df_fallback_scan(pdf_path, MAX_TOC_PAGES)
-    if df_fb is not None and not df_fb.empty:
-        logger.info("Built %d ToC entries via fallback scan (first %d pages).", len(df_fb), MAX_TOC_PAGES)
-        return df_fb
-
-    logger.info("No ToC could be extracted.")
-    return None
-
-
 # ----------------------- CSV writer (optional) -----------------------
 def salvar_em_csv(lista_dados: List[Dict[str, str]], arquivo_saida: str, indice_df: pd.DataFrame | None = None) -> None:
     """
@@ -454,6 +198,47 @@ def salvar_em_csv(lista_dados: List[Dict[str, str]], arquivo_saida: str, indice_
         logger.info("Saved index to CSV: %s", csv_idx)
 
 
+# ----------------------- One PDF -----------------------
+BATCH_SUFFIX = ""  # --batch: one output directory per benchmark
+
+
+def _convert_pdf(pdf_file: str, output_dir: str, args: argparse.Namespace, workers: int = 1,
+                 cache: ExtractionCache | None = None, metrics: RunMetrics | None = None) -> Tuple[int, int]:
+    """
+    Extract one PDF into Markdown files in `output_dir` (plus the optional CSV).
+    With --batch the CSV keeps its file name but goes into `output_dir`.
+    Returns (items exported, pages).
+    """
+    csv_path = args.csv and (str(Path(output_dir) / Path(args.csv).name) if args.batch else args.csv)
+    with PdfSession(pdf_file, metrics=metrics) as session:
+        # Extract data from PDF (against the previous revision with --state)
+        selector = id_selector(args.ids, args.sections)
+        if selector:
+            dados = extrair_cis_sections_selected(pdf_file, selector, max_toc_pages=args.max_toc_pages,
+                                                  cache=cache, session=session, metrics=metrics)
+            warn_unmatched_ids(args.ids, dados)
+        elif args.state:
+            dados, report = extrair_cis_sections_incremental(pdf_file, args.state, workers=workers,
+                                                             session=session, metrics=metrics)
+            write_change_report(report, args.state, args.change_report)
+        else:
+            dados = extrair_cis_sections(pdf_file, workers=workers, cache=cache, session=session, metrics=metrics)
+
+        # Save to markdown files
+        with stage(metrics, "writing"):
+            salvar_em_markdown(dados, output_dir, force=args.force_write, prune_stale=args.prune_stale,
+                               partial=selector is not None)
+
+        # Optionally save CSV
+        if csv_path:
+            with stage(metrics, "toc", exclude=("open",)):
+                indice_df = extrair_indice_pdf(pdf_file, MAX_TOC_PAGES=args.max_toc_pages, session=session)
+            with stage(metrics, "writing"):
+                salvar_em_csv(dados, csv_path, indice_df=indice_df)
+        pages = session.page_count
+    return len(dados), pages
+
+
 # ----------------------- CLI -----------------------
 def parse_args(argv: List[str] | None = None) -> argparse.Namespace:
     p = argparse.ArgumentParser(
@@ -468,6 +253,23 @@ def parse_args(argv: List[str] | None = None) -> argparse.Namespace:
                    help="Output directory for markdown files.")
     p.add_argument("--csv", required=False, default=None,
                    help="Optional: Also save CSV output (provide filename).")
+    p.add_argument("--force-write", action="store_true",
+                   help="Rewrite every markdown file even when its content is unchanged.")
+    p.add_argument("--prune-stale", action="store_true",
+                   help="Delete {ID}.md files whose IDs are no longer in the PDF (default: only report them).")
+    p.add_argument("--ids", nargs="+", metavar="ID", default=None,
+                   help="Only extract these recommendation IDs; fnmatch patterns such"
+                        " as '5.2.*' are accepted. Only the pages the ToC places them on are read.")
+    p.add_argument("--sections", nargs="+", metavar="SECTION", default=None,
+                   help="Only extract these sections (e.g. 5 or 5.2) and everything below them.")
+    p.add_argument("--state", default=None,
+                   help="Page-hash state file of the previous benchmark revision (created if missing). Only pages "
+                        "and recommendations that changed are extracted/parsed again and a change report is written.")
+    p.add_argument("--change-report", default=None,
+                   help="With --state: JSON change report path (default: <state name>_changes.json next to it).")
+    p.add_argument("--batch", nargs="+", metavar="DIR_OR_GLOB", default=None,
+                   help="Convert every PDF in these directories / matching these globs instead of --pdf. "
+                        "Each benchmark goes to --output-dir/<pdf name>/; --workers PDFs are converted in parallel.")
     #####################################################################################################
     #####################################################################################################
     
@@ -475,7 +277,32 @@ def parse_args(argv: List[str] | None = None) -> argparse.Namespace:
     p.add_argument("--log-file", default=None, help="Optional log file path.")
     p.add_argument("--max-toc-pages", type=int, default=60, 
                    help="Max front pages to scan for ToC when PDF lacks embedded ToC.")
-    return p.parse_args(argv)
+    p.add_argument("--workers", type=int, default=1,
+                   help="Worker processes for page text extraction (1 = serial); with --batch, PDFs converted in parallel.")
+    p.add_argument("--cache-dir", default=str(DEFAULT_CACHE_DIR),
+                   help="Extraction cache directory (shared with converte_pdf_xlsx.py).")
+    p.add_argument("--no-cache", action="store_true", help="Do not read or write the extraction cache.")
+    p.add_argument("--refresh-cache", action="store_true",
+                   help="Ignore cached entries for this PDF and rebuild them.")
+    p.add_argument("--clear-cache", action="store_true", help="Delete every cache entry before running.")
+    p.add_argument("--cache-max-mb", type=float, default=512, help="Evict least recently used entries above this size.")
+    p.add_argument("--cache-max-age-days", type=float, default=30, help="Evict entries not used for this many days.")
+    p.add_argument("--metrics-json", default=None,
+                   help="Write per-stage wall/CPU time and memory peaks plus per-page and per-item cost "
+                        "histograms (with the slowest ones) to this JSON file.")
+    p.add_argument("--metrics-top", type=int, default=10, help="Slowest pages/items listed in --metrics-json.")
+    p.add_argument("--trace-malloc", action="store_true",
+                   help="With --metrics-json: also record tracemalloc peaks per stage (slows the run down).")
+    p.add_argument("--cprofile", default=None,
+                   help="Write cProfile stats of the run to this file (view with: python -m pstats FILE).")
+    args = p.parse_args(argv)
+    if args.clear_cache and args.no_cache:
+        p.error("--clear-cache cannot be combined with --no-cache")
+    if args.state and args.batch:
+        p.error("--state cannot be combined with --batch: the state belongs to one benchmark")
+    if args.state and (args.ids or args.sections):
+        p.error("--state cannot be combined with --ids/--sections: the state covers the whole benchmark")
+    return args
 
 
 def main() -> int:
@@ -485,29 +312,42 @@ def main() -> int:
     pdf_file = args.pdf
     output_dir = args.output_dir
 
-    logger.info("Parameters | pdf=%s | output_dir=%s | verbose=%d | log_file=%s",
-                pdf_file, output_dir, args.verbose, args.log_file or "-")
+    logger.info("Parameters | pdf=%s | output_dir=%s | workers=%d | verbose=%d | log_file=%s",
+                " ".join(args.batch) if args.batch else pdf_file, output_dir, args.workers, args.verbose,
+                args.log_file or "-")
+
+    cache = open_cache(args)
+    if cache:
+        if args.clear_cache:
+            cache.clear()
+        elif cache.cache_dir.is_dir():
+            cache.evict()
+
+    metrics = RunMetrics(top_n=args.metrics_top, trace_malloc=args.trace_malloc) if args.metrics_json else None
+    profiler = cProfile.Profile() if args.cprofile else None
+    if profiler:
+        profiler.enable()
 
     t0 = time.perf_counter()
     try:
-        # Extract data from PDF
-        dados = extrair_cis_sections(pdf_file)
-        
-        # Save to markdown files
-        salvar_em_markdown(dados, output_dir)
-        
-        # Optionally save CSV
-        if args.csv:
-            indice_df = extrair_indice_pdf(pdf_file, MAX_TOC_PAGES=args.max_toc_pages)
-            salvar_em_csv(dados, args.csv, indice_df=indice_df)
-
+        if args.batch:
+            return run_batch(args, output_dir, _convert_pdf, BATCH_SUFFIX, metrics=metrics)
+        n_items, _pages = _convert_pdf(pdf_file, output_dir, args, workers=args.workers, cache=cache,
+                                       metrics=metrics)
         logger.info("SUCCESS | Items exported: %d | Markdown files created in: %s",
-                    len(dados), output_dir)
+                    n_items, output_dir)
     except Exception:
         logger.error("FAILED execution due to previous errors.")
         return 1
     finally:
         logger.info("Total runtime: %.3fs", time.perf_counter() - t0)
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(args.cprofile)
+            logger.info("cProfile stats written to %s", args.cprofile)
+        if metrics:
+            metrics.write(args.metrics_json)
+            logger.info("Metrics written to %s", args.metrics_json)
 
     return 0
 
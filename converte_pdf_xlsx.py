@@ -3,355 +3,30 @@
 # pip install pandas pymupdf xlsxwriter openpyxl
 
 import argparse
-import logging
-import sys
+import cProfile
 import time
 from pathlib import Path
 from typing import Dict, List, Tuple
-import re
-
-# --- PyMuPDF import (works across versions) ---
-try:
-    import pymupdf as fitz  # modern import name
-except Exception:
-    import fitz  # legacy module name
 
 import pandas as pd
 
-# === Known section headers in CIS PDFs ===
-SECTION_NAMES = [
-    "Profile Applicability",
-    "Description",
-    "Rationale",
-    "Impact",
-    "Audit",
-    "Remediation",
-    "Default Value",
-    "References",
-]
-SECTION_REGEXES = {name: re.compile(rf"^{re.escape(name)}:?$", re.IGNORECASE) for name in SECTION_NAMES}
-
-# Section IDs
-ID_RELAXED_RE = re.compile(r"^(\d+(?:\.\d+){0,6})\b")   # allow "2" or "2.1.1"
-ID_STRICT_RE = re.compile(r"^(\d+(?:\.\d+)+)\b")        # at least one dot
-
-# Fallback ToC detectors
-TOC_LINE_RE = re.compile(r"^(\d+(?:\.\d+){0,6})\s+(.+?)\s*$")
-# NEW: capture dotted leaders + final page number (e.g., "6.2.16 Title ....... 597")
-TOC_DOTTED_RE = re.compile(
-    r"^(\d+(?:\.\d+){0,6})\s+(.+?)\s*\.{2,}\s*(\d+)\s*$"
+from cis_pdf_common import (
+    DEFAULT_CACHE_DIR,
+    ExtractionCache,
+    PdfSession,
+    extrair_cis_sections,
+    extrair_cis_sections_incremental,
+    extrair_cis_sections_selected,
+    extrair_indice_pdf,
+    id_selector,
+    logger,
+    open_cache,
+    run_batch,
+    setup_logging,
+    warn_unmatched_ids,
+    write_change_report,
 )
-
-logger = logging.getLogger("cis_pdf_parser")
-
-
-# ----------------------- Logging -----------------------
-def setup_logging(verbosity: int, log_file: str | None) -> None:
-    level = logging.INFO if verbosity <= 0 else logging.DEBUG
-    fmt = "%(asctime)s | %(levelname)s | %(message)s"
-    datefmt = "%Y-%m-%d %H:%M:%S"
-
-    for h in list(logger.handlers):
-        logger.removeHandler(h)
-
-    logger.setLevel(level)
-    console = logging.StreamHandler(sys.stdout)
-    console.setLevel(level)
-    console.setFormatter(logging.Formatter(fmt=fmt, datefmt=datefmt))
-    logger.addHandler(console)
-
-    if log_file:
-        fh = logging.FileHandler(log_file, encoding="utf-8")
-        fh.setLevel(level)
-        fh.setFormatter(logging.Formatter(fmt=fmt, datefmt=datefmt))
-        logger.addHandler(fh)
-
-    logger.debug("Logger initialized (level=%s, log_file=%s)", logging.getLevelName(level), log_file)
-
-
-# ----------------------- Helpers -----------------------
-def _normalize_line(s: str) -> str:
-    # Mantido o comportamento original + remoção explícita do bullet U+F0B7 (“”)
-    s = s.replace("\u2028", " ").replace("\u00AD", "")
-    # remove/normaliza o bullet “” (alguns PDFs usam esse codepoint via fontes Wingdings/Symbol)
-    s = s.replace("\uf0b7", " ")
-    # colapsa eventuais ocorrências repetidas do bullet + espaços
-    s = re.sub(r"[ \t]*\uf0b7[ \t]*", " ", s)
-    # normaliza espaços
-    s = re.sub(r"\s+", " ", s)
-    return s.strip()
-
-
-def _starts_with_section(line: str) -> str:
-    txt = line.strip()
-    for name, rx in SECTION_REGEXES.items():
-        if rx.match(txt):
-            return name
-    return ""
-
-
-def _find_section_boundaries(lines: List[str], start_idx: int, end_idx: int) -> Dict[str, int]:
-    indices = {name: -1 for name in SECTION_NAMES}
-    for j in range(start_idx, end_idx):
-        raw = lines[j].strip()
-        if not raw:
-            continue
-        if ID_STRICT_RE.match(raw) and j != start_idx:
-            break
-        sec = _starts_with_section(raw)
-        if sec and indices[sec] == -1:
-            indices[sec] = j
-    return indices
-
-
-def _next_id_or_end(lines: List[str], start: int, end_idx: int) -> int:
-    for p in range(start, end_idx):
-        if ID_STRICT_RE.match(lines[p].strip()):
-            return p
-    return end_idx
-
-
-def _extract_block(lines: List[str], start: int, end: int) -> str:
-    if start < 0:
-        return ""
-    end = min(end, len(lines))
-    block = "\n".join(_normalize_line(ln) for ln in lines[start:end])
-    return block.strip()
-
-
-# ----------------------- PDF text collection + footer cleaner -----------------------
-def _clean_rodape_lines(lines: List[str]) -> List[str]:
-    cleaned = []
-    skip_controls_block = False
-    for line in lines:
-        txt = line.strip()
-
-        # Remove page footer like "21 | P a g e" or "Page 21"
-        if re.match(r"^\d+\s*\|\s*P\s*a\s*g\s*e$", txt, re.IGNORECASE) or re.match(r"^Page\s+\d+$", txt, re.IGNORECASE):
-            continue
-
-        # Remove "CIS Controls" footer block lines
-        if re.match(r"^CIS\s+Controls:?\s*$", txt, re.IGNORECASE):
-            skip_controls_block = True
-            continue
-
-        if skip_controls_block:
-            if txt.lower() in {"controls", "version", "control", "ig 1 ig 2 ig 3", "v8", 'v8"'}:
-                continue
-            skip_controls_block = False
-
-        cleaned.append(line)
-    return cleaned
-
-
-def _collect_all_lines(pdf_path: str) -> List[str]:
-    logger.info("Opening PDF: %s", pdf_path)
-    lines: List[str] = []
-    with fitz.open(pdf_path) as doc:
-        logger.info("PDF opened. Pages: %d", doc.page_count)
-        for pno, page in enumerate(doc, start=1):
-            text = page.get_text()
-            page_lines = _clean_rodape_lines(text.splitlines())
-            lines.extend(page_lines)
-            lines.append("")
-            if pno % 10 == 0:
-                logger.debug("Processed %d pages (cumulative lines: %d)", pno, len(lines))
-    logger.info("Collected %d lines from PDF", len(lines))
-    return lines
-
-
-# ----------------------- CIS sections extractor (existing behavior) -----------------------
-def extrair_cis_sections(pdf_path: str) -> List[Dict[str, str]]:
-    start_t = time.perf_counter()
-    lines = _collect_all_lines(pdf_path)
-    total = len(lines)
-    resultados: List[Dict[str, str]] = []
-
-    logger.info("Starting parse loop over %d lines", total)
-    found_items = 0
-    kept_items = 0
-
-    i = 0
-    while i < total:
-        line = lines[i].strip()
-
-        if ID_STRICT_RE.match(line):
-            found_items += 1
-            title_lines = [line]
-            j = i + 1
-            while j < total:
-                nxt = lines[j].strip()
-                if _starts_with_section(nxt) or ID_STRICT_RE.match(nxt):
-                    break
-                if nxt:
-                    title_lines.append(nxt)
-                j += 1
-            full_name = _normalize_line(" ".join(title_lines))
-
-            end_of_item = _next_id_or_end(lines, j, total)
-            indices = _find_section_boundaries(lines, j, end_of_item)
-
-            boundaries: Dict[str, Tuple[int, int]] = {}
-            present_sections = [s for s in SECTION_NAMES if indices[s] != -1]
-            present_sections_sorted = sorted(present_sections, key=lambda s: indices[s])
-
-            next_boundary_after = {}
-            for idx, sec in enumerate(present_sections_sorted):
-                start_at = indices[sec]
-                if idx + 1 < len(present_sections_sorted):
-                    next_boundary_after[start_at] = indices[present_sections_sorted[idx + 1]]
-                else:
-                    next_boundary_after[start_at] = end_of_item
-
-            if indices["Remediation"] != -1:
-                start_r = indices["Remediation"] + 1
-                end_r = indices["Default Value"] if indices["Default Value"] != -1 else next_boundary_after[indices["Remediation"]]
-                boundaries["Remediation"] = (start_r, end_r)
-
-            if indices["Default Value"] != -1:
-                start_dv = indices["Default Value"] + 1
-                end_dv = indices["References"] if indices["References"] != -1 else next_boundary_after[indices["Default Value"]]
-                boundaries["Default Value"] = (start_dv, end_dv)
-
-            for sec in ["Profile Applicability", "Description", "Rationale", "Impact", "Audit"]:
-                if indices[sec] != -1 and sec not in boundaries:
-                    start = indices[sec] + 1
-                    end = next_boundary_after[indices[sec]]
-                    boundaries[sec] = (start, end)
-
-            contents = {s: "" for s in SECTION_NAMES}
-            for sec, (sidx, eidx) in boundaries.items():
-                contents[sec] = _extract_block(lines, sidx, eidx)
-
-            if any(contents[s].strip() for s in ["Remediation", "Default Value"]):
-                first_token = full_name.split()[0] if full_name else ""
-                resultados.append({
-                    "ID": first_token,
-                    "Nome Completo": full_name,
-                    "Profile Applicability": contents.get("Profile Applicability", ""),
-                    "Description": contents.get("Description", ""),
-                    "Rationale": contents.get("Rationale", ""),
-                    "Impact": contents.get("Impact", ""),
-                    "Audit": contents.get("Audit", ""),
-                    "Remediation": contents.get("Remediation", ""),
-                    "Default Value": contents.get("Default Value", ""),
-                })
-                kept_items += 1
-
-            i = end_of_item
-            continue
-
-        i += 1
-
-    elapsed = time.perf_counter() - start_t
-    logger.info("Parse completed. Found items: %d | Kept: %d | Duration: %.3fs",
-                found_items, kept_items, elapsed)
-    return resultados
-
-
-# ----------------------- NEW: Table of Contents extraction -----------------------
-def extrair_indice_pdf(pdf_path: str, MAX_TOC_PAGES: int = 60) -> pd.DataFrame | None:
-    """
-    Extract the PDF Table of Contents into columns: Level, ID, Title, Page.
-    Strategy:
-      1) Try embedded ToC via doc.get_toc().
-      2) Fallback: scan only the first MAX_TOC_PAGES pages, accept ONLY lines
-         with dotted leaders and a trailing page number, and set Page from that.
-    """
-    def _cleanup_toc_title(title: str) -> str:
-        s = _normalize_line(title)
-        s = re.sub(r"\.{2,}\s*\d+\s*$", "", s)   # remove leaders + page num
-        s = s.strip(" .")
-        return s
-
-    def _toc_df_from_list(toc_list) -> pd.DataFrame:
-        rows = []
-        for e in toc_list:
-            if isinstance(e, dict):
-                level = int(e.get("level", 0))
-                title = _normalize_line(str(e.get("title", "")))
-                page = int(e.get("page", 0))
-            else:
-                level = int(e[0]) if len(e) > 0 else 0
-                title = _normalize_line(str(e[1])) if len(e) > 1 else ""
-                page = int(e[2]) if len(e) > 2 else 0
-            m = ID_RELAXED_RE.match(title)
-            sec_id = m.group(1) if m else ""
-            rows.append({"Level": max(1, sec_id.count(".") + 1) if sec_id else level or 1,
-                         "ID": sec_id, "Title": _cleanup_toc_title(title), "Page": page})
-        return pd.DataFrame(rows, columns=["Level", "ID", "Title", "Page"])
-
-    def _looks_like_noise(title: str) -> bool:
-        t = title.strip()
-        if not t:
-            return True
-        if re.search(r"\bP\s*a\s*g\s*e\b", t, re.IGNORECASE):
-            return True
-        return False
-
-    def _toc_df_fallback_scan(pdf_path_: str, max_pages: int) -> pd.DataFrame | None:
-        rows, seen = [], set()
-        with fitz.open(pdf_path_) as doc:
-            last = min(max_pages, doc.page_count)
-            for pno in range(1, last + 1):
-                page = doc.load_page(pno - 1)
-                for raw in page.get_text().splitlines():
-                    s = _normalize_line(raw)
-                    if not s or _looks_like_noise(s):
-                        continue
-                    # REQUIRE dotted leaders + trailing page number
-                    md = TOC_DOTTED_RE.match(s)
-                    if not md:
-                        continue
-                    sec_id, title, page_num = md.group(1), _cleanup_toc_title(md.group(2)), int(md.group(3))
-
-                    # sanity checks
-                    if page_num < 1 or page_num > doc.page_count:
-                        continue
-                    if not re.fullmatch(r"\d+(?:\.\d+){0,6}", sec_id):
-                        continue
-                    if not re.search(r"[A-Za-z]", title):
-                        continue
-
-                    level = sec_id.count(".") + 1
-                    key = (sec_id, title)
-                    if key in seen:
-                        continue
-                    seen.add(key)
-                    rows.append({"Level": level, "ID": sec_id, "Title": title, "Page": page_num})
-        if not rows:
-            return None
-
-        def _natkey(sec: str):
-            return tuple(int(x) for x in sec.split(".") if x.isdigit())
-
-        rows.sort(key=lambda r: (_natkey(r["ID"]), r["Page"]))
-        return pd.DataFrame(rows, columns=["Level", "ID", "Title", "Page"])
-
-    # Try embedded ToC first
-    try:
-        with fitz.open(pdf_path) as doc:
-            try:
-                toc_list = doc.get_toc()
-            except Exception:
-                toc_list = []
-        if toc_list:
-            df = _toc_df_from_list(toc_list)
-            if not df.empty:
-                logger.info("Extracted %d ToC entries from embedded ToC.", len(df))
-                return df
-    except Exception as e:
-        logger.warning("Embedded ToC read failed: %s", e)
-
-    # Fallback regex scan (front matter only; dotted leaders required)
-    df_fb = _toc_df_fallback_scan(pdf_path, MAX_TOC_PAGES)
-    if df_fb is not None and not df_fb.empty:
-        logger.info("Built %d ToC entries via fallback scan (first %d pages).", len(df_fb), MAX_TOC_PAGES)
-        return df_fb
-
-    logger.info("No ToC could be extracted.")
-    return None
-
+from run_metrics import RunMetrics, stage
 
 # ----------------------- Excel writer -----------------------
 def salvar_em_excel(lista_dados: List[Dict[str, str]], arquivo_saida: str, indice_df: pd.DataFrame | None = None) -> None:
@@ -418,6 +93,41 @@ def salvar_em_excel(lista_dados: List[Dict[str, str]], arquivo_saida: str, indic
         raise
 
 
+# ----------------------- One PDF -----------------------
+BATCH_SUFFIX = ".xlsx"  # --batch: one workbook per benchmark
+
+
+def _convert_pdf(pdf_file: str, saida_excel: str, args: argparse.Namespace, workers: int = 1,
+                 cache: ExtractionCache | None = None, metrics: RunMetrics | None = None) -> Tuple[int, int]:
+    """
+    Extract one PDF into the workbook `saida_excel` (recommendations + Index sheet).
+    Returns (items exported, pages).
+    """
+    with PdfSession(pdf_file, metrics=metrics) as session:
+        selector = id_selector(args.ids, args.sections)
+        if selector:
+            dados = extrair_cis_sections_selected(pdf_file, selector, max_toc_pages=args.max_toc_pages,
+                                                  cache=cache, session=session, metrics=metrics)
+            warn_unmatched_ids(args.ids, dados)
+        elif args.state:
+            dados, report = extrair_cis_sections_incremental(pdf_file, args.state, workers=workers,
+                                                             session=session, metrics=metrics)
+            write_change_report(report, args.state, args.change_report)
+        else:
+            dados = extrair_cis_sections(pdf_file, workers=workers, cache=cache, session=session,
+                                         metrics=metrics)
+        with stage(metrics, "toc", exclude=("open",)):
+            indice_df = extrair_indice_pdf(pdf_file, MAX_TOC_PAGES=args.max_toc_pages, session=session)
+        pages = session.page_count
+
+    with stage(metrics, "writing"):
+        salvar_em_excel(dados, saida_excel, indice_df=indice_df)
+
+    logger.info("SUCCESS | Items exported: %d | Index rows: %s",
+                len(dados), "0" if indice_df is None else str(len(indice_df) if not indice_df.empty else 0))
+    return len(dados), pages
+
+
 # ----------------------- CLI -----------------------
 def parse_args(argv: List[str] | None = None) -> argparse.Namespace:
     p = argparse.ArgumentParser(
@@ -428,13 +138,37 @@ def parse_args(argv: List[str] | None = None) -> argparse.Namespace:
     #####################################################################################################
     p.add_argument("--pdf", required=False, default="CIS_Microsoft_Windows_Server_2022_Benchmark_v4.0.0.pdf", help="Input PDF path.")
     p.add_argument("--out", required=False, default="CIS_Microsoft_Windows_Server_2022_Benchmark_v4.0.0.xlsx", help="Output Excel path.")
+    p.add_argument("--batch", nargs="+", metavar="DIR_OR_GLOB", default=None, help="Convert every PDF in these directories / matching these globs instead of --pdf, --workers PDFs in parallel.")
+    p.add_argument("--ids", nargs="+", metavar="ID", default=None, help="Only extract these recommendation IDs; fnmatch patterns such as '5.2.*' are accepted. Only the pages the ToC places them on are read.")
+    p.add_argument("--sections", nargs="+", metavar="SECTION", default=None, help="Only extract these sections (e.g. 5 or 5.2) and everything below them.")
+    p.add_argument("--state", default=None, help="Page-hash state file of the previous benchmark revision (created if missing). Only pages and recommendations that changed are extracted/parsed again and a change report is written.")
+    p.add_argument("--change-report", default=None, help="With --state: JSON change report path (default: <state name>_changes.json next to it).")
+    p.add_argument("--out-dir", default="cis_workbooks", help="With --batch: one <pdf name>.xlsx per benchmark in this directory.")
     #####################################################################################################
     #####################################################################################################
     
     p.add_argument("-v", "--verbose", action="count", default=0, help="Increase verbosity.")
     p.add_argument("--log-file", default=None, help="Optional log file path.")
     p.add_argument("--max-toc-pages", type=int, default=60, help="Max front pages to scan for ToC when PDF lacks embedded ToC.")
-    return p.parse_args(argv)
+    p.add_argument("--workers", type=int, default=1, help="Worker processes for page text extraction (1 = serial); with --batch, PDFs converted in parallel.")
+    p.add_argument("--cache-dir", default=str(DEFAULT_CACHE_DIR), help="Extraction cache directory (shared with converte_pdf_md.py).")
+    p.add_argument("--no-cache", action="store_true", help="Do not read or write the extraction cache.")
+    p.add_argument("--refresh-cache", action="store_true", help="Ignore cached entries for this PDF and rebuild them.")
+    p.add_argument("--clear-cache", action="store_true", help="Delete every cache entry before running.")
+    p.add_argument("--cache-max-mb", type=float, default=512, help="Evict least recently used entries above this size.")
+    p.add_argument("--cache-max-age-days", type=float, default=30, help="Evict entries not used for this many days.")
+    p.add_argument("--metrics-json", default=None, help="Write per-stage wall/CPU time and memory peaks plus per-page and per-item cost histograms (with the slowest ones) to this JSON file.")
+    p.add_argument("--metrics-top", type=int, default=10, help="Slowest pages/items listed in --metrics-json.")
+    p.add_argument("--trace-malloc", action="store_true", help="With --metrics-json: also record tracemalloc peaks per stage (slows the run down).")
+    p.add_argument("--cprofile", default=None, help="Write cProfile stats of the run to this file (view with: python -m pstats FILE).")
+    args = p.parse_args(argv)
+    if args.clear_cache and args.no_cache:
+        p.error("--clear-cache cannot be combined with --no-cache")
+    if args.state and args.batch:
+        p.error("--state cannot be combined with --batch: the state belongs to one benchmark")
+    if args.state and (args.ids or args.sections):
+        p.error("--state cannot be combined with --ids/--sections: the state covers the whole benchmark")
+    return args
 
 
 def main() -> int:
@@ -444,23 +178,39 @@ def main() -> int:
     pdf_file = args.pdf
     saida_excel = args.out
 
-    logger.info("Parameters | pdf=%s | out=%s | verbose=%d | log_file=%s",
-                pdf_file, saida_excel, args.verbose, args.log_file or "-")
+    logger.info("Parameters | pdf=%s | out=%s | workers=%d | verbose=%d | log_file=%s",
+                " ".join(args.batch) if args.batch else pdf_file, args.out_dir if args.batch else saida_excel,
+                args.workers, args.verbose, args.log_file or "-")
 
-    t0 = time.perf_counter()
-    try:
-        dados = extrair_cis_sections(pdf_file)
-        indice_df = extrair_indice_pdf(pdf_file, MAX_TOC_PAGES=args.max_toc_pages)
+    cache = open_cache(args)
+    if cache:
+        if args.clear_cache:
+            cache.clear()
+        elif cache.cache_dir.is_dir():
+            cache.evict()
 
-        salvar_em_excel(dados, saida_excel, indice_df=indice_df)
+    metrics = RunMetrics(top_n=args.metrics_top, trace_malloc=args.trace_malloc) if args.metrics_json else None
+    profiler = cProfile.Profile() if args.cprofile else None
+    if profiler:
+        profiler.enable()
 
-        logger.info("SUCCESS | Items exported: %d | Index rows: %s",
-                    len(dados), "0" if indice_df is None else str(len(indice_df) if not indice_df.empty else 0))
+    t0 = time.perf_counter()
+    try:
+        if args.batch:
+            return run_batch(args, args.out_dir, _convert_pdf, BATCH_SUFFIX, metrics=metrics)
+        _convert_pdf(pdf_file, saida_excel, args, workers=args.workers, cache=cache, metrics=metrics)
     except Exception:
         logger.error("FAILED execution due to previous errors.")
         return 1
     finally:
         logger.info("Total runtime: %.3fs", time.perf_counter() - t0)
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(args.cprofile)
+            logger.info("cProfile stats written to %s", args.cprofile)
+        if metrics:
+            metrics.write(args.metrics_json)
+            logger.info("Metrics written to %s", args.metrics_json)
 
     return 0
 
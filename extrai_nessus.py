@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
 """
 Extract specific fields from all .nessus files located in the SAME DIRECTORY as this script
-and export everything to a single Excel workbook called 'consolidado_scan.xlsx'.
+and export everything to a single Excel workbook called 'consolidado_scan.xlsx'
+(or to 'consolidado_scan.parquet' with --format parquet).
 
 Columns exported (in this order):
   File, IP Address, FQDN, Netbios Name, OS, IP/Name,
@@ -13,23 +14,55 @@ Columns exported (in this order):
   patch_publication_date, vuln_publication_date
 
 Usage:
-  python nessus_extract_to_xlsx.py
+  python nessus_extract_to_xlsx.py [--workers N] [--format xlsx|parquet]
+  python nessus_extract_to_xlsx.py --store findings.sqlite [--from-store]
+  python nessus_extract_to_xlsx.py --layout normalized [--flat-sheet]
+  python nessus_extract_to_xlsx.py --min-severity medium --family "Oracle Linux Local Security Checks"
+  python nessus_extract_to_xlsx.py --host-cidr 10.1.0.0/16 --credentialed-only
+  python nessus_extract_to_xlsx.py --extra-columns columns.json
+  python nessus_extract_to_xlsx.py --output-max-chars 2000
+  python nessus_extract_to_xlsx.py --metrics-json metrics.json [--cprofile run.prof]
 
 Notes:
 - Works with .nessus (XML v2) exports from Nessus/Tenable.
+- With --store, findings accumulate in a SQLite database; re-runs only parse
+  .nessus files whose content has not been ingested yet.
+- Plugin Outputs longer than a cell can hold (or --output-max-chars) are stored in
+  full as .txt.gz files in consolidado_scan_outputs/; the cell keeps a preview.
 - Prefers CVSS v3 base score when present; falls back to CVSS v2.
 - Tries multiple host property keys to detect credentialed scan and user.
-- Requires: pandas, openpyxl (install with: pip install pandas openpyxl)
+- Requires: xlsxwriter (preferred) or openpyxl (install with: pip install xlsxwriter openpyxl)
+- Uses lxml for parsing when installed (--parser auto); falls back to xml.etree.ElementTree.
 """
 from __future__ import annotations
 
+import argparse
+import bisect
+import cProfile
+import gzip
+import hashlib
+import ipaddress
+import json
 import logging
+import mmap
+import os
+import re
+import sqlite3
+import struct
 import sys
+import time
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Iterable, List
+from typing import Callable, Dict, FrozenSet, Iterable, Iterator, List, Tuple
 import xml.etree.ElementTree as ET
 
-import pandas as pd
+from run_metrics import RunMetrics, stage
+
 
 # ------------------------------ Logging ------------------------------------
 LOG = logging.getLogger("nessus_extract")
@@ -40,6 +73,33 @@ logging.basicConfig(
 )
 
 
+# Output columns, in workbook order
+COLUMNS = [
+    "File",
+    "IP Address",
+    "FQDN",
+    "Netbios Name",
+    "OS",
+    "IP/Name",
+    "Severity",
+    "Risk Factor",
+    "Plugin ID",
+    "CVE",
+    "Plugin Name",
+    "Plugin Output",
+    "Credentialed Check",
+    "Credentialed User",
+    "Solution",
+    "Description",
+    "CVSS Score",
+    "Exploit Available",
+    "Metasploit Name",
+    "plugin_publication_date",
+    "patch_publication_date",
+    "vuln_publication_date",
+]
+
+
 # ------------------------------ Helpers ------------------------------------
 
 def _coalesce(d: Dict[str, str], *keys: str, default: str = "") -> str:
@@ -77,6 +137,104 @@ def find_nessus_in_script_dir() -> List[Path]:
     return files
 
 
+# ------------------------------ XML Backends -------------------------------
+
+PARSER_CHOICES = ("auto", "lxml", "etree")
+
+
+def resolve_parser(name: str) -> str:
+    """Map a --parser choice to a backend: 'auto' picks lxml when it is installed."""
+    if name == "etree":
+        return name
+    try:
+        import lxml.etree  # noqa: F401
+    except ImportError:
+        if name == "lxml":
+            raise
+        return "etree"
+    return "lxml"
+
+
+def _fromstring(data: bytes, parser: str) -> ET.Element:
+    if parser != "lxml":
+        return ET.fromstring(data)
+    from lxml import etree
+
+    try:
+        return etree.fromstring(data, etree.XMLParser(huge_tree=True))
+    except etree.XMLSyntaxError as e:
+        # lxml errors do not pickle back from workers; report them like ElementTree does
+        raise ET.ParseError(str(e)) from None
+
+
+# ------------------------------ Filters ------------------------------------
+
+SEVERITY_LEVELS = {"info": 0, "low": 1, "medium": 2, "high": 3, "critical": 4}
+
+
+@dataclass(frozen=True)
+class ParseOptions:
+    """
+    Parse-time settings: the XML backend and filters checked before any row is
+    built (picklable, so the same options reach the worker processes).
+
+    Item filters only look at ReportItem attributes (severity, pluginID,
+    pluginFamily); host filters look at the host columns once HostProperties is
+    read. Empty collections / None mean "no filter".
+    """
+
+    parser: str = "etree"  # "etree" (stdlib) or "lxml"; see resolve_parser()
+    min_severity: int = 0
+    plugin_ids: FrozenSet[str] = frozenset()
+    families: FrozenSet[str] = frozenset()  # lower-cased pluginFamily names
+    host_networks: Tuple[ipaddress.IPv4Network | ipaddress.IPv6Network, ...] = ()
+    host_regex: str | None = None  # searched in IP/Name, FQDN, Netbios Name and the ReportHost name
+    credentialed_only: bool = False
+    extra_columns: Tuple[ColumnSpec, ...] = ()  # registered in every process that parses
+    output_max_chars: int = 0  # longer Plugin Outputs go to output_dir (0 = never)
+    output_dir: str | None = None
+
+    @property
+    def active(self) -> bool:
+        return bool(self.min_severity or self.plugin_ids or self.families
+                    or self.host_networks or self.host_regex or self.credentialed_only)
+
+    def accepts_item(self, ri: ET.Element) -> bool:
+        if self.min_severity:
+            try:
+                if int(ri.get("severity") or "") < self.min_severity:
+                    return False
+            except ValueError:
+                return False
+        if self.plugin_ids and (ri.get("pluginID") or ri.get("plugin_id") or "") not in self.plugin_ids:
+            return False
+        if self.families and (ri.get("pluginFamily") or "").strip().lower() not in self.families:
+            return False
+        return True
+
+    def accepts_host(self, host: Dict[str, str], host_elem: ET.Element) -> bool:
+        if self.credentialed_only and host["Credentialed Check"] != "Yes":
+            return False
+        if self.host_networks:
+            try:
+                addr = ipaddress.ip_address(host["IP Address"] or host_elem.get("name") or "")
+            except ValueError:
+                return False
+            if not any(addr in net for net in self.host_networks):
+                return False
+        if self.host_regex:
+            rx = _compiled_regex(self.host_regex)
+            names = (host["IP/Name"], host["FQDN"], host["Netbios Name"], host_elem.get("name") or "")
+            if not any(rx.search(n) for n in names if n):
+                return False
+        return True
+
+
+@lru_cache(maxsize=None)
+def _compiled_regex(pattern: str) -> re.Pattern:
+    return re.compile(pattern, re.IGNORECASE)
+
+
 # ------------------------------ Parsing ------------------------------------
 
 def parse_host_properties(host_elem: ET.Element) -> Dict[str, str]:
@@ -92,79 +250,6 @@ def parse_host_properties(host_elem: ET.Element) -> Dict[str, str]:
     return props
 
 
-def parse_report_item_scores(ri: ET.Element) -> float:
-    # Prefer CVSS v3 base, then v2 base
-    # Values may appear as attributes or child elements depending on exporter
-    for key in ("cvss3_base_score", "cvssV3_base_score", "cvss3_base_score_temporal"):
-        v = ri.get(key)
-        if v:
-            try:
-                return float(v)
-            except ValueError:
-                pass
-        child = ri.find(key)
-        if child is not None and child.text:
-            try:
-                return float(child.text)
-            except ValueError:
-                pass
-    for key in ("cvss_base_score", "cvss_base_score_temporal"):
-        v = ri.get(key)
-        if v:
-            try:
-                return float(v)
-            except ValueError:
-                pass
-        child = ri.find(key)
-        if child is not None and child.text:
-            try:
-                return float(child.text)
-            except ValueError:
-                pass
-    return 0.0
-
-
-def parse_report_item_output(ri: ET.Element) -> str:
-    po = ri.find("plugin_output")
-    if po is None or po.text is None:
-        return ""
-    return _norm_ws(po.text)
-
-
-def parse_cves(ri: ET.Element) -> str:
-    # Collect CVEs from child <cve> elements or attribute 'cve' (comma/space-separated)
-    cves: List[str] = []
-    for c in ri.findall("cve"):
-        if c.text:
-            cves.append(c.text.strip())
-    attr = ri.get("cve")
-    if attr:
-        parts = [p.strip() for p in attr.replace(";", ",").split(",")]
-        cves.extend([p for p in parts if p])
-    # Deduplicate preserving order
-    seen = set()
-    uniq = []
-    for c in cves:
-        if c and c not in seen:
-            seen.add(c)
-            uniq.append(c)
-    return "; ".join(uniq)
-
-
-def parse_text_child(ri: ET.Element, tag: str) -> str:
-    elem = ri.find(tag)
-    return _norm_ws(elem.text) if (elem is not None and elem.text) else ""
-
-
-def parse_bool_child_or_attr(ri: ET.Element, tag: str) -> str:
-    # Returns "Yes" / "No" using either attribute or child element
-    val = ri.get(tag)
-    if val is None:
-        elem = ri.find(tag)
-        val = elem.text if (elem is not None) else None
-    return "Yes" if _boolish(val) else (val.strip() if isinstance(val, str) and val.strip() else "No")
-
-
 def severity_text_from_id(sev: str | None) -> str:
     mapping = {"0": "Info", "1": "Low", "2": "Medium", "3": "High", "4": "Critical"}
     if sev is None:
@@ -172,212 +257,1633 @@ def severity_text_from_id(sev: str | None) -> str:
     return mapping.get(sev.strip(), "")
 
 
-def extract_rows_from_file(nessus_path: Path) -> List[Dict[str, object]]:
+def host_fields(host_elem: ET.Element, file_name: str) -> Dict[str, str]:
+    """Return the host-level columns of a ReportHost (File, addresses, OS, credential info)."""
+    host_name = host_elem.get("name") or ""
+    props = parse_host_properties(host_elem)
+
+    # Common host properties (case-insensitive lookup via _coalesce)
+    ip = _coalesce(
+        props,
+        "host-ip",
+        "Host-IP",
+        "host_ip",
+        "Host IP",
+    )
+    fqdn = _coalesce(props, "host-fqdn", "FQDN", "host-fqdn0")
+    netbios = _coalesce(props, "netbios-name", "host-netbios-name", "NetBIOS-Name")
+    os_name = _coalesce(props, "operating-system", "Operating System", "os")
+
+    # Credentialed scan flags and user (best-effort across exporters)
+    cred_flag = _coalesce(
+        props,
+        "Credentialed_Scan",
+        "credentialed_scan",
+        "host-credentialed-scan",
+        "local_checks_enabled",
+        "Local Checks Enabled",
+    )
+    credentialed_check = "Yes" if _boolish(cred_flag) else "No"
+
+    credentialed_user = _coalesce(
+        props,
+        # Seen in some exports when SSH auth is used
+        "ssh-login-used",
+        "ssh_login_used",
+        # Seen in some Windows/SMB contexts
+        "smb-login-used",
+        "host-smb-login-used",
+        # Occasionally present as a generic field
+        "credentialed_user",
+        "local_checks_user",
+    )
+
+    return {
+        "File": file_name,
+        "IP Address": ip,
+        "FQDN": fqdn,
+        "Netbios Name": netbios,
+        "OS": os_name,
+        "IP/Name": ip or host_name,
+        "Credentialed Check": credentialed_check,
+        "Credentialed User": credentialed_user,
+    }
+
+
+# ------------------------------ Column Registry ----------------------------
+
+CM_NS = "{http://www.nessus.org/cm}"
+COLUMN_KINDS = ("text", "strip", "float", "bool", "list")
+
+
+@dataclass(frozen=True)
+class ColumnSpec:
+    """
+    Where a ReportItem column comes from and how its value is typed.
+
+    `sources` are tried in order: "@name" is an attribute, anything else a child
+    element ("cm:" stands for the compliance namespace). Kinds:
+      text   first non-empty source; child text is whitespace-normalized, attributes as-is
+      strip  first non-empty source, stripped
+      float  first source that parses as a float (else 0.0)
+      bool   first source present: "Yes" when truthy, else its stripped text or "No"
+      list   every source's values (attributes split on , and ;), de-duplicated, "; "-joined
+    `fallback(row)` supplies the value when no source matched (built-in columns only).
+    """
+
+    name: str
+    sources: Tuple[str, ...]
+    kind: str = "text"
+    fallback: Callable[[Dict[str, object]], object] | None = None
+    _plan: Tuple[Tuple[bool, str], ...] = field(init=False, repr=False, compare=False)
+    _resolve: Callable = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        if self.kind not in COLUMN_KINDS:
+            raise ValueError(f"column {self.name!r}: unknown kind {self.kind!r} (expected one of {COLUMN_KINDS})")
+        if not self.sources:
+            raise ValueError(f"column {self.name!r}: no sources")
+        object.__setattr__(self, "sources", tuple(self.sources))
+        plan = []
+        for src in self.sources:
+            if src.startswith("@"):
+                plan.append((True, src[1:]))
+            else:
+                plan.append((False, CM_NS + src[3:] if src.startswith("cm:") else src))
+        object.__setattr__(self, "_plan", tuple(plan))
+        object.__setattr__(self, "_resolve", _compile_spec(self))
+
+    def __reduce__(self):
+        # The compiled resolver is a closure: rebuild it from the declarative fields
+        return ColumnSpec, (self.name, self.sources, self.kind, self.fallback)
+
+    def value(self, attrs: Dict[str, str], children: Dict[str, List[ET.Element]], row: Dict[str, object]) -> object:
+        """Resolve the column from the item's attribute dict and its tag -> children map."""
+        return self._resolve(attrs, children, row)
+
+
+def _compile_spec(spec: ColumnSpec) -> Callable[[Dict[str, str], Dict[str, List[ET.Element]], Dict[str, object]], object]:
+    """Turn a ColumnSpec into a resolver specialised for its kind (the per-item hot path)."""
+    plan, kind, fallback = spec._plan, spec.kind, spec.fallback
+    default = 0.0 if kind == "float" else "No" if kind == "bool" else ""
+
+    def missing(row):
+        return fallback(row) if fallback is not None else default
+
+    if kind == "list":
+        def resolve(attrs, children, row):
+            items: List[str] = []
+            for is_attr, key in plan:
+                if is_attr:
+                    v = attrs.get(key)
+                    if v:
+                        items.extend(part.strip() for part in v.replace(";", ",").split(","))
+                else:
+                    items.extend(c.text.strip() for c in children.get(key, ()) if c.text)
+            return "; ".join(dict.fromkeys(item for item in items if item))
+    elif kind == "bool":
+        def resolve(attrs, children, row):
+            for is_attr, key in plan:
+                if is_attr:
+                    v = attrs.get(key)
+                    if v is None:
+                        continue
+                else:
+                    found = children.get(key)
+                    if found is None:
+                        continue
+                    v = found[0].text
+                return "Yes" if _boolish(v) else (v.strip() if v and v.strip() else "No")
+            return missing(row)
+    elif kind == "text":
+        def resolve(attrs, children, row):
+            for is_attr, key in plan:
+                if is_attr:
+                    v = attrs.get(key)
+                    if v:
+                        return v
+                else:
+                    found = children.get(key)
+                    if found and found[0].text:
+                        v = _norm_ws(found[0].text)
+                        if v:
+                            return v
+            return missing(row)
+    else:
+        convert = str.strip if kind == "strip" else float
+
+        def resolve(attrs, children, row):
+            for is_attr, key in plan:
+                if is_attr:
+                    v = attrs.get(key)
+                else:
+                    found = children.get(key)
+                    v = found[0].text if found else None
+                if v:
+                    try:
+                        return convert(v)
+                    except ValueError:
+                        continue
+            return missing(row)
+    return resolve
+
+
+def _risk_from_severity(row: Dict[str, object]) -> str:
+    return severity_text_from_id(str(row["Severity"]))
+
+
+# ReportItem columns; the remaining COLUMNS come from host_fields()
+COLUMN_SPECS: Dict[str, ColumnSpec] = {spec.name: spec for spec in (
+    ColumnSpec("Severity", ("@severity",), "strip"),
+    ColumnSpec("Risk Factor", ("risk_factor",), fallback=_risk_from_severity),
+    ColumnSpec("Plugin ID", ("@pluginID", "@plugin_id")),
+    ColumnSpec("CVE", ("cve", "@cve"), "list"),
+    ColumnSpec("Plugin Name", ("@pluginName", "@plugin_name", "plugin_name")),
+    ColumnSpec("Plugin Output", ("plugin_output",)),
+    ColumnSpec("Solution", ("solution",)),
+    ColumnSpec("Description", ("description",)),
+    # Prefer CVSS v3 base, then v2 base; exporters use attributes or child elements
+    ColumnSpec("CVSS Score", (
+        "@cvss3_base_score", "cvss3_base_score",
+        "@cvssV3_base_score", "cvssV3_base_score",
+        "@cvss3_base_score_temporal", "cvss3_base_score_temporal",
+        "@cvss_base_score", "cvss_base_score",
+        "@cvss_base_score_temporal", "cvss_base_score_temporal",
+    ), "float"),
+    ColumnSpec("Exploit Available", ("@exploit_available", "exploit_available"), "bool"),
+    ColumnSpec("Metasploit Name", ("metasploit_name", "@metasploit_name")),
+    ColumnSpec("plugin_publication_date", ("plugin_publication_date", "@plugin_publication_date")),
+    ColumnSpec("patch_publication_date", ("patch_publication_date", "@patch_publication_date")),
+    ColumnSpec("vuln_publication_date", ("vuln_publication_date", "@vuln_publication_date")),
+)}
+
+
+def load_column_specs(path: Path) -> Tuple[ColumnSpec, ...]:
+    """
+    Read extra column specs from a JSON list such as
+      [{"name": "See Also", "sources": ["see_also"]},
+       {"name": "CPE", "sources": ["cpe"], "kind": "list"},
+       {"name": "Compliance Result", "sources": ["cm:compliance-result"]},
+       {"name": "STIG Severity", "sources": ["stig_severity"], "kind": "strip"}]
+    Raises ValueError on malformed specs.
+    """
+    data = json.loads(path.read_text(encoding="utf-8"))
+    if not isinstance(data, list):
+        raise ValueError(f"{path}: expected a JSON list of column specs")
+    specs = []
+    for entry in data:
+        if not isinstance(entry, dict) or not isinstance(entry.get("name"), str):
+            raise ValueError(f"{path}: each column spec needs a 'name': {entry!r}")
+        sources = entry.get("sources")
+        if isinstance(sources, str):
+            sources = [sources]
+        if not isinstance(sources, list) or not all(isinstance(src, str) for src in sources):
+            raise ValueError(f"{path}: column {entry['name']!r} needs a list of 'sources'")
+        specs.append(ColumnSpec(entry["name"], tuple(sources), entry.get("kind", "text")))
+    return tuple(specs)
+
+
+def _row_plan() -> List[Tuple[str, Callable]]:
+    return [(col, COLUMN_SPECS[col]._resolve) for col in COLUMNS if col in COLUMN_SPECS]
+
+
+_ROW_PLAN = _row_plan()  # (column, resolver) for the ReportItem columns
+_ROW_TEMPLATE = dict.fromkeys(COLUMNS)  # keeps rows in COLUMNS order
+
+
+def register_columns(specs: Iterable[ColumnSpec]) -> None:
+    """Append extra ReportItem columns to COLUMNS (idempotent for an already registered spec)."""
+    for spec in specs:
+        if spec.name in COLUMNS:
+            if COLUMN_SPECS.get(spec.name) == spec:
+                continue
+            raise ValueError(f"column {spec.name!r} already exists")
+        COLUMN_SPECS[spec.name] = spec
+        COLUMNS.append(spec.name)
+    _ROW_PLAN[:] = _row_plan()
+    _ROW_TEMPLATE.update(dict.fromkeys(COLUMNS))
+    _COLUMN_ENCODERS[:] = [_ENCODERS.get(TABLE_KINDS.get(col, "str")) for col in COLUMNS]
+
+
+def row_from_report_item(ri: ET.Element, host: Dict[str, str]) -> Dict[str, object]:
+    """
+    Build one output row (COLUMNS order) from a ReportItem and its host_fields().
+    The item's children are walked once into a tag map that every ColumnSpec reads.
+    """
+    attrs = ri.attrib
+    if type(attrs) is not dict:
+        attrs = dict(attrs)  # lxml attribute access goes through a proxy
+    children: Dict[str, List[ET.Element]] = {}
+    for child in ri:
+        children.setdefault(child.tag, []).append(child)
+    row = _ROW_TEMPLATE.copy()
+    row.update(host)
+    for col, resolve in _ROW_PLAN:
+        row[col] = resolve(attrs, children, row)
+    return row
+
+
+# ------------------------------ Plugin Output Spill ------------------------
+
+EXCEL_CELL_MAX_CHARS = 32_767
+_OUTPUT_IDX, _FILE_IDX, _HOST_IDX, _PLUGIN_IDX = (
+    COLUMNS.index(c) for c in ("Plugin Output", "File", "IP/Name", "Plugin ID")
+)
+
+
+def _safe_name(text: str, max_len: int = 80) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", text).strip("._")[:max_len] or "_"
+
+
+def spill_plugin_output(row: Dict[str, object], ri: ET.Element, max_chars: int, output_dir: Path) -> bool:
+    """
+    If the row's Plugin Output is longer than `max_chars`, write the item's original
+    plugin_output text (line breaks kept) to a gzip file under `output_dir` and
+    replace the cell with a preview plus a reference, at most `max_chars` long.
+
+    Files are <file stem>/<host>_<plugin id>_<content digest>.txt.gz: one per distinct
+    output, so re-runs and identical outputs reuse the same file. Returns True if spilled.
+    """
+    text = str(row["Plugin Output"])
+    if len(text) <= max_chars:
+        return False
+    elem = ri.find("plugin_output")
+    raw = elem.text if elem is not None and elem.text else text
+    row["Plugin Output"] = _spill_text(text, raw, row["File"], row["IP/Name"], row["Plugin ID"], max_chars, output_dir)
+    return True
+
+
+def _spill_text(text: str, raw: str, file_name: object, host: object, plugin_id: object,
+                max_chars: int, output_dir: Path) -> str:
+    """Write `raw` to its sidecar file and return the `text` preview plus reference, at most `max_chars` long."""
+    data = raw.encode("utf-8")
+    digest = hashlib.sha1(data).hexdigest()[:12]
+    rel = Path(_safe_name(Path(str(file_name)).stem)) / (
+        f"{_safe_name(str(host))}_{_safe_name(str(plugin_id))}_{digest}.txt.gz"
+    )
+    target = output_dir / rel
+    if not target.exists():
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")  # workers may race on the same output
+        with gzip.GzipFile(tmp, "wb", mtime=0) as fh:
+            fh.write(data)
+        os.replace(tmp, target)
+    ref = f" ... [truncated from {len(text):,} chars; full output: {output_dir.name}/{rel.as_posix()}]"
+    return text[:max(0, max_chars - len(ref))] + ref
+
+
+def cap_plugin_output(values: Tuple[object, ...], output_dir: Path) -> Tuple[object, ...]:
+    """
+    Row values (COLUMNS order) with a Plugin Output that fits an Excel cell. Rows read
+    from a store ingested for Parquet (or with --output-max-chars 0) can still carry
+    longer outputs; those are spilled here, at write time, like at parse time.
+    """
+    text = values[_OUTPUT_IDX]
+    if not isinstance(text, str) or len(text) <= EXCEL_CELL_MAX_CHARS:
+        return values
+    capped = list(values)
+    capped[_OUTPUT_IDX] = _spill_text(text, text, values[_FILE_IDX], values[_HOST_IDX], values[_PLUGIN_IDX],
+                                      EXCEL_CELL_MAX_CHARS, output_dir)
+    return tuple(capped)
+
+
+def _item_row(ri: ET.Element, host: Dict[str, str], options: ParseOptions | None) -> Dict[str, object]:
+    row = row_from_report_item(ri, host)
+    if options is not None and options.output_max_chars and options.output_dir:
+        spill_plugin_output(row, ri, options.output_max_chars, Path(options.output_dir))
+    return row
+
+
+# ------------------------------ Row Streaming ------------------------------
+
+def rows_from_host(host_elem: ET.Element, file_name: str,
+                   options: ParseOptions | None = None) -> Iterator[Dict[str, object]]:
+    host = host_fields(host_elem, file_name)
+    if options is not None and not options.accepts_host(host, host_elem):
+        return
+    for ri in host_elem.findall("ReportItem"):
+        if options is None or options.accepts_item(ri):
+            yield _item_row(ri, host, options)
+
+
+def iter_rows_from_file(nessus_path: Path, options: ParseOptions | None = None) -> Iterator[Dict[str, object]]:
+    """
+    Stream rows from a .nessus file one ReportItem at a time.
+
+    Built on iterparse: a ReportHost's host columns are read once its
+    HostProperties block ends, then every ReportItem is turned into a row as soon
+    as its end tag is seen and detached from the tree. Peak memory is bounded by
+    the largest single item, not by the file size.
+    With `options`, rejected hosts and items (attribute checks only) never build a row.
+    On a parse error the rows completed before it have already been yielded.
+    """
     LOG.info("Parsing: %s", nessus_path.name)
+    if options is not None:
+        register_columns(options.extra_columns)
+    if options is not None and options.parser == "lxml":
+        yield from _iter_rows_lxml(nessus_path, options)
+        return
+    open_elems: List[ET.Element] = []  # root first
+    host: Dict[str, str] | None = None
+    host_ok = True
     try:
-        tree = ET.parse(nessus_path)
+        for event, elem in ET.iterparse(str(nessus_path), events=("start", "end")):
+            if event == "start":
+                open_elems.append(elem)
+                continue
+            open_elems.pop()
+            depth = len(open_elems)
+            in_host = depth == 3 and open_elems[2].tag == "ReportHost" and open_elems[1].tag == "Report"
+            if in_host and elem.tag == "ReportItem":
+                host_elem = open_elems[2]
+                if host is None:
+                    host = host_fields(host_elem, nessus_path.name)
+                    host_ok = options is None or options.accepts_host(host, host_elem)
+                if host_ok and (options is None or options.accepts_item(elem)):
+                    yield _item_row(elem, host, options)
+                host_elem.remove(elem)
+            elif in_host and elem.tag == "HostProperties":
+                host = host_fields(open_elems[2], nessus_path.name)
+                host_ok = options is None or options.accepts_host(host, open_elems[2])
+            elif depth == 2 and elem.tag == "ReportHost" and open_elems[1].tag == "Report":
+                open_elems[1].remove(elem)
+                host, host_ok = None, True
+            elif depth == 1:
+                # Finished top-level block (Policy, Report): nothing refers to it anymore
+                open_elems[0].remove(elem)
     except ET.ParseError as e:
         LOG.error("XML parse error in %s: %s", nessus_path, e)
-        return []
-
-    root = tree.getroot()
-    rows: List[Dict[str, object]] = []
-
-    for report in root.findall("Report"):
-        for host in report.findall("ReportHost"):
-            host_name = host.get("name") or ""
-            props = parse_host_properties(host)
-
-            # Common host properties (case-insensitive lookup via _coalesce)
-            ip = _coalesce(
-                props,
-                "host-ip",
-                "Host-IP",
-                "host_ip",
-                "Host IP",
-            )
-            fqdn = _coalesce(props, "host-fqdn", "FQDN", "host-fqdn0")
-            netbios = _coalesce(props, "netbios-name", "host-netbios-name", "NetBIOS-Name")
-            os_name = _coalesce(props, "operating-system", "Operating System", "os")
-
-            # Credentialed scan flags and user (best-effort across exporters)
-            cred_flag = _coalesce(
-                props,
-                "Credentialed_Scan",
-                "credentialed_scan",
-                "host-credentialed-scan",
-                "local_checks_enabled",
-                "Local Checks Enabled",
-            )
-            credentialed_check = "Yes" if _boolish(cred_flag) else "No"
-
-            credentialed_user = _coalesce(
-                props,
-                # Seen in some exports when SSH auth is used
-                "ssh-login-used",
-                "ssh_login_used",
-                # Seen in some Windows/SMB contexts
-                "smb-login-used",
-                "host-smb-login-used",
-                # Occasionally present as a generic field
-                "credentialed_user",
-                "local_checks_user",
-            )
 
-            ip_or_name = ip or host_name
-
-            for ri in host.findall("ReportItem"):
-                severity_id = (ri.get("severity") or "").strip()
-                risk_factor = parse_text_child(ri, "risk_factor") or severity_text_from_id(severity_id)
-
-                plugin_id = ri.get("pluginID") or ri.get("plugin_id") or ""
-                plugin_name = ri.get("pluginName") or ri.get("plugin_name") or parse_text_child(ri, "plugin_name")
-                plugin_output = parse_report_item_output(ri)
-                cves = parse_cves(ri)
-                solution = parse_text_child(ri, "solution")
-                description = parse_text_child(ri, "description")
-                cvss = parse_report_item_scores(ri)
-
-                # After CVSS
-                exploit_available = parse_bool_child_or_attr(ri, "exploit_available")
-                metasploit_name = parse_text_child(ri, "metasploit_name") or ri.get("metasploit_name", "")
-                plugin_pub = parse_text_child(ri, "plugin_publication_date") or ri.get("plugin_publication_date", "")
-                patch_pub = parse_text_child(ri, "patch_publication_date") or ri.get("patch_publication_date", "")
-                vuln_pub = parse_text_child(ri, "vuln_publication_date") or ri.get("vuln_publication_date", "")
-
-                row = {
-                    "File": nessus_path.name,
-                    "IP Address": ip,
-                    "FQDN": fqdn,
-                    "Netbios Name": netbios,
-                    "OS": os_name,
-                    "IP/Name": ip_or_name,
-                    "Severity": severity_id,
-                    "Risk Factor": risk_factor,
-                    "Plugin ID": plugin_id,
-                    "CVE": cves,
-                    "Plugin Name": plugin_name,
-                    "Plugin Output": plugin_output,
-                    "Credentialed Check": credentialed_check,
-                    "Credentialed User": credentialed_user,
-                    "Solution": solution,
-                    "Description": description,
-                    "CVSS Score": cvss,
-                    "Exploit Available": exploit_available,
-                    "Metasploit Name": metasploit_name,
-                    "plugin_publication_date": plugin_pub,
-                    "patch_publication_date": patch_pub,
-                    "vuln_publication_date": vuln_pub,
-                }
-                rows.append(row)
 
+def _iter_rows_lxml(nessus_path: Path, options: ParseOptions | None) -> Iterator[Dict[str, object]]:
+    """
+    lxml flavour of iter_rows_from_file(): iterparse only reports the tags we act
+    on, huge_tree lifts libxml2's limits for very large plugin outputs, and
+    getparent() replaces the open-element stack. Rows are identical.
+    """
+    from lxml import etree
+
+    host: Dict[str, str] | None = None
+    host_ok = True
+    try:
+        for _, elem in etree.iterparse(str(nessus_path), events=("end",), huge_tree=True,
+                                       tag=("HostProperties", "ReportItem", "ReportHost", "Policy")):
+            parent = elem.getparent()
+            if elem.tag == "Policy":
+                parent.remove(elem)
+                continue
+            if parent is None or parent.getparent() is None:
+                continue
+            in_host = parent.tag == "ReportHost" and parent.getparent().tag == "Report"
+            if in_host and elem.tag == "ReportItem":
+                if host is None:
+                    host = host_fields(parent, nessus_path.name)
+                    host_ok = options is None or options.accepts_host(host, parent)
+                if host_ok and (options is None or options.accepts_item(elem)):
+                    yield _item_row(elem, host, options)
+                parent.remove(elem)
+            elif in_host and elem.tag == "HostProperties":
+                host = host_fields(parent, nessus_path.name)
+                host_ok = options is None or options.accepts_host(host, parent)
+            elif elem.tag == "ReportHost" and parent.tag == "Report" and parent.getparent().getparent() is None:
+                parent.remove(elem)
+                host, host_ok = None, True
+    except etree.XMLSyntaxError as e:
+        LOG.error("XML parse error in %s: %s", nessus_path, e)
+
+
+def row_values(row: Dict[str, object]) -> Tuple[object, ...]:
+    """Compact form of a row: its values in COLUMNS order (no per-row key strings)."""
+    return tuple(row[c] for c in COLUMNS)
+
+
+def extract_rows_from_file(nessus_path: Path, workers: int = 1,
+                           options: ParseOptions | None = None) -> List[Dict[str, object]]:
+    if workers > 1:
+        return extract_rows_parallel(nessus_path, workers, options)
+    return list(iter_rows_from_file(nessus_path, options))
+
+
+# ------------------------------ Compact Rows --------------------------------
+
+# Storage kind per column; anything not listed is an interned string ("str")
+TABLE_KINDS = {
+    "Severity": "int8",
+    "CVSS Score": "float32",
+    "Credentialed Check": "bool",
+    "Exploit Available": "bool",
+    "plugin_publication_date": "date",
+    "patch_publication_date": "date",
+    "vuln_publication_date": "date",
+    "Plugin Output": "text",  # mostly unique: not worth interning
+}
+_TYPECODES = {"int8": "b", "float32": "f", "bool": "b", "date": "i", "str": "I"}
+_MISSING = {"int8": -1, "float32": float("nan"), "bool": -1, "date": -(2 ** 31)}
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+@lru_cache(maxsize=4096)
+def _encode_int8(value: object) -> int | None:
+    if value == "":
+        return _MISSING["int8"]
+    if isinstance(value, str) and value.isdigit() and len(value) < 3 and str(int(value)) == value:
+        return int(value)
+    return None
+
+
+@lru_cache(maxsize=4096)
+def _encode_float32(value: object) -> float | None:
+    if not isinstance(value, float):
+        return None
+    f32 = struct.unpack("f", struct.pack("f", value))[0]
+    return f32 if _decode_float32(f32) == value else None
+
+
+@lru_cache(maxsize=4096)
+def _decode_float32(value: float) -> float:
+    return float(f"{value:.7g}")
+
+
+@lru_cache(maxsize=4096)
+def _encode_bool(value: object) -> int | None:
+    return 1 if value == "Yes" else 0 if value == "No" else None
+
+
+@lru_cache(maxsize=4096)
+def _encode_date(value: object) -> int | None:
+    if value == "":
+        return _MISSING["date"]
+    try:
+        y, m, d = (int(part) for part in str(value).split("/"))
+        days = date(y, m, d).toordinal() - _EPOCH_ORDINAL
+    except ValueError:
+        return None
+    return days if f"{y:04d}/{m:02d}/{d:02d}" == value else None
+
+
+@lru_cache(maxsize=4096)
+def _decode_date(days: int) -> str:
+    if days == _MISSING["date"]:
+        return ""
+    return date.fromordinal(days + _EPOCH_ORDINAL).strftime("%Y/%m/%d")
+
+
+_ENCODERS = {"int8": _encode_int8, "float32": _encode_float32, "bool": _encode_bool, "date": _encode_date}
+_DECODERS = {
+    "int8": lambda v: "" if v == _MISSING["int8"] else str(v),
+    "float32": _decode_float32,
+    "bool": lambda v: "Yes" if v == 1 else "No",
+    "date": _decode_date,
+}
+# Per COLUMNS position: encoder for typed columns, None for strings and text
+_COLUMN_ENCODERS = [_ENCODERS.get(TABLE_KINDS.get(col, "str")) for col in COLUMNS]
+
+
+class FindingTable:
+    """
+    Columnar, typed storage for finding rows (COLUMNS order).
+
+    Each column is an array.array (int8 severity and booleans, float32 CVSS,
+    int32 days-since-epoch dates, uint32 codes into a per-column string pool) or,
+    for 'Plugin Output', a plain list. A value its column type cannot reproduce
+    exactly (e.g. an odd Exploit Available text) is kept as-is on the side, so
+    iterating the table yields the same tuples as row_values(). Tables pickle
+    compactly, which is how worker processes hand rows back.
+    """
+
+    __slots__ = ("n_rows", "_columns", "_pools", "_lookups", "_raw")
+
+    def __init__(self) -> None:
+        self.n_rows = 0
+        self._columns: List[object] = []
+        self._pools: List[List[str] | None] = []
+        self._lookups: List[Dict[str, int] | None] = []
+        self._raw: Dict[int, List[Tuple[int, object]]] = {}  # row -> [(column idx, value)], rows ascending
+        for col in COLUMNS:
+            kind = TABLE_KINDS.get(col, "str")
+            self._columns.append([] if kind == "text" else array(_TYPECODES[kind]))
+            self._pools.append([] if kind == "str" else None)
+            self._lookups.append({} if kind == "str" else None)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, object]] | Iterable[Tuple[object, ...]]) -> "FindingTable":
+        table = cls()
+        for row in rows:
+            table.append(row_values(row) if isinstance(row, dict) else row)
+        return table
+
+    def __len__(self) -> int:
+        return self.n_rows
+
+    def __getstate__(self):
+        return self.n_rows, self._columns, self._pools, self._raw
+
+    def __setstate__(self, state) -> None:
+        self.n_rows, self._columns, self._pools, self._raw = state
+        self._lookups = [None if pool is None else {v: i for i, v in enumerate(pool)} for pool in self._pools]
+
+    def _intern(self, idx: int, value: str) -> int:
+        lookup = self._lookups[idx]
+        code = lookup.get(value)
+        if code is None:
+            code = lookup[value] = len(self._pools[idx])
+            self._pools[idx].append(value)
+        return code
+
+    def append(self, values: Tuple[object, ...]) -> None:
+        for idx, (store, lookup, encode, value) in enumerate(
+                zip(self._columns, self._lookups, _COLUMN_ENCODERS, values)):
+            if lookup is not None:
+                code = lookup.get(value)
+                store.append(self._intern(idx, value) if code is None else code)
+            elif encode is None:
+                store.append(value)
+            else:
+                encoded = encode(value)
+                if encoded is None:
+                    self._raw.setdefault(self.n_rows, []).append((idx, value))
+                    encoded = _MISSING[TABLE_KINDS[COLUMNS[idx]]]
+                store.append(encoded)
+        self.n_rows += 1
+
+    def extend(self, other: "FindingTable") -> None:
+        """Append all rows of another table (string codes are remapped into this table's pools)."""
+        offset = self.n_rows
+        for idx, (mine, theirs) in enumerate(zip(self._columns, other._columns)):
+            if self._pools[idx] is not None:
+                remap = [self._intern(idx, v) for v in other._pools[idx]]
+                mine.extend(array("I", [remap[c] for c in theirs]))
+            else:
+                mine.extend(theirs)
+        for row, entries in other._raw.items():
+            self._raw[row + offset] = list(entries)
+        self.n_rows += other.n_rows
+
+    def _decoded(self, idx: int, start: int, stop: int) -> List[object]:
+        kind = TABLE_KINDS.get(COLUMNS[idx], "str")
+        chunk = self._columns[idx][start:stop]
+        if kind == "str":
+            pool = self._pools[idx]
+            return [pool[c] for c in chunk]
+        if kind == "text":
+            return chunk
+        decode = _DECODERS[kind]
+        return [decode(v) for v in chunk]
+
+    def __iter__(self) -> Iterator[Tuple[object, ...]]:
+        """Row value tuples in COLUMNS order, identical to what was appended."""
+        step = 10_000
+        raw_rows = list(self._raw)  # ascending: rows are only ever appended
+        for start in range(0, self.n_rows, step):
+            stop = min(start + step, self.n_rows)
+            columns = [self._decoded(idx, start, stop) for idx in range(len(COLUMNS))]
+            for k in range(bisect.bisect_left(raw_rows, start), bisect.bisect_left(raw_rows, stop)):
+                row = raw_rows[k]
+                for idx, value in self._raw[row]:
+                    columns[idx][row - start] = value
+            yield from zip(*columns)
+
+    def to_dataframe(self):
+        """
+        Typed pandas DataFrame: int8 Severity (-1 when missing), float32 CVSS Score,
+        nullable booleans, datetime64 dates and categorical string columns built
+        straight from the pools. Numeric columns wrap the arrays without copying.
+        Values kept on the side (not representable in the column type) show as missing.
+        Requires pandas.
+        """
+        import numpy as np
+        import pandas as pd
+
+        data = {}
+        for idx, col in enumerate(COLUMNS):
+            kind = TABLE_KINDS.get(col, "str")
+            store = self._columns[idx]
+            if kind == "str":
+                codes = np.frombuffer(store, dtype=np.uint32).astype(np.int32) if self.n_rows else []
+                data[col] = pd.Categorical.from_codes(codes, categories=pd.Index(self._pools[idx], dtype=object))
+            elif kind == "text":
+                data[col] = pd.Series(store, dtype=object)
+            elif kind == "int8":
+                data[col] = np.frombuffer(store, dtype=np.int8)
+            elif kind == "float32":
+                data[col] = np.frombuffer(store, dtype=np.float32)
+            elif kind == "bool":
+                flags = np.frombuffer(store, dtype=np.int8)
+                data[col] = pd.arrays.BooleanArray(flags == 1, flags < 0)
+            else:
+                days = np.frombuffer(store, dtype=np.int32).astype("int64")
+                days[days == _MISSING["date"]] = np.iinfo("int64").min  # NaT
+                data[col] = days.view("datetime64[D]").astype("datetime64[s]")
+        return pd.DataFrame(data, columns=COLUMNS)
+
+
+def extract_table_from_file(nessus_path: Path, workers: int = 1,
+                            options: ParseOptions | None = None) -> FindingTable:
+    """Parse one .nessus file into a FindingTable (streaming, or across `workers` processes)."""
+    if workers > 1:
+        return extract_values_parallel(nessus_path, workers, options)
+    return FindingTable.from_rows(iter_rows_from_file(nessus_path, options))
+
+
+# ------------------------------ Parallel (byte offsets) ---------------------
+
+_HOST_OPEN = b"<ReportHost"
+_HOST_CLOSE = b"</ReportHost>"
+_START_TAG_RE = re.compile(rb"<([A-Za-z_][\w.:-]*)(?:\s[^>]*)?>")
+_REPORT_TAG_RE = re.compile(rb"<Report(?:\s[^>]*)?>")
+
+
+def index_report_hosts(nessus_path: Path) -> Tuple[bytes, bytes, List[Tuple[int, int]]]:
+    """
+    Memory-map the file and record the byte span of every <ReportHost ...>...</ReportHost>.
+
+    Returns (envelope, suffix, spans). `envelope` is the prolog plus the root and Report
+    start tags (which carry the namespace declarations) and `suffix` closes them, so
+    envelope + file[start:end] + suffix is a well-formed document for each span.
+    """
+    spans: List[Tuple[int, int]] = []
+    if nessus_path.stat().st_size == 0:
+        return b"", b"", spans
+    with open(nessus_path, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        pos = 0
+        while True:
+            start = mm.find(_HOST_OPEN, pos)
+            if start < 0:
+                break
+            after = start + len(_HOST_OPEN)
+            if mm[after:after + 1] not in (b" ", b"\t", b"\r", b"\n", b">", b"/"):
+                pos = after  # e.g. <ReportHostX>
+                continue
+            end = mm.find(_HOST_CLOSE, after)
+            if end < 0:
+                break  # truncated file: the streaming parser reports it
+            pos = end + len(_HOST_CLOSE)
+            spans.append((start, pos))
+        if not spans:
+            return b"", b"", spans
+        head = mm[:spans[0][0]]
+
+    root = _START_TAG_RE.search(head)
+    reports = list(_REPORT_TAG_RE.finditer(head, root.end())) if root else []
+    if not root or not reports:
+        return b"", b"", []
+    envelope = head[:root.end()] + reports[-1].group(0)
+    suffix = b"</Report></" + root.group(1) + b">"
+    return envelope, suffix, spans
+
+
+def _batch_spans(spans: List[Tuple[int, int]], parts: int) -> List[List[Tuple[int, int]]]:
+    """Group consecutive spans into about `parts` batches of similar byte size."""
+    target = max(1, sum(e - s for s, e in spans) // max(1, parts))
+    batches: List[List[Tuple[int, int]]] = []
+    current: List[Tuple[int, int]] = []
+    size = 0
+    for span in spans:
+        current.append(span)
+        size += span[1] - span[0]
+        if size >= target:
+            batches.append(current)
+            current, size = [], 0
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _parse_host_batch(nessus_path: str, envelope: bytes, suffix: bytes,
+                      spans: List[Tuple[int, int]], file_name: str,
+                      options: ParseOptions | None = None) -> FindingTable:
+    """Worker entry point: parse each ReportHost span on its own and return its rows as a table."""
+    if options is not None:
+        register_columns(options.extra_columns)
+    rows = FindingTable()
+    with open(nessus_path, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for start, end in spans:
+            root = _fromstring(envelope + mm[start:end] + suffix, options.parser if options else "etree")
+            for host in root.find("Report").findall("ReportHost"):
+                for r in rows_from_host(host, file_name, options):
+                    rows.append(row_values(r))
+    return rows
+
+
+def _parse_file_values(nessus_path: str, options: ParseOptions | None = None) -> FindingTable:
+    """Worker entry point: stream one whole file and return its rows as a table."""
+    return FindingTable.from_rows(iter_rows_from_file(Path(nessus_path), options))
+
+
+def extract_rows_parallel(nessus_path: Path, workers: int,
+                          options: ParseOptions | None = None) -> List[Dict[str, object]]:
+    return [dict(zip(COLUMNS, v)) for v in extract_values_parallel(nessus_path, workers, options)]
+
+
+def extract_values_parallel(nessus_path: Path, workers: int, options: ParseOptions | None = None) -> FindingTable:
+    """
+    Parse one .nessus file on several cores: index the ReportHost byte spans, parse
+    batches of spans in a process pool and merge the row values back in host order.
+    Falls back to the streaming parser when the file cannot be split that way.
+    """
+    LOG.info("Indexing: %s", nessus_path.name)
+    envelope, suffix, spans = index_report_hosts(nessus_path)
+    if not spans:
+        LOG.warning("No ReportHost spans indexed in %s; using the streaming parser", nessus_path.name)
+        return _parse_file_values(str(nessus_path), options)
+
+    batches = _batch_spans(spans, workers * 8)
+    LOG.info("Parsing: %s (%d hosts, %d batches, %d workers)",
+             nessus_path.name, len(spans), len(batches), workers)
+    rows = FindingTable()
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = deque(
+                pool.submit(_parse_host_batch, str(nessus_path), envelope, suffix, batch, nessus_path.name, options)
+                for batch in batches
+            )
+            # Popped as they are merged, so each batch's table is freed once copied into `rows`
+            while futures:
+                rows.extend(futures.popleft().result())
+    except ET.ParseError as e:
+        LOG.warning("Byte-offset split of %s failed (%s); using the streaming parser", nessus_path.name, e)
+        return _parse_file_values(str(nessus_path), options)
     return rows
 
 
+def iter_file_values(inputs: List[Path], workers: int = 1,
+                     options: ParseOptions | None = None) -> Iterator[Tuple[Path, Iterable[Tuple[object, ...]]]]:
+    """
+    (path, row values) for every input file, in file order.
+    With workers == 1 the values are streamed straight from the parser; parallel
+    modes hand over one file's rows at a time as a FindingTable.
+    """
+    if workers > 1 and len(inputs) > 1:
+        yield from extract_files_parallel(inputs, workers, options)
+    elif workers > 1:
+        for fp in inputs:
+            yield fp, extract_values_parallel(fp, workers, options)
+    else:
+        for fp in inputs:
+            yield fp, (row_values(row) for row in iter_rows_from_file(fp, options))
+
+
+def iter_input_values(inputs: List[Path], workers: int = 1,
+                      options: ParseOptions | None = None) -> Iterator[Tuple[object, ...]]:
+    """Row values (COLUMNS order) of every input file, in file order."""
+    for fp, values in iter_file_values(inputs, workers, options):
+        count = 0
+        for value in values:
+            count += 1
+            yield value
+        LOG.info("Collected %d rows from %s", count, fp.name)
+
+
+def extract_files_parallel(paths: Iterable[Path], workers: int,
+                           options: ParseOptions | None = None) -> Iterator[Tuple[Path, FindingTable]]:
+    """
+    Parse many .nessus files in a process pool, one file per task.
+    Largest files are submitted first for load balance; results are yielded in
+    file-name order as (path, row values) regardless of completion order.
+    """
+    ordered = sorted(paths, key=lambda p: p.name)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        for fp in sorted(ordered, key=lambda p: p.stat().st_size, reverse=True):
+            futures[fp] = pool.submit(_parse_file_values, str(fp), options)
+        for fp in ordered:
+            # Popped so the pool does not keep every parsed table alive until the last file is done
+            yield fp, futures.pop(fp).result()
+
+
 # ------------------------------ Excel Output --------------------------------
 
-def write_to_xlsx(rows: List[Dict[str, object]], out_path: Path) -> None:
-    if not rows:
-        LOG.warning("No rows to write. Creating an empty workbook with headers.")
-
-    columns = [
-        "File",
-        "IP Address",
-        "FQDN",
-        "Netbios Name",
-        "OS",
-        "IP/Name",
-        "Severity",
-        "Risk Factor",
-        "Plugin ID",
-        "CVE",
-        "Plugin Name",
-        "Plugin Output",
-        "Credentialed Check",
-        "Credentialed User",
-        "Solution",
-        "Description",
-        "CVSS Score",
-        "Exploit Available",
-        "Metasploit Name",
-        "plugin_publication_date",
-        "patch_publication_date",
-        "vuln_publication_date",
+SHEET_NAME = "Nessus Export"
+SHARD_INDEX_SHEET = "Shard Index"
+SHARD_INDEX_COLUMNS = ["Shard", "Location", "File", "IP/Name", "Rows"]
+EXCEL_MAX_ROWS = 1_048_576  # including the header row
+
+# Column widths (simple heuristic) and the long text columns that wrap
+COLUMN_WIDTHS = {
+    "File": 24,
+    "IP Address": 16,
+    "FQDN": 40,
+    "Netbios Name": 28,
+    "OS": 28,
+    "IP/Name": 28,
+    "Severity": 10,  # 0-4
+    "Risk Factor": 14,
+    "Plugin ID": 12,
+    "CVE": 24,
+    "Plugin Name": 36,
+    "Plugin Output": 80,
+    "Credentialed Check": 18,
+    "Credentialed User": 24,
+    "Solution": 60,
+    "Description": 80,
+    "CVSS Score": 12,
+    "Exploit Available": 18,
+    "Metasploit Name": 28,
+    "plugin_publication_date": 22,
+    "patch_publication_date": 22,
+    "vuln_publication_date": 22,
+    "Shard": 8,
+    "Location": 28,
+    "Rows": 10,
+    "Host Key": 10,
+    "Plugin Key": 10,
+}
+WRAP_COLUMNS = {"CVE", "Plugin Name", "Plugin Output", "Solution", "Description", "Metasploit Name"}
+
+
+class StreamingXlsxWriter:
+    """
+    Write-as-you-go workbook with flat memory use.
+
+    Uses xlsxwriter in constant_memory mode when installed, else openpyxl's
+    write-only mode. Widths and the wrap format are set per column, the header
+    row is frozen and an auto-filter covering the written rows is added on close.
+    """
+
+    def __init__(self, out_path: Path) -> None:
+        self.out_path = out_path
+        self.rows_written = 0
+        self._sheets: List[Tuple[object, int, int, List[int]]] = []  # (worksheet, n_columns, data rows, wrap idx)
+        try:
+            import xlsxwriter
+
+            self.engine = "xlsxwriter"
+            self._wb = xlsxwriter.Workbook(str(out_path), {
+                "constant_memory": True,
+                "strings_to_formulas": False,
+                "strings_to_urls": False,
+            })
+            self._header_fmt = self._wb.add_format({"bold": True, "border": 1, "align": "center", "valign": "vcenter"})
+            self._wrap_fmt = self._wb.add_format({"text_wrap": True, "valign": "top"})
+        except ImportError:
+            import openpyxl
+            from openpyxl.styles import Alignment, Border, Font, Side
+
+            self.engine = "openpyxl"
+            self._wb = openpyxl.Workbook(write_only=True)
+            thin = Side(style="thin")
+            self._header_style = (Font(bold=True), Border(left=thin, right=thin, top=thin, bottom=thin),
+                                  Alignment(horizontal="center", vertical="center"))
+            self._wrap_alignment = Alignment(wrap_text=True, vertical="top")
+
+    def add_sheet(self, name: str, columns: List[str]) -> int:
+        """
+        Start a new sheet and write its header. It becomes the default target of
+        write_row; the returned index targets it explicitly.
+        """
+        if self.engine == "xlsxwriter":
+            ws = self._wb.add_worksheet(name)
+            for idx, col in enumerate(columns):
+                ws.set_column(idx, idx, COLUMN_WIDTHS.get(col, 20), self._wrap_fmt if col in WRAP_COLUMNS else None)
+            ws.write_row(0, 0, columns, self._header_fmt)
+            ws.freeze_panes(1, 0)
+            wrap_idx = []
+        else:
+            from openpyxl.cell import WriteOnlyCell
+            from openpyxl.utils import get_column_letter
+
+            ws = self._wb.create_sheet(name)
+            for idx, col in enumerate(columns, start=1):
+                ws.column_dimensions[get_column_letter(idx)].width = COLUMN_WIDTHS.get(col, 20)
+            ws.freeze_panes = "A2"
+            header = []
+            for col in columns:
+                cell = WriteOnlyCell(ws, value=col)
+                cell.font, cell.border, cell.alignment = self._header_style
+                header.append(cell)
+            ws.append(header)
+            # openpyxl has no column-level default style for written cells
+            wrap_idx = [idx for idx, col in enumerate(columns) if col in WRAP_COLUMNS]
+        self._sheets.append((ws, len(columns), 0, wrap_idx))
+        return len(self._sheets) - 1
+
+    def write_row(self, values, sheet: int = -1) -> None:
+        ws, ncols, nrows, wrap_idx = self._sheets[sheet]
+        if self.engine == "xlsxwriter":
+            ws.write_row(nrows + 1, 0, values)
+        else:
+            from openpyxl.cell import WriteOnlyCell
+
+            values = list(values)
+            for idx in wrap_idx:
+                cell = WriteOnlyCell(ws, value=values[idx])
+                cell.alignment = self._wrap_alignment
+                values[idx] = cell
+            ws.append(values)
+        self._sheets[sheet] = (ws, ncols, nrows + 1, wrap_idx)
+        self.rows_written += 1
+
+    def close(self) -> None:
+        for ws, ncols, nrows, _ in self._sheets:
+            if self.engine == "xlsxwriter":
+                ws.autofilter(0, 0, nrows, ncols - 1)
+            else:
+                from openpyxl.utils import get_column_letter
+
+                ws.auto_filter.ref = f"A1:{get_column_letter(ncols)}{nrows + 1}"
+        if self.engine == "xlsxwriter":
+            self._wb.close()
+        else:
+            self._wb.save(self.out_path)
+
+
+def _shard_sheet_name(n: int) -> str:
+    return SHEET_NAME if n == 1 else f"{SHEET_NAME} ({n})"
+
+
+def write_to_xlsx(rows: Iterable[Dict[str, object]] | Iterable[Tuple[object, ...]], out_path: Path,
+                  shard_rows: int = EXCEL_MAX_ROWS - 1, shard_mode: str = "sheet",
+                  output_dir: Path | None = None) -> int:
+    """
+    Stream row dicts, or row value tuples in COLUMNS order, into the 'Nessus Export'
+    sheet as they are produced. Returns the number of rows written.
+
+    Every `shard_rows` data rows (capped at Excel's row limit) a new shard starts:
+    'Nessus Export (2)', '(3)', ... sheets, or <stem>_2.xlsx, <stem>_3.xlsx, ...
+    workbooks with shard_mode="workbook". When more than one shard was needed, a
+    'Shard Index' sheet in the first workbook lists the rows per file and host in
+    each shard. Plugin Outputs longer than an Excel cell are spilled to `output_dir`
+    (default: <stem>_outputs/ next to the workbook).
+    """
+    shard_rows = max(1, min(shard_rows, EXCEL_MAX_ROWS - 1))
+    output_dir = output_dir or out_path.with_name(f"{out_path.stem}_outputs")
+    file_idx, host_idx = COLUMNS.index("File"), COLUMNS.index("IP/Name")
+
+    first = StreamingXlsxWriter(out_path)
+    first.add_sheet(SHEET_NAME, COLUMNS)
+    writer = first
+    # (location, {(file, host): rows}) per shard
+    shards: List[Tuple[str, Dict[Tuple[str, str], int]]] = [
+        (SHEET_NAME if shard_mode == "sheet" else out_path.name, {})
     ]
+    total = 0
+    in_shard = 0
+    for row in rows:
+        values = cap_plugin_output(row_values(row) if isinstance(row, dict) else row, output_dir)
+        if in_shard == shard_rows:
+            n = len(shards) + 1
+            if shard_mode == "workbook":
+                if writer is not first:
+                    writer.close()
+                shard_path = out_path.with_name(f"{out_path.stem}_{n}{out_path.suffix}")
+                writer = StreamingXlsxWriter(shard_path)
+                writer.add_sheet(SHEET_NAME, COLUMNS)
+                location = shard_path.name
+            else:
+                location = _shard_sheet_name(n)
+                writer.add_sheet(location, COLUMNS)
+            LOG.info("Shard %d reached %d rows; continuing in %s", n - 1, in_shard, location)
+            shards.append((location, {}))
+            in_shard = 0
+        writer.write_row(values)
+        key = (values[file_idx], values[host_idx])
+        counts = shards[-1][1]
+        counts[key] = counts.get(key, 0) + 1
+        in_shard += 1
+        total += 1
+    if writer is not first:
+        writer.close()
+
+    if len(shards) > 1:
+        first.add_sheet(SHARD_INDEX_SHEET, SHARD_INDEX_COLUMNS)
+        for n, (location, counts) in enumerate(shards, start=1):
+            for (file_name, host), count in counts.items():
+                first.write_row((n, location, file_name, host, count))
+        LOG.info("Wrote %d shards; see the '%s' sheet in %s", len(shards), SHARD_INDEX_SHEET, out_path.name)
+    first.close()
+
+    if not total:
+        LOG.warning("No rows to write. Created an empty workbook with headers.")
+    return total
+
+
+# ------------------------------ Normalized Output ---------------------------
+
+# Star layout: every COLUMNS value lives in exactly one of these tables
+HOSTS_SHEET = "Hosts"
+PLUGINS_SHEET = "Plugins"
+FINDINGS_SHEET = "Findings"
+HOST_COLUMNS = [
+    "File",
+    "IP Address",
+    "FQDN",
+    "Netbios Name",
+    "OS",
+    "IP/Name",
+    "Credentialed Check",
+    "Credentialed User",
+]
+PLUGIN_COLUMNS = [
+    "Plugin ID",
+    "Plugin Name",
+    "CVE",
+    "Solution",
+    "Description",
+    "CVSS Score",
+    "Exploit Available",
+    "Metasploit Name",
+    "plugin_publication_date",
+    "patch_publication_date",
+    "vuln_publication_date",
+]
+FINDING_COLUMNS = ["Host Key", "Plugin Key", "Severity", "Risk Factor", "Plugin Output"]
+
+
+def write_to_xlsx_normalized(rows: Iterable[Dict[str, object]] | Iterable[Tuple[object, ...]], out_path: Path,
+                             shard_rows: int = EXCEL_MAX_ROWS - 1, flat_sheet: bool = False,
+                             output_dir: Path | None = None) -> int:
+    """
+    Stream rows into a normalized workbook instead of one wide sheet:
+      Hosts     one row per (File, host), keyed by 'Host Key'
+      Plugins   one row per distinct plugin content, keyed by 'Plugin Key'
+                (compliance checks share a Plugin ID but differ in name/description,
+                so each variant gets its own key)
+      Findings  Host Key, Plugin Key and the per-finding Severity, Risk Factor, Plugin Output
+    Hosts and plugins are written the first time they are seen. De-duplication keeps
+    one tuple of column values per distinct host and per distinct plugin variant in
+    memory, so all distinct plugin text (name, description, solution, ...) is held
+    until the workbook is closed; per-finding values are not. flat_sheet=True also
+    writes the denormalized 'Nessus Export' sheet alongside. Findings (and the flat
+    sheet) roll over into '(2)', '(3)', ... sheets every `shard_rows` rows. Plugin
+    Outputs are capped as in write_to_xlsx. Returns the number of findings written.
+    """
+    shard_rows = max(1, min(shard_rows, EXCEL_MAX_ROWS - 1))
+    output_dir = output_dir or out_path.with_name(f"{out_path.stem}_outputs")
+    # Registered extra columns are per finding
+    finding_columns = FINDING_COLUMNS + [c for c in COLUMNS if c not in HOST_COLUMNS + PLUGIN_COLUMNS + FINDING_COLUMNS]
+    host_idx = [COLUMNS.index(c) for c in HOST_COLUMNS]
+    plugin_idx = [COLUMNS.index(c) for c in PLUGIN_COLUMNS]
+    finding_idx = [COLUMNS.index(c) for c in finding_columns[2:]]
+    host_keys: Dict[Tuple[object, ...], int] = {}
+    plugin_keys: Dict[Tuple[object, ...], int] = {}
+
+    writer = StreamingXlsxWriter(out_path)
+    hosts_ws = writer.add_sheet(HOSTS_SHEET, ["Host Key"] + HOST_COLUMNS)
+    plugins_ws = writer.add_sheet(PLUGINS_SHEET, ["Plugin Key"] + PLUGIN_COLUMNS)
+    findings_ws = writer.add_sheet(FINDINGS_SHEET, finding_columns)
+    flat_ws = writer.add_sheet(SHEET_NAME, COLUMNS) if flat_sheet else None
+    total = 0
+    in_shard = 0
+    shard = 1
+    for row in rows:
+        values = cap_plugin_output(row_values(row) if isinstance(row, dict) else row, output_dir)
+        if in_shard == shard_rows:
+            shard += 1
+            findings_ws = writer.add_sheet(f"{FINDINGS_SHEET} ({shard})", finding_columns)
+            if flat_ws is not None:
+                flat_ws = writer.add_sheet(_shard_sheet_name(shard), COLUMNS)
+            LOG.info("Findings sheet reached %d rows; continuing in '%s (%d)'", in_shard, FINDINGS_SHEET, shard)
+            in_shard = 0
+        host = tuple(values[i] for i in host_idx)
+        host_key = host_keys.get(host)
+        if host_key is None:
+            host_key = host_keys[host] = len(host_keys) + 1
+            writer.write_row((host_key,) + host, hosts_ws)
+        plugin = tuple(values[i] for i in plugin_idx)
+        plugin_key = plugin_keys.get(plugin)
+        if plugin_key is None:
+            plugin_key = plugin_keys[plugin] = len(plugin_keys) + 1
+            writer.write_row((plugin_key,) + plugin, plugins_ws)
+        writer.write_row((host_key, plugin_key) + tuple(values[i] for i in finding_idx), findings_ws)
+        if flat_ws is not None:
+            writer.write_row(values, flat_ws)
+        in_shard += 1
+        total += 1
+    writer.close()
+
+    LOG.info("Normalized %d findings into %d hosts and %d plugin variants", total, len(host_keys), len(plugin_keys))
+    if not total:
+        LOG.warning("No rows to write. Created an empty workbook with headers.")
+    return total
+
+
+# ------------------------------ Parquet Output ------------------------------
+
+# Repetitive host-level / plugin-level columns stored dictionary-encoded
+PARQUET_DICT_COLUMNS = [
+    "File",
+    "IP Address",
+    "FQDN",
+    "Netbios Name",
+    "OS",
+    "IP/Name",
+    "Severity",
+    "Risk Factor",
+    "Plugin ID",
+    "Plugin Name",
+    "Credentialed Check",
+    "Credentialed User",
+    "Exploit Available",
+]
+
+
+def write_to_parquet(rows: Iterable[Dict[str, object]] | Iterable[Tuple[object, ...]], out_path: Path,
+                     row_group_rows: int = 100_000) -> int:
+    """
+    Stream rows into a Parquet file with the same columns as the workbook.
+    Rows are buffered into row groups of `row_group_rows` and written as they fill.
+    Columns in PARQUET_DICT_COLUMNS get an Arrow dictionary type; 'CVSS Score' is a
+    float64 and every other column a string. Returns the number of rows written.
+    Requires pyarrow (ImportError is raised before any row is consumed).
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
 
-    df = pd.DataFrame(rows, columns=columns)
-
-    with pd.ExcelWriter(out_path, engine="openpyxl") as writer:
-        sheet_name = "Nessus Export"
-        df.to_excel(writer, index=False, sheet_name=sheet_name)
-
-        # Basic formatting via openpyxl
-        wb = writer.book
-        ws = writer.sheets[sheet_name]
-
-        # Freeze header row and set auto-filter
-        ws.freeze_panes = "A2"
-        ws.auto_filter.ref = ws.dimensions
-
-        # Adjust column widths (simple heuristic)
-        widths = {
-            "A": 24,  # File
-            "B": 16,  # IP Address
-            "C": 40,  # FQDN
-            "D": 28,  # Netbios Name
-            "E": 28,  # OS
-            "F": 28,  # IP/Name
-            "G": 10,  # Severity (0-4)
-            "H": 14,  # Risk Factor
-            "I": 12,  # Plugin ID
-            "J": 24,  # CVE
-            "K": 36,  # Plugin Name
-            "L": 80,  # Plugin Output
-            "M": 18,  # Credentialed Check
-            "N": 24,  # Credentialed User
-            "O": 60,  # Solution
-            "P": 80,  # Description
-            "Q": 12,  # CVSS Score
-            "R": 18,  # Exploit Available
-            "S": 28,  # Metasploit Name
-            "T": 22,  # plugin_publication_date
-            "U": 22,  # patch_publication_date
-            "V": 22,  # vuln_publication_date
-        }
-        for col, width in widths.items():
-            ws.column_dimensions[col].width = width
-
-        # Wrap text for long text columns
-        from openpyxl.styles import Alignment
-
-        for col_letter in ("J", "K", "L", "O", "P", "S"):
-            for cell in ws[col_letter]:
-                cell.alignment = Alignment(wrap_text=True, vertical="top")
-
-        # Align headers
-        for cell in ws[1]:
-            cell.alignment = Alignment(horizontal="center", vertical="center")
+    dict_type = pa.dictionary(pa.int32(), pa.string())
+    fields = []
+    for col in COLUMNS:
+        spec = COLUMN_SPECS.get(col)
+        if spec is not None and spec.kind == "float":
+            fields.append(pa.field(col, pa.float64()))
+        elif col in PARQUET_DICT_COLUMNS:
+            fields.append(pa.field(col, dict_type))
+        else:
+            fields.append(pa.field(col, pa.string()))
+    schema = pa.schema(fields)
+
+    def _flush(buffer: List[List[object]]) -> None:
+        arrays = []
+        for pa_field, values in zip(schema, buffer):
+            if pa_field.type == dict_type:
+                arrays.append(pa.array(values, type=pa.string()).dictionary_encode())
+            else:
+                arrays.append(pa.array(values, type=pa_field.type))
+        writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+
+    total = 0
+    buffer: List[List[object]] = [[] for _ in COLUMNS]
+    with pq.ParquetWriter(str(out_path), schema, compression="zstd",
+                          use_dictionary=PARQUET_DICT_COLUMNS) as writer:
+        for row in rows:
+            values = row_values(row) if isinstance(row, dict) else row
+            for column, value in zip(buffer, values):
+                column.append(value)
+            total += 1
+            if len(buffer[0]) >= row_group_rows:
+                _flush(buffer)
+                buffer = [[] for _ in COLUMNS]
+        if buffer[0] or not total:
+            _flush(buffer)
+    if not total:
+        LOG.warning("No rows to write. Created an empty Parquet file with the schema.")
+    return total
+
+
+# ------------------------------ SQLite Store --------------------------------
+
+STORE_SCHEMA_VERSION = 1
+
+
+def _file_sha256(path: Path, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _quote_ident(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+class FindingsStore:
+    """
+    SQLite database of every finding ingested so far, so re-runs only parse new scans.
+
+    Tables:
+      files        one row per ingested .nessus file, keyed by the SHA-256 of its content
+                   (name, size, mtime, ingest time, row count)
+      findings     one row per ReportItem, COLUMNS as columns, plus the owning file_id;
+                   indexed on Plugin ID, IP Address and Severity
+      finding_cves one row per (finding, CVE), indexed on the CVE
+    A file is skipped when its content hash is already registered; a file whose
+    name is registered with a different hash replaces the previous ingest.
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(db_path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+
+    def _create_schema(self) -> None:
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version not in (0, STORE_SCHEMA_VERSION):
+            raise RuntimeError(f"{self.db_path}: unsupported store schema version {version}")
+        columns = ",\n                ".join(
+            f"{_quote_ident(c)} {'REAL' if c == 'CVSS Score' else 'TEXT'}" for c in COLUMNS
+        )
+        with self.conn:
+            self.conn.executescript(f"""
+            CREATE TABLE IF NOT EXISTS files (
+                file_id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                sha256 TEXT NOT NULL UNIQUE,
+                size INTEGER NOT NULL,
+                mtime REAL NOT NULL,
+                ingested_at TEXT NOT NULL,
+                rows INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS files_name ON files(name);
+            CREATE TABLE IF NOT EXISTS findings (
+                finding_id INTEGER PRIMARY KEY,
+                file_id INTEGER NOT NULL REFERENCES files(file_id),
+                {columns}
+            );
+            CREATE INDEX IF NOT EXISTS findings_file ON findings(file_id);
+            CREATE INDEX IF NOT EXISTS findings_plugin ON findings("Plugin ID");
+            CREATE INDEX IF NOT EXISTS findings_ip ON findings("IP Address");
+            CREATE INDEX IF NOT EXISTS findings_severity ON findings("Severity");
+            CREATE TABLE IF NOT EXISTS finding_cves (
+                finding_id INTEGER NOT NULL REFERENCES findings(finding_id),
+                cve_id TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS finding_cves_cve ON finding_cves(cve_id);
+            CREATE INDEX IF NOT EXISTS finding_cves_finding ON finding_cves(finding_id);
+            PRAGMA user_version = {STORE_SCHEMA_VERSION};
+            """)
+
+    def lookup(self, path: Path) -> Tuple[str, bool]:
+        """
+        (SHA-256 of `path`, whether that content is already ingested).
+        A registered name with the same size and mtime is trusted without rehashing.
+        """
+        st = path.stat()
+        row = self.conn.execute(
+            "SELECT sha256 FROM files WHERE name = ? AND size = ? AND mtime = ?",
+            (path.name, st.st_size, st.st_mtime),
+        ).fetchone()
+        if row:
+            return row[0], True
+        sha = _file_sha256(path)
+        known = self.conn.execute("SELECT 1 FROM files WHERE sha256 = ?", (sha,)).fetchone() is not None
+        if known:
+            # Same content with a new mtime (copied/touched): refresh the stat shortcut
+            with self.conn:
+                self.conn.execute("UPDATE files SET size = ?, mtime = ? WHERE sha256 = ? AND name = ?",
+                                  (st.st_size, st.st_mtime, sha, path.name))
+        return sha, known
+
+    def _delete_file(self, file_id: int) -> None:
+        self.conn.execute(
+            "DELETE FROM finding_cves WHERE finding_id IN (SELECT finding_id FROM findings WHERE file_id = ?)",
+            (file_id,),
+        )
+        self.conn.execute("DELETE FROM findings WHERE file_id = ?", (file_id,))
+        self.conn.execute("DELETE FROM files WHERE file_id = ?", (file_id,))
+
+    def ingest(self, path: Path, sha: str, values: Iterable[Tuple[object, ...]], batch_rows: int = 5000) -> int:
+        """
+        Store the row values (COLUMNS order) of one file in a single transaction and
+        register it. Earlier ingests of the same file name are replaced.
+        Returns the number of rows stored.
+        """
+        st = path.stat()
+        cve_idx = COLUMNS.index("CVE")
+        insert_finding = (
+            f"INSERT INTO findings (finding_id, file_id, {', '.join(_quote_ident(c) for c in COLUMNS)}) "
+            f"VALUES ({', '.join('?' * (len(COLUMNS) + 2))})"
+        )
+        with self.conn:
+            for (file_id,) in self.conn.execute("SELECT file_id FROM files WHERE name = ?", (path.name,)).fetchall():
+                LOG.info("Replacing previous ingest of %s (content changed)", path.name)
+                self._delete_file(file_id)
+            cur = self.conn.execute(
+                "INSERT INTO files (name, sha256, size, mtime, ingested_at, rows) "
+                "VALUES (?, ?, ?, ?, datetime('now'), 0)",
+                (path.name, sha, st.st_size, st.st_mtime),
+            )
+            file_id = cur.lastrowid
+            next_id = (self.conn.execute("SELECT MAX(finding_id) FROM findings").fetchone()[0] or 0) + 1
+            total = 0
+            findings: List[Tuple[object, ...]] = []
+            cves: List[Tuple[int, str]] = []
+            for value in values:
+                findings.append((next_id, file_id, *value))
+                for cve in str(value[cve_idx]).split(";"):
+                    cve = cve.strip()
+                    if cve:
+                        cves.append((next_id, cve))
+                next_id += 1
+                if len(findings) >= batch_rows:
+                    self.conn.executemany(insert_finding, findings)
+                    self.conn.executemany("INSERT INTO finding_cves VALUES (?, ?)", cves)
+                    total += len(findings)
+                    findings, cves = [], []
+            self.conn.executemany(insert_finding, findings)
+            self.conn.executemany("INSERT INTO finding_cves VALUES (?, ?)", cves)
+            total += len(findings)
+            self.conn.execute("UPDATE files SET rows = ? WHERE file_id = ?", (total, file_id))
+        return total
+
+    def iter_values(self) -> Iterator[Tuple[object, ...]]:
+        """Every stored row in COLUMNS order, ordered by file name then ingest order."""
+        cols = ", ".join(f"f.{_quote_ident(c)}" for c in COLUMNS)
+        yield from self.conn.execute(
+            f"SELECT {cols} FROM findings f JOIN files USING (file_id) ORDER BY files.name, f.finding_id"
+        )
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def ingest_new_files(store: FindingsStore, inputs: List[Path], workers: int = 1,
+                     options: ParseOptions | None = None) -> int:
+    """Parse and store the inputs the store has not seen yet. Returns the number of new rows."""
+    pending: Dict[Path, str] = {}
+    for fp in inputs:
+        sha, known = store.lookup(fp)
+        if known:
+            LOG.info("Already ingested, skipping: %s", fp.name)
+        else:
+            pending[fp] = sha
+    total = 0
+    for fp, values in iter_file_values(list(pending), workers, options):
+        n = store.ingest(fp, pending[fp], values)
+        LOG.info("Stored %d rows from %s", n, fp.name)
+        total += n
+    return total
+
+
+# ------------------------------ Run Metrics ---------------------------------
+
+def timed_rows(metrics: RunMetrics, values: Iterable[Tuple[object, ...]],
+               stage_name: str) -> Iterator[Tuple[object, ...]]:
+    """
+    Pass row values through, charging the time spent producing them to `stage_name`
+    and to per-file / per-host costs (File and IP/Name columns). Rows of one
+    host are contiguous in every input mode.
+    """
+    file_idx, host_idx = COLUMNS.index("File"), COLUMNS.index("IP/Name")
+    file_s: Dict[str, float] = {}
+    host, host_s = None, 0.0
+    wall = cpu = 0.0
+    it = iter(values)
+    while True:
+        w0, c0 = time.perf_counter(), time.process_time()
+        value = next(it, None)
+        dw = time.perf_counter() - w0
+        wall += dw
+        cpu += time.process_time() - c0
+        if value is None:
+            break
+        key = (value[file_idx], value[host_idx])
+        if key != host:
+            if host is not None:
+                metrics.record("hosts", f"{host[0]}: {host[1]}", host_s)
+            host, host_s = key, 0.0
+        host_s += dw
+        file_s[key[0]] = file_s.get(key[0], 0.0) + dw
+        yield value
+    if host is not None:
+        metrics.record("hosts", f"{host[0]}: {host[1]}", host_s)
+    for name, seconds in file_s.items():
+        metrics.record("files", name, seconds)
+    metrics.add_time(stage_name, wall, cpu)
 
 
 # ------------------------------ Main ----------------------------------------
 
+def _severity_arg(value: str) -> int:
+    level = SEVERITY_LEVELS.get(value.strip().lower())
+    if level is None:
+        if not value.strip().isdigit() or int(value) > 4:
+            raise argparse.ArgumentTypeError(f"expected 0-4 or one of {', '.join(SEVERITY_LEVELS)}: {value!r}")
+        level = int(value)
+    return level
+
+
+def _network_arg(value: str) -> ipaddress.IPv4Network | ipaddress.IPv6Network:
+    try:
+        return ipaddress.ip_network(value.strip(), strict=False)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def _regex_arg(value: str) -> str:
+    try:
+        re.compile(value)
+    except re.error as e:
+        raise argparse.ArgumentTypeError(f"invalid regex {value!r}: {e}")
+    return value
+
+
+def parse_options_from_args(args: argparse.Namespace, parser: str = "etree",
+                            extra_columns: Tuple[ColumnSpec, ...] = (),
+                            output_dir: Path | None = None) -> ParseOptions:
+    def _split(values: List[str] | None) -> List[str]:
+        return [v.strip() for item in values or [] for v in item.split(",") if v.strip()]
+
+    return ParseOptions(
+        parser=parser,
+        min_severity=args.min_severity,
+        plugin_ids=frozenset(_split(args.plugin_id)),
+        families=frozenset(v.lower() for v in _split(args.family)),
+        host_networks=tuple(args.host_cidr or ()),
+        host_regex=args.host_regex,
+        credentialed_only=args.credentialed_only,
+        extra_columns=extra_columns,
+        output_max_chars=max(0, args.output_max_chars or 0),
+        output_dir=str(output_dir) if output_dir else None,
+    )
+
+
+def parse_args(argv: List[str] | None = None) -> argparse.Namespace:
+    p = argparse.ArgumentParser(
+        description="Consolidate the .nessus files next to this script into consolidado_scan.xlsx."
+    )
+    p.add_argument("--workers", type=int, default=1,
+                   help="Worker processes (1 = streaming, single core). With several input files each worker "
+                        "parses whole files; with a single file it is split by ReportHost spans.")
+    p.add_argument("--shard-rows", type=int, default=EXCEL_MAX_ROWS - 1,
+                   help="Data rows per sheet/workbook before starting a new shard (max and default: Excel's limit).")
+    p.add_argument("--shard-mode", choices=("sheet", "workbook"), default="sheet",
+                   help="Put extra shards in 'Nessus Export (N)' sheets or in numbered workbooks.")
+    p.add_argument("--format", choices=("xlsx", "parquet"), default="xlsx",
+                   help="Output format: consolidado_scan.xlsx or consolidado_scan.parquet (needs pyarrow).")
+    p.add_argument("--layout", choices=("flat", "normalized"), default="flat",
+                   help="xlsx only: 'flat' writes one wide sheet; 'normalized' writes Hosts, Plugins and "
+                        "Findings sheets keyed by Host Key / Plugin Key.")
+    p.add_argument("--flat-sheet", action="store_true",
+                   help="With --layout normalized: also write the denormalized 'Nessus Export' sheet.")
+    p.add_argument("--row-group-rows", type=int, default=100_000, help="Rows per Parquet row group.")
+    p.add_argument("--parser", choices=PARSER_CHOICES, default="auto",
+                   help="XML backend: lxml (faster, huge_tree) when installed, else the stdlib ElementTree.")
+    p.add_argument("--min-severity", type=_severity_arg, default=0, metavar="LEVEL",
+                   help="Only findings at or above this severity (0-4 or info/low/medium/high/critical).")
+    p.add_argument("--plugin-id", action="append", metavar="IDS",
+                   help="Only these plugin IDs (comma-separated, repeatable).")
+    p.add_argument("--family", action="append", metavar="NAMES",
+                   help="Only these plugin families, case-insensitive (comma-separated, repeatable).")
+    p.add_argument("--host-cidr", action="append", type=_network_arg, metavar="CIDR",
+                   help="Only hosts whose IP address is in this network (repeatable).")
+    p.add_argument("--host-regex", type=_regex_arg, metavar="REGEX",
+                   help="Only hosts whose IP/Name, FQDN, NetBIOS or report name matches (case-insensitive search).")
+    p.add_argument("--credentialed-only", action="store_true", help="Only hosts scanned with credentials.")
+    p.add_argument("--extra-columns", metavar="JSON",
+                   help="JSON list of extra ReportItem columns, e.g. "
+                        '[{"name": "CPE", "sources": ["cpe"], "kind": "list"}]. '
+                        "Sources: '@attr', 'tag' or 'cm:tag'; kinds: text, strip, float, bool, list.")
+    p.add_argument("--output-max-chars", type=int, metavar="N",
+                   help="Plugin Outputs longer than N characters are written in full to a gzip sidecar directory "
+                        "(<output>_outputs/) and the cell keeps a preview plus the file reference. "
+                        f"Default: {EXCEL_CELL_MAX_CHARS} (Excel's cell limit) for xlsx, off for parquet; 0 disables.")
+    p.add_argument("--store", metavar="PATH",
+                   help="SQLite findings store. New .nessus files are ingested into it (files already "
+                        "ingested, by content hash, are skipped) and the export is produced from the store.")
+    p.add_argument("--from-store", action="store_true",
+                   help="With --store: do not look for .nessus files, only export what the store holds.")
+    p.add_argument("--metrics-json", type=Path, metavar="PATH",
+                   help="Write per-stage wall/CPU time and memory peaks plus per-file and per-host parse cost "
+                        "histograms (with the slowest ones) to this JSON file.")
+    p.add_argument("--metrics-top", type=int, default=10, help="Slowest files/hosts listed in --metrics-json.")
+    p.add_argument("--trace-malloc", action="store_true",
+                   help="With --metrics-json: also record tracemalloc peaks per stage (slows the run down).")
+    p.add_argument("--cprofile", type=Path, metavar="PATH",
+                   help="Write cProfile stats of the run to this file (view with: python -m pstats PATH).")
+    return p.parse_args(argv)
+
+
 def main() -> int:
-    inputs = find_nessus_in_script_dir()
-    if not inputs:
-        LOG.error("No .nessus inputs found alongside the script. Place .nessus files in the same folder.")
+    args = parse_args()
+    try:
+        parser = resolve_parser(args.parser)
+    except ImportError:
+        LOG.error("--parser lxml requires lxml (install with: pip install lxml)")
+        return 2
+    extra_columns: Tuple[ColumnSpec, ...] = ()
+    if args.extra_columns:
+        try:
+            extra_columns = load_column_specs(Path(args.extra_columns))
+            register_columns(extra_columns)
+        except (OSError, ValueError) as e:
+            LOG.error("Cannot use --extra-columns %s: %s", args.extra_columns, e)
+            return 2
+        LOG.info("Extra columns: %s", ", ".join(spec.name for spec in extra_columns))
+    out_path = Path(__file__).resolve().parent / f"consolidado_scan.{args.format}"
+    if args.output_max_chars is None:
+        args.output_max_chars = EXCEL_CELL_MAX_CHARS if args.format == "xlsx" else 0
+    # With --store the spilled outputs belong to the store: later exports reference them too
+    spill_base = Path(args.store).resolve() if args.store else out_path
+    output_dir = spill_base.with_name(f"{spill_base.stem}_outputs")
+    options = parse_options_from_args(args, parser, extra_columns, output_dir)
+    LOG.info("XML parser: %s", parser)
+    if args.from_store and not args.store:
+        LOG.error("--from-store requires --store PATH")
+        return 2
+    if args.store and options.active:
+        LOG.error("Filters cannot be combined with --store: the store keeps complete scans")
+        return 2
+    if args.store and extra_columns:
+        LOG.error("--extra-columns cannot be combined with --store: the store has a fixed schema")
+        return 2
+    if args.layout == "normalized" and args.format != "xlsx":
+        LOG.error("--layout normalized is only available for xlsx output "
+                  "(Parquet already dictionary-encodes the repeated host and plugin columns)")
         return 2
 
-    all_rows: List[Dict[str, object]] = []
-    for fp in inputs:
-        rows = extract_rows_from_file(fp)
-        LOG.info("Collected %d rows from %s", len(rows), fp.name)
-        all_rows.extend(rows)
+    metrics = RunMetrics(top_n=args.metrics_top, trace_malloc=args.trace_malloc) if args.metrics_json else None
+    profiler = cProfile.Profile() if args.cprofile else None
+    if profiler:
+        profiler.enable()
+
+    store = None
+    try:
+        if args.store:
+            store = FindingsStore(Path(args.store))
+            if not args.from_store:
+                inputs = find_nessus_in_script_dir()
+                if not inputs:
+                    LOG.warning("No .nessus inputs found alongside the script; exporting the store as is.")
+                with stage(metrics, "ingest"):
+                    new_rows = ingest_new_files(store, inputs, args.workers, options)
+                LOG.info("Ingested %d new rows into %s", new_rows, args.store)
+            values = store.iter_values()
+            read_stage = "store read"
+        else:
+            inputs = find_nessus_in_script_dir()
+            if not inputs:
+                LOG.error("No .nessus inputs found alongside the script. Place .nessus files in the same folder.")
+                return 2
+            if options.active:
+                LOG.info("Filters: %s", options)
+            values = iter_input_values(inputs, args.workers, options)
+            read_stage = "parsing"
+        if metrics:
+            values = timed_rows(metrics, values, read_stage)
 
-    out_path = Path(__file__).resolve().parent / "consolidado_scan.xlsx"
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    write_to_xlsx(all_rows, out_path)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        # Rows are parsed while the writer pulls them: writing excludes that time
+        with stage(metrics, "writing", exclude=(read_stage,)):
+            if args.format == "parquet":
+                try:
+                    written = write_to_parquet(values, out_path, row_group_rows=args.row_group_rows)
+                except ImportError:
+                    LOG.error("Parquet output requires pyarrow (install with: pip install pyarrow)")
+                    return 2
+            elif args.layout == "normalized":
+                written = write_to_xlsx_normalized(values, out_path, shard_rows=args.shard_rows,
+                                                   flat_sheet=args.flat_sheet, output_dir=output_dir)
+            else:
+                written = write_to_xlsx(values, out_path, shard_rows=args.shard_rows, shard_mode=args.shard_mode,
+                                        output_dir=output_dir)
+    finally:
+        if store is not None:
+            store.close()
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(str(args.cprofile))
+            LOG.info("cProfile stats written to %s", args.cprofile)
+        if metrics:
+            metrics.write(args.metrics_json)
+            LOG.info("Metrics written to %s", args.metrics_json)
 
-    LOG.info("Wrote %d rows to %s", len(all_rows), out_path)
+    LOG.info("Wrote %d rows to %s", written, out_path)
+    if (options.output_max_chars or args.format == "xlsx") and output_dir.is_dir():
+        LOG.info("Plugin Outputs over %d chars are in %s",
+                 options.output_max_chars or EXCEL_CELL_MAX_CHARS, output_dir)
     return 0
 
 
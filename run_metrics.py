@@ -0,0 +1,131 @@
+# run_metrics.py
+# Run metrics (--metrics-json) shared by converte_pdf_md.py, converte_pdf_xlsx.py,
+# extrai_nessus.py and OracleLinux7/nessus_to_md.py. Standard library only.
+
+import bisect
+import heapq
+import json
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+HISTOGRAM_BOUNDS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+
+def peak_rss_mb() -> float:
+    """Peak RSS of this process in MB (VmHWM on Linux, ru_maxrss elsewhere, 0 when unknown)."""
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:  # Windows
+        return 0.0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (2 ** 20 if sys.platform == "darwin" else 1024)
+
+
+def reset_peak_rss() -> bool:
+    """Reset VmHWM to the current RSS (Linux only); False when the peak cannot be reset."""
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+class RunMetrics:
+    """
+    Wall/CPU time and memory peaks per pipeline stage, plus per-unit costs (pages,
+    items, hosts, ...) summarized as histograms with the slowest samples. A stage
+    entered several times accumulates. Where the RSS peak cannot be reset
+    (non-Linux) a stage reports the process peak reached so far.
+    """
+
+    def __init__(self, top_n: int = 10, trace_malloc: bool = False) -> None:
+        self.top_n = top_n
+        self.trace_malloc = trace_malloc
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.costs: Dict[str, List[Tuple[float, str]]] = {}
+        self._t0 = time.perf_counter()
+        if trace_malloc and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def add_time(self, name: str, wall: float, cpu: float) -> Dict[str, float]:
+        st = self.stages.setdefault(name, {"wall_s": 0.0, "cpu_s": 0.0, "calls": 0})
+        st["wall_s"] += wall
+        st["cpu_s"] += cpu
+        st["calls"] += 1
+        return st
+
+    @contextmanager
+    def stage(self, name: str, exclude: Tuple[str, ...] = ()) -> Iterator[None]:
+        """Time a block. Time recorded under the `exclude` stages while it runs is not counted twice."""
+        before = {ex: dict(self.stages.get(ex, {})) for ex in exclude}
+        reset_peak_rss()
+        if self.trace_malloc:
+            tracemalloc.reset_peak()
+        w0, c0 = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - w0, time.process_time() - c0
+            for ex, old in before.items():
+                new = self.stages.get(ex, {})
+                wall -= new.get("wall_s", 0.0) - old.get("wall_s", 0.0)
+                cpu -= new.get("cpu_s", 0.0) - old.get("cpu_s", 0.0)
+            st = self.add_time(name, wall, cpu)
+            st["peak_rss_mb"] = max(st.get("peak_rss_mb", 0.0), round(peak_rss_mb(), 1))
+            if self.trace_malloc:
+                peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+                st["tracemalloc_peak_mb"] = max(st.get("tracemalloc_peak_mb", 0.0), round(peak, 1))
+
+    def record(self, kind: str, key: str, seconds: float) -> None:
+        """One cost sample, e.g. kind "pages" with key "page 12"."""
+        self.costs.setdefault(kind, []).append((seconds, key))
+
+    def _summary(self, samples: List[Tuple[float, str]]) -> Dict[str, object]:
+        ms = sorted(s * 1000 for s, _ in samples)
+        n = len(ms)
+        labels = [f"<={b}" for b in HISTOGRAM_BOUNDS_MS] + [f">{HISTOGRAM_BOUNDS_MS[-1]}"]
+        counts = [0] * len(labels)
+        for v in ms:
+            counts[bisect.bisect_left(HISTOGRAM_BOUNDS_MS, v)] += 1
+        return {
+            "count": n,
+            "total_s": round(sum(ms) / 1000, 4),
+            "mean_ms": round(sum(ms) / n, 3),
+            "p50_ms": round(ms[n // 2], 3),
+            "p90_ms": round(ms[min(n - 1, n * 9 // 10)], 3),
+            "p99_ms": round(ms[min(n - 1, n * 99 // 100)], 3),
+            "max_ms": round(ms[-1], 3),
+            "histogram_ms": dict(zip(labels, counts)),
+            "slowest": [{"key": key, "ms": round(s * 1000, 3)} for s, key in heapq.nlargest(self.top_n, samples)],
+        }
+
+    def to_dict(self) -> Dict[str, object]:
+        stages = {name: {k: round(v, 4) if isinstance(v, float) else v for k, v in st.items()}
+                  for name, st in self.stages.items()}
+        return {
+            "script": Path(sys.argv[0]).name,
+            "argv": sys.argv[1:],
+            "total_wall_s": round(time.perf_counter() - self._t0, 4),
+            "peak_rss_mb": max([st.get("peak_rss_mb", 0.0) for st in stages.values()] + [0.0]),
+            "stages": stages,
+            "costs": {kind: self._summary(samples) for kind, samples in self.costs.items() if samples},
+        }
+
+    def write(self, path: str | Path) -> None:
+        Path(path).write_text(json.dumps(self.to_dict(), indent=1), encoding="utf-8")
+
+
+def stage(metrics: RunMetrics | None, name: str, exclude: Tuple[str, ...] = ()):
+    """metrics.stage(...) or a no-op when metrics are off."""
+    return metrics.stage(name, exclude) if metrics else nullcontext()